@@ -0,0 +1,125 @@
+import os
+from typing import List, Optional
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class Settings(BaseSettings):
+    """Application settings, read from the environment or a `.env` file"""
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+    mongodb_url: str = "mongodb://localhost:27017"
+    db_write_batch_ms: float = 20
+    db_write_batch_size: int = 100
+
+    # In-memory session store with write-behind persistence
+    session_cache_size: int = 1000
+    session_ttl_seconds: float = 1800
+    session_flush_interval_seconds: float = 2
+
+    # Coordination between workers: "local" for one process, "mongo" for several workers or hosts
+    coordination_backend: str = "local"
+    session_lease_seconds: float = 30
+    session_handoff_timeout_seconds: float = 5
+
+    # LLM
+    ollama_host: Optional[str] = None
+    ollama_hosts: Optional[str] = None        # comma-separated; requests are balanced across them
+    ollama_model: str = "deepseek-r1"
+    ollama_keep_alive: str = "30m"            # keep the model (and its prompt cache) loaded between turns
+    prompt_document_token_budget: int = 1000  # longer resumes / job posts are condensed once per session
+    llm_max_concurrency: int = 4              # per Ollama host
+    llm_max_queue_depth: int = 32             # waiting requests per priority class
+    llm_structured_output: bool = True        # constrain replies with Ollama's format= JSON schema (Ollama >= 0.5)
+    llm_parse_retries: int = 1                # re-asks for missing fields before falling back
+    llm_failure_threshold: int = 3            # consecutive failures before a host is taken out of rotation
+    llm_circuit_open_seconds: float = 30
+    llm_health_interval_seconds: float = 10
+    # Priority classes: live turns > interview setup > offline generation (recruiter questions, batches)
+    llm_setup_share: float = 0.75             # of all LLM slots, at most this share runs setup and offline work
+    llm_offline_share: float = 0.5
+    llm_live_deadline_seconds: float = 20     # waiting longer than this is rejected; 0 waits indefinitely
+    llm_setup_deadline_seconds: float = 60
+    llm_offline_deadline_seconds: float = 0
+    speculation_enabled: bool = True          # prewarm the prompt cache and evaluate partial answers early
+    speculation_min_words: int = 5            # shorter partial transcripts are not worth evaluating
+
+    # Transcription
+    transcription_backend: str = "openai-whisper"   # or "faster-whisper"
+    whisper_model: str = "small"                    # model size: tiny, base, small, medium, ...
+    whisper_compute_type: str = "int8"              # faster-whisper quantization (int8, int8_float32, float32)
+    whisper_share_weights: bool = True   # one copy of the weights in shared memory for all workers
+    whisper_warmup: bool = True          # load whisper in the background at startup
+    preload_models: bool = False         # load weights at import, before a pre-forking server forks
+    transcription_workers: int = max(1, (os.cpu_count() or 2) // 2)
+    transcription_threads_per_worker: int = 2
+    transcription_max_queue_depth: int = 64
+    transcription_max_batch_size: int = 8
+    transcription_max_wait_ms: float = 25
+
+    # Tiered answer evaluation: clear cases are decided without the LLM
+    evaluation_prescore_enabled: bool = True
+    evaluation_min_words: int = 5                  # shorter answers are insufficient
+    evaluation_short_words: int = 15               # shorter answers sharing no keyword with the question or job post are insufficient
+    evaluation_confident_words: int = 80           # longer answers covering enough question keywords are satisfactory
+    evaluation_keyword_coverage: float = 0.6
+    evaluation_embedding_model: Optional[str] = None   # e.g. "nomic-embed-text"; unset disables the embedding tier
+    evaluation_similarity_low: float = 0.35        # question/answer cosine similarity at or below this is insufficient
+    evaluation_similarity_high: float = 0.8        # and at or above this is satisfactory
+    evaluation_max_follow_ups: int = 2             # per question; after that the answer is accepted as it is
+
+    # Streaming audio / voice activity detection
+    vad_energy_threshold: float = 0.01
+    vad_silence_ms: int = 600
+    vad_max_segment_seconds: float = 28
+
+    # Text-to-speech for questions, with a local engine
+    tts_engine: Optional[str] = None          # "piper" or "espeak-ng"; unset disables TTS
+    tts_voice: Optional[str] = None           # piper model file or espeak-ng voice (engine default if unset)
+    tts_sample_rate: int = 22050              # piper output rate; depends on the voice model
+    tts_cache_size: int = 256                 # synthesized texts kept in memory
+    tts_cache_dir: Optional[str] = "tts_cache"
+    tts_max_concurrency: int = 2
+    tts_chunk_bytes: int = 16384              # size of the binary WebSocket messages carrying audio
+
+    # Answer audio limits, checked before transcription
+    audio_max_bytes: int = 20 * 1024 * 1024   # encoded size of one answer
+    audio_max_seconds: float = 300            # decoded duration of one answer
+    audio_trim_padding_ms: int = 200          # kept around speech when trimming silence
+
+    # Observability
+    otel_enabled: bool = False           # OpenTelemetry spans per stage (needs opentelemetry-api and an SDK)
+
+    # Caches for extracted document text and generated question sets
+    document_cache_size: int = 256
+    question_cache_size: int = 1024
+    cache_persistent: bool = False
+
+    # Bulk pre-generation (one job post, many resumes)
+    batch_workers: int = 2               # concurrent question generations per batch job
+    batch_insert_size: int = 50          # sessions per insert_many
+    batch_max_resumes: int = 1000
+    batch_overload_retries: int = 5      # retries, with backoff, of a call rejected because the LLM queue is full
+
+    # Archiving of completed interviews into a compressed cold collection
+    archive_enabled: bool = True
+    archive_interval_seconds: float = 300
+    archive_batch_size: int = 100
+    archive_hot_retention_seconds: float = 7 * 24 * 3600   # hot copy is deleted this long after archiving
+    archive_compression_level: int = 10
+
+    # PDF extraction
+    pdf_max_bytes: int = 10 * 1024 * 1024
+    pdf_max_pages: int = 50
+    pdf_max_chars: int = 100_000
+    pdf_parallel_min_pages: int = 8
+    pdf_workers: int = max(1, (os.cpu_count() or 2) // 2)
+
+    @property
+    def ollama_host_list(self) -> List[Optional[str]]:
+        """Ollama hosts to balance across; the client default when none are configured"""
+        if self.ollama_hosts:
+            return [host.strip() for host in self.ollama_hosts.split(",") if host.strip()]
+        return [self.ollama_host]
+
+
+settings = Settings()
@@ -0,0 +1,105 @@
+from typing import Optional, Set, Tuple
+import logging
+import re
+import numpy as np
+from app.config import settings
+from app.services.cache import LRUCache
+from app.services.inference import llm_client
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+NO_SPEECH = "No speech detected"
+
+# Asked when an answer is clearly too thin, so no LLM call is needed to phrase a follow-up
+ELABORATE_FOLLOW_UP = (
+    "Could you go into more detail? Please walk me through a specific example "
+    "from your experience and explain the decisions you made."
+)
+
+_WORD = re.compile(r"[a-z0-9][a-z0-9+#.\-]*")
+_STOPWORDS = frozenset("""
+    a about above after again all also am an and any are as at be because been before being between both but by
+    can could did do does doing done during each few for from further had has have having he her here hers him his
+    how i if in into is it its itself just me more most my no nor not now of off on once only or other our ours out
+    over own same she should so some such than that the their theirs them then there these they this those through
+    to too under until up very was we were what when where which while who whom why will with would you your yours
+    describe explain tell example examples experience question questions walk
+""".split())
+
+# Question embeddings are reused across speculative and final evaluations of a turn
+_question_embeddings = LRUCache(1024)
+
+# (is_satisfactory, follow_up_question, tier that decided)
+Verdict = Tuple[bool, Optional[str], str]
+
+
+def _words(text: str) -> list:
+    return _WORD.findall(text.lower())
+
+
+def _keywords(text: str) -> Set[str]:
+    return {word for word in _words(text) if len(word) > 2 and word not in _STOPWORDS}
+
+
+def _decide(tier: str, is_satisfactory: bool) -> Verdict:
+    return is_satisfactory, None if is_satisfactory else ELABORATE_FOLLOW_UP, tier
+
+
+def _heuristic_verdict(question: str, answer: str, job_post: Optional[str]) -> Optional[Verdict]:
+    """Decide from length and keyword overlap alone; None if the answer is not a clear case"""
+    words = _words(answer)
+    if answer.strip() == NO_SPEECH or len(words) < settings.evaluation_min_words:
+        return _decide("heuristic", False)
+
+    answer_keywords = _keywords(answer)
+    question_keywords = _keywords(question)
+    if len(words) < settings.evaluation_short_words and not answer_keywords & (question_keywords | _keywords(job_post or "")):
+        # Short and unrelated to both the question and the role
+        return _decide("heuristic", False)
+
+    if question_keywords and len(words) >= settings.evaluation_confident_words:
+        coverage = len(answer_keywords & question_keywords) / len(question_keywords)
+        if coverage >= settings.evaluation_keyword_coverage:
+            return _decide("heuristic", True)
+    return None
+
+
+async def _embedding_verdict(question: str, answer: str) -> Optional[Verdict]:
+    """Decide from question/answer embedding similarity; None if ambiguous or the model is unavailable"""
+    model = settings.evaluation_embedding_model
+    cached = _question_embeddings.get(question)
+    try:
+        if cached is None:
+            question_vector, answer_vector = await llm_client.embed([question, answer], model)
+            _question_embeddings.set(question, question_vector)
+        else:
+            question_vector, (answer_vector,) = cached, await llm_client.embed([answer], model)
+    except Exception as e:
+        logger.warning(f"Embedding pre-score skipped: {e!r}")
+        return None
+
+    q, a = np.asarray(question_vector), np.asarray(answer_vector)
+    similarity = float(q @ a / (np.linalg.norm(q) * np.linalg.norm(a) or 1.0))
+    if similarity >= settings.evaluation_similarity_high:
+        return _decide("embedding", True)
+    if similarity <= settings.evaluation_similarity_low:
+        return _decide("embedding", False)
+    return None
+
+
+async def prescore_answer(question: str, answer: str, job_post: Optional[str] = None) -> Optional[Verdict]:
+    """Cheap evaluation tiers in front of the LLM.
+
+    Returns (is_satisfactory, follow_up_question, tier) when the answer is
+    clearly satisfactory or clearly insufficient, or None when it needs the LLM.
+    Nothing is counted here: speculative evaluations of partial answers are
+    scored too, and only the evaluation a turn uses is recorded.
+    """
+    if not settings.evaluation_prescore_enabled:
+        return None
+    verdict = _heuristic_verdict(question, answer, job_post)
+    if verdict is None and settings.evaluation_embedding_model:
+        verdict = await _embedding_verdict(question, answer)
+    return verdict
@@ -0,0 +1,71 @@
+from typing import Optional
+import asyncio
+import logging
+import bson
+import zstandard
+from app.config import settings
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def compress_document(document: dict, level: int) -> dict:
+    """Pack a session document into a zstd-compressed BSON blob"""
+    data = zstandard.ZstdCompressor(level=level).compress(bson.encode(document))
+    return {"codec": "zstd", "data": bson.Binary(data)}
+
+
+def decompress_document(archived: dict) -> dict:
+    """Unpack a document written by compress_document"""
+    if archived.get("codec") != "zstd":
+        raise ValueError(f"Unknown archive codec {archived.get('codec')!r}")
+    return bson.decode(zstandard.ZstdDecompressor().decompress(archived["data"]))
+
+
+class SessionArchiver:
+    """Moves completed interviews out of the hot sessions collection.
+
+    Every `interval_seconds`, completed sessions are compressed into the archive
+    collection and stamped with `archived_at`; a TTL index removes the hot copy
+    once the retention period has passed. Archived sessions are still readable
+    through DatabaseService.get_session.
+    """
+
+    def __init__(self, db_service, interval_seconds: float, batch_size: int):
+        self.db_service = db_service
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self._runner: Optional[asyncio.Task] = None
+
+    async def archive_once(self) -> int:
+        """Archive up to one batch of completed sessions; returns how many were archived"""
+        return await self.db_service.archive_completed_sessions(self.batch_size)
+
+    async def _archive_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                # Drain the backlog one batch at a time
+                while await self.archive_once() == self.batch_size:
+                    pass
+            except Exception as e:
+                logger.error(f"Session archiving failed: {e}")
+
+    def start(self) -> None:
+        if self._runner is None:
+            self._runner = asyncio.create_task(self._archive_periodically())
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            self._runner.cancel()
+            await asyncio.gather(self._runner, return_exceptions=True)
+            self._runner = None
+
+
+def create_session_archiver(db_service) -> SessionArchiver:
+    return SessionArchiver(
+        db_service,
+        interval_seconds=settings.archive_interval_seconds,
+        batch_size=settings.archive_batch_size,
+    )
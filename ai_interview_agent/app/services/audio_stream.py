@@ -0,0 +1,329 @@
+from typing import Callable, Deque, List, Optional
+from collections import deque
+import asyncio
+import logging
+import numpy as np
+from app.config import settings
+from app.services.transcription_scheduler import TranscriptionScheduler
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000  # whisper's expected input rate
+PCM_FORMAT = "pcm_s16le"
+VAD_FRAME_MS = 30
+
+
+class AudioRejectedError(ValueError):
+    """An answer's audio is empty, silent or too long to transcribe"""
+
+
+def _ffmpeg_args() -> List[str]:
+    """ffmpeg command that reads any container from stdin and writes 16 kHz mono s16le to stdout"""
+    return [
+        "ffmpeg", "-loglevel", "error", "-i", "pipe:0",
+        "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1",
+    ]
+
+
+def pcm16_to_float32(data: bytes, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Convert little-endian 16-bit mono PCM to float32 at whisper's sample rate"""
+    samples = np.frombuffer(data, dtype="<i2").astype(np.float32) / 32768.0
+    if sample_rate != SAMPLE_RATE and len(samples):
+        duration = len(samples) / sample_rate
+        target = np.linspace(0, duration, int(duration * SAMPLE_RATE), endpoint=False, dtype=np.float32)
+        source = np.arange(len(samples), dtype=np.float32) / sample_rate
+        samples = np.interp(target, source, samples).astype(np.float32)
+    return samples
+
+
+async def decode_audio(data: bytes) -> np.ndarray:
+    """Decode an encoded audio blob (wav, webm, ogg, ...) in memory via an ffmpeg pipe"""
+    process = await asyncio.create_subprocess_exec(
+        *_ffmpeg_args(),
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    stdout, stderr = await process.communicate(data)
+    if process.returncode != 0:
+        raise RuntimeError(f"Failed to decode audio: {stderr.decode(errors='ignore').strip()}")
+    return pcm16_to_float32(stdout)
+
+
+def frame_energy(samples: np.ndarray, frame_ms: int = VAD_FRAME_MS) -> np.ndarray:
+    """RMS energy of each complete frame"""
+    frame_size = SAMPLE_RATE * frame_ms // 1000
+    n_frames = len(samples) // frame_size
+    frames = samples[: n_frames * frame_size].reshape(n_frames, frame_size)
+    return np.sqrt(np.mean(frames ** 2, axis=1))
+
+
+def trim_silence(samples: np.ndarray, threshold: float, padding_ms: int, frame_ms: int = VAD_FRAME_MS) -> np.ndarray:
+    """Cut leading and trailing silence, keeping `padding_ms` around the speech; empty if nothing is voiced"""
+    voiced = np.flatnonzero(frame_energy(samples, frame_ms) > threshold)
+    if not len(voiced):
+        return samples[:0]
+    frame_size = SAMPLE_RATE * frame_ms // 1000
+    padding = SAMPLE_RATE * padding_ms // 1000
+    start = max(0, voiced[0] * frame_size - padding)
+    end = min(len(samples), (voiced[-1] + 1) * frame_size + padding)
+    return samples[start:end]
+
+
+def check_encoded_size(size: int) -> None:
+    if size > settings.audio_max_bytes:
+        raise AudioRejectedError(f"Answer audio is {size} bytes, the limit is {settings.audio_max_bytes}")
+
+
+def check_duration(samples: int) -> None:
+    seconds = samples / SAMPLE_RATE
+    if seconds > settings.audio_max_seconds:
+        raise AudioRejectedError(f"Answer is {seconds:.0f}s long, the limit is {settings.audio_max_seconds:.0f}s")
+
+
+async def load_answer_audio(data: bytes) -> np.ndarray:
+    """Decode a complete answer recording and trim it to the speech, rejecting it if empty, silent or too long"""
+    if not data:
+        raise AudioRejectedError("Answer audio is empty")
+    check_encoded_size(len(data))
+    samples = await decode_audio(data)
+    check_duration(len(samples))
+    speech = trim_silence(samples, settings.vad_energy_threshold, settings.audio_trim_padding_ms)
+    if not len(speech):
+        raise AudioRejectedError("No speech detected in the answer")
+    logger.info(f"Trimmed answer audio from {len(samples) / SAMPLE_RATE:.1f}s to {len(speech) / SAMPLE_RATE:.1f}s")
+    return speech
+
+
+class EnergyVAD:
+    """Frame-energy voice activity detector that cuts a stream into speech segments.
+
+    A segment ends after `silence_ms` of frames below `threshold` RMS, or when it
+    reaches `max_segment_seconds` so it still fits in one whisper window.
+    """
+
+    def __init__(
+        self,
+        threshold: float,
+        silence_ms: int,
+        max_segment_seconds: float,
+        frame_ms: int = VAD_FRAME_MS,
+        min_speech_ms: int = 150,
+        preroll_ms: int = 150,
+    ):
+        self.threshold = threshold
+        self.frame_size = SAMPLE_RATE * frame_ms // 1000
+        self.silence_frames = max(1, silence_ms // frame_ms)
+        self.max_frames = int(max_segment_seconds * 1000) // frame_ms
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self._remainder = np.empty(0, dtype=np.float32)
+        self._preroll: Deque[np.ndarray] = deque(maxlen=max(1, preroll_ms // frame_ms))
+        self._segment: List[np.ndarray] = []
+        self._speech_frames = 0
+        self._silence_run = 0
+
+    def feed(self, samples: np.ndarray) -> List[np.ndarray]:
+        """Add samples and return any segments that finished"""
+        data = np.concatenate([self._remainder, samples]) if len(self._remainder) else samples
+        n_frames = len(data) // self.frame_size
+        self._remainder = data[n_frames * self.frame_size:]
+        if not n_frames:
+            return []
+
+        frames = data[: n_frames * self.frame_size].reshape(n_frames, self.frame_size)
+        voiced = np.sqrt(np.mean(frames ** 2, axis=1)) > self.threshold
+
+        finished = []
+        for frame, is_voiced in zip(frames, voiced):
+            if not self._segment:
+                if not is_voiced:
+                    self._preroll.append(frame)
+                    continue
+                self._segment.extend(self._preroll)
+                self._preroll.clear()
+
+            self._segment.append(frame)
+            if is_voiced:
+                self._speech_frames += 1
+                self._silence_run = 0
+            else:
+                self._silence_run += 1
+
+            if self._silence_run >= self.silence_frames or len(self._segment) >= self.max_frames:
+                segment = self._close_segment()
+                if segment is not None:
+                    finished.append(segment)
+        return finished
+
+    def flush(self) -> Optional[np.ndarray]:
+        """Close the stream and return the trailing segment, if it contains speech"""
+        if self._segment and len(self._remainder):
+            self._segment.append(self._remainder)
+        self._remainder = np.empty(0, dtype=np.float32)
+        return self._close_segment()
+
+    def _close_segment(self) -> Optional[np.ndarray]:
+        segment = np.concatenate(self._segment) if self._segment else None
+        has_speech = self._speech_frames >= self.min_speech_frames
+        self._segment = []
+        self._speech_frames = 0
+        self._silence_run = 0
+        return segment if has_speech else None
+
+
+class StreamingTranscriber:
+    """Transcribes an answer while it is still being spoken.
+
+    Audio chunks arrive either as raw 16-bit PCM or as an encoded stream (e.g.
+    webm/opus) that is piped through a long-running ffmpeg process. Speech
+    segments found by the VAD are sent to the scheduler as soon as they end, so
+    only the last segment is left to transcribe when the answer finishes.
+
+    `on_partial_transcript` is called with the transcript so far whenever every
+    segment submitted up to that point has been transcribed.
+
+    Audio beyond the size or duration limits is dropped, and `finish` then
+    raises AudioRejectedError, as it does when no speech was found.
+    """
+
+    def __init__(
+        self,
+        scheduler: TranscriptionScheduler,
+        audio_format: str = PCM_FORMAT,
+        sample_rate: int = SAMPLE_RATE,
+        on_partial_transcript: Optional[Callable[[str], None]] = None,
+    ):
+        self.scheduler = scheduler
+        self.on_partial_transcript = on_partial_transcript
+        self.audio_format = audio_format
+        self.sample_rate = sample_rate
+        self.vad = EnergyVAD(
+            threshold=settings.vad_energy_threshold,
+            silence_ms=settings.vad_silence_ms,
+            max_segment_seconds=settings.vad_max_segment_seconds,
+        )
+        self._segments: List[asyncio.Task] = []
+        self._pcm_remainder = b""
+        self._decoder: Optional[asyncio.subprocess.Process] = None
+        self._reader: Optional[asyncio.Task] = None
+        self.bytes_received = 0
+        self.samples_received = 0
+        self._rejection: Optional[AudioRejectedError] = None
+        self._finished = False
+
+    async def start(self) -> None:
+        if self.audio_format != PCM_FORMAT:
+            self._decoder = await asyncio.create_subprocess_exec(
+                *_ffmpeg_args(),
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+            )
+            self._reader = asyncio.create_task(self._read_decoded())
+
+    async def feed(self, chunk: bytes) -> None:
+        """Accept the next chunk of audio from the client"""
+        self.bytes_received += len(chunk)
+        if self._rejection is not None:
+            return
+        try:
+            check_encoded_size(self.bytes_received)
+        except AudioRejectedError as e:
+            self._reject(e)
+            return
+        if self._decoder is not None:
+            try:
+                self._decoder.stdin.write(chunk)
+                await self._decoder.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError):
+                if self._rejection is None:
+                    raise
+                # The reader rejected the stream and stopped the decoder while this chunk was in flight
+            return
+
+        data = self._pcm_remainder + chunk
+        usable = len(data) - len(data) % 2
+        self._pcm_remainder = data[usable:]
+        self._push_samples(pcm16_to_float32(data[:usable], self.sample_rate))
+
+    async def finish(self) -> str:
+        """Flush the stream and return the full transcript"""
+        if self._decoder is not None:
+            self._decoder.stdin.close()
+            await self._reader
+            await self._decoder.wait()
+
+        self._finished = True
+        if self._rejection is not None:
+            raise self._rejection
+        tail = self.vad.flush()
+        if tail is not None:
+            self._submit(tail)
+        if not self._segments:
+            raise AudioRejectedError("No speech detected in the answer")
+
+        texts = await asyncio.gather(*self._segments)
+        return " ".join(text for text in texts if text).strip()
+
+    async def abort(self) -> None:
+        """Discard the stream, e.g. when the client disconnects mid-answer"""
+        self._finished = True
+        for task in self._segments:
+            task.cancel()
+        if self._reader is not None:
+            self._reader.cancel()
+        if self._decoder is not None and self._decoder.returncode is None:
+            self._decoder.kill()
+            await self._decoder.wait()
+
+    async def _read_decoded(self) -> None:
+        remainder = b""
+        while True:
+            data = await self._decoder.stdout.read(SAMPLE_RATE)
+            if not data:
+                break
+            data = remainder + data
+            usable = len(data) - len(data) % 2
+            remainder = data[usable:]
+            self._push_samples(pcm16_to_float32(data[:usable]))
+
+    def _reject(self, error: AudioRejectedError) -> None:
+        """Stop transcribing; the rest of the stream is still read so the protocol stays in step"""
+        logger.warning(f"Rejecting streamed answer: {error}")
+        self._rejection = error
+        for task in self._segments:
+            task.cancel()
+        self._segments = []
+        if self._decoder is not None and self._decoder.returncode is None:
+            # feed() stops writing once _rejection is set and ignores a write already in flight
+            self._decoder.stdin.close()
+            self._decoder.kill()
+
+    def _push_samples(self, samples: np.ndarray) -> None:
+        if self._rejection is not None:
+            return
+        self.samples_received += len(samples)
+        try:
+            check_duration(self.samples_received)
+        except AudioRejectedError as e:
+            self._reject(e)
+            return
+        for segment in self.vad.feed(samples):
+            self._submit(segment)
+
+    def _submit(self, segment: np.ndarray) -> None:
+        logger.info(f"Transcribing speech segment of {len(segment) / SAMPLE_RATE:.1f}s")
+        task = asyncio.create_task(self.scheduler.transcribe(segment))
+        self._segments.append(task)
+        if self.on_partial_transcript is not None:
+            task.add_done_callback(self._report_partial)
+
+    def _report_partial(self, _task: asyncio.Task) -> None:
+        if self._finished or self._rejection is not None or not all(task.done() for task in self._segments):
+            return
+        if any(task.cancelled() or task.exception() is not None for task in self._segments):
+            return
+        texts = [task.result() for task in self._segments]
+        self.on_partial_transcript(" ".join(text for text in texts if text).strip())
@@ -0,0 +1,331 @@
+from typing import AsyncIterator, BinaryIO, Callable, Dict, List, Optional, Tuple
+from datetime import datetime
+import asyncio
+import logging
+import shutil
+import tempfile
+import time
+import uuid
+import zipfile
+from app.config import settings
+from app.services.database import DatabaseService, failed_operation_indexes
+from app.services.document_parser import JobPostParser, ResumeParser
+from app.services.inference import InferenceOverloadedError, llm_client
+from app.services.interview_session import InterviewSession, parse_document
+from app.services.prompt_builder import condense_document
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# (file name, PDF bytes) for one resume
+ResumeSource = Tuple[str, bytes]
+# (file name, open file) for one uploaded PDF or zip archive; read only when its resumes are processed
+ResumeUpload = Tuple[str, BinaryIO]
+
+# Spooled uploads stay in memory up to this size and move to disk beyond it
+SPOOL_MAX_MEMORY = 1024 * 1024
+
+
+class BatchTooLargeError(ValueError):
+    """Raised when a batch has more resumes than `batch_max_resumes`"""
+
+
+def spool_upload(source: BinaryIO) -> BinaryIO:
+    """Copy an upload into a temporary file owned by the batch job, which outlives the request"""
+    target = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    source.seek(0)
+    shutil.copyfileobj(source, target)
+    target.seek(0)
+    return target
+
+
+def close_uploads(uploads: List[ResumeUpload]) -> None:
+    for _, file in uploads:
+        file.close()
+
+
+def count_resumes(uploads: List[ResumeUpload]) -> int:
+    """Number of resumes in the uploads, counting the PDFs inside zip archives (only their directories are read)"""
+    total = 0
+    for name, file in uploads:
+        if _is_zip(name, file):
+            with zipfile.ZipFile(file) as archive:
+                total += len(_zip_members(archive))
+        else:
+            total += 1
+    return total
+
+
+def _is_zip(name: str, file: BinaryIO) -> bool:
+    file.seek(0)
+    magic = file.read(4)
+    file.seek(0)
+    return name.lower().endswith(".zip") or magic == b"PK\x03\x04"
+
+
+def _zip_members(archive: zipfile.ZipFile) -> List[str]:
+    return [
+        info.filename for info in archive.infolist()
+        if not info.is_dir() and info.filename.lower().endswith(".pdf") and not info.filename.startswith("__MACOSX/")
+    ]
+
+
+async def iter_resumes(
+    uploads: List[ResumeUpload],
+    on_error: Callable[[str, Exception], None],
+) -> AsyncIterator[ResumeSource]:
+    """Yield resumes one at a time, reading each file or zip member only when it is needed.
+
+    A file or member that cannot be read (e.g. a bad CRC) is passed to `on_error` and skipped.
+    """
+    for name, file in uploads:
+        archive: Optional[zipfile.ZipFile] = None
+        try:
+            if _is_zip(name, file):
+                archive = zipfile.ZipFile(file)
+            else:
+                data = await asyncio.to_thread(file.read)
+        except Exception as e:
+            on_error(name, e)
+            continue
+        if archive is None:
+            yield name, data
+            continue
+        with archive:
+            for member in _zip_members(archive):
+                try:
+                    member_data = await asyncio.to_thread(archive.read, member)
+                except Exception as e:
+                    on_error(member, e)
+                    continue
+                yield member, member_data
+
+
+class BatchJob:
+    """Progress of one bulk pre-generation job"""
+
+    def __init__(self, job_id: str, total: int):
+        self.job_id = job_id
+        self.total = total
+        self.status = "queued"
+        self.created_at = datetime.now()
+        self.succeeded = 0
+        self.failed = 0
+        self.results: List[dict] = []
+        self.error: Optional[str] = None
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+    @property
+    def processed(self) -> int:
+        return self.succeeded + self.failed
+
+    @property
+    def resumes_per_minute(self) -> float:
+        if self.started is None:
+            return 0.0
+        elapsed = (self.finished or time.monotonic()) - self.started
+        return self.processed * 60 / elapsed if elapsed > 0 else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "created_at": self.created_at.isoformat(),
+            "total": self.total,
+            "processed": self.processed,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "resumes_per_minute": round(self.resumes_per_minute, 2),
+            "results": self.results,
+            "error": self.error,
+        }
+
+
+class BatchJobRunner:
+    """Pre-generates interview sessions for one job post and many resumes.
+
+    The job post is parsed and condensed once and shared by every session.
+    Resumes are parsed as workers pick them up, a bounded pool of workers
+    generates the question sets (so live interviews keep most of the LLM
+    capacity), and finished sessions are written with insert_many. Job status
+    is kept in memory and mirrored to the `batch_jobs` collection.
+    """
+
+    def __init__(self, db_service: DatabaseService, workers: int, insert_batch_size: int):
+        self.db_service = db_service
+        self.workers = workers
+        self.insert_batch_size = insert_batch_size
+        self.jobs: Dict[str, BatchJob] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    @property
+    def collection(self):
+        return self.db_service.db.batch_jobs
+
+    def submit(self, job_post: ResumeSource, resumes: List[ResumeUpload]) -> BatchJob:
+        """Start a job in the background and return it immediately; the job closes the resume files when it ends"""
+        try:
+            total = count_resumes(resumes)
+            if total > settings.batch_max_resumes:
+                raise BatchTooLargeError(f"{total} resumes exceeds the limit of {settings.batch_max_resumes}")
+        except Exception:
+            close_uploads(resumes)
+            raise
+        job = BatchJob(str(uuid.uuid4()), total)
+        self.jobs[job.job_id] = job
+        task = asyncio.create_task(self._run(job, job_post, resumes))
+        self._tasks[job.job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job.job_id, None))
+        return job
+
+    async def get_status(self, job_id: str) -> Optional[dict]:
+        job = self.jobs.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        # Started by another worker process, or before a restart
+        return await self.collection.find_one({"job_id": job_id}, {"_id": 0})
+
+    async def _save_status(self, job: BatchJob) -> bool:
+        try:
+            await self.collection.replace_one({"job_id": job.job_id}, job.to_dict(), upsert=True)
+            return True
+        except Exception as e:
+            logger.warning(f"Failed to save status of batch job {job.job_id}: {e}")
+            return False
+
+    async def _run(self, job: BatchJob, job_post: ResumeSource, resumes: List[ResumeUpload]) -> None:
+        try:
+            await self._run_job(job, job_post, resumes)
+        finally:
+            close_uploads(resumes)
+
+    async def _run_job(self, job: BatchJob, job_post: ResumeSource, resumes: List[ResumeUpload]) -> None:
+        job.status = "running"
+        job.started = time.monotonic()
+        await self._save_status(job)
+        try:
+            shared = await self._prepare_job_post(job_post)
+            queue: asyncio.Queue = asyncio.Queue(maxsize=self.workers * 2)
+            pending: List[InterviewSession] = []
+
+            def record_failure(name: str, error: Exception) -> None:
+                logger.error(f"Batch job {job.job_id}: failed to prepare {name}: {error}")
+                job.failed += 1
+                job.results.append({"filename": name, "error": str(error)})
+
+            async def work() -> None:
+                while True:
+                    resume = await queue.get()
+                    if resume is None:
+                        return
+                    name, data = resume
+                    try:
+                        session = await self._with_backoff(lambda: self._build_session(shared, data, name))
+                    except Exception as e:
+                        record_failure(name, e)
+                        continue
+                    job.succeeded += 1
+                    job.results.append({"filename": name, "session_id": session.session_id})
+                    pending.append(session)
+                    if len(pending) >= self.insert_batch_size:
+                        await self._insert(job, pending)
+
+            workers = [asyncio.create_task(work()) for _ in range(self.workers)]
+            read_error: Optional[Exception] = None
+            try:
+                try:
+                    async for resume in iter_resumes(resumes, record_failure):
+                        await queue.put(resume)
+                except Exception as e:
+                    # Finish the resumes already queued before failing the job
+                    read_error = e
+                for _ in workers:
+                    await queue.put(None)
+                await asyncio.gather(*workers)
+            finally:
+                # Workers are only still running here if the job was cancelled
+                for task in workers:
+                    task.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+                # Sessions already listed in the results are saved however the job ends
+                await self._insert(job, pending)
+            if read_error is not None:
+                raise read_error
+            job.status = "completed"
+        except Exception as e:
+            logger.error(f"Batch job {job.job_id} failed: {e}")
+            job.status = "failed"
+            job.error = str(e)
+        job.finished = time.monotonic()
+        logger.info(
+            f"Batch job {job.job_id} {job.status}: {job.succeeded} sessions, {job.failed} failures, "
+            f"{job.resumes_per_minute:.1f} resumes/min"
+        )
+        if await self._save_status(job):
+            # Finished jobs are served from MongoDB from now on
+            self.jobs.pop(job.job_id, None)
+
+    async def _prepare_job_post(self, job_post: ResumeSource) -> dict:
+        """Parse and condense the job post once for the whole batch"""
+        name, data = job_post
+        text, digest = await parse_document(data, JobPostParser, name)
+        summary = await self._with_backoff(lambda: condense_document(llm_client, text, digest, "job post"))
+        return {"job_post_text": text, "job_post_hash": digest, "job_post_summary": summary}
+
+    async def _build_session(self, shared: dict, data: bytes, name: str) -> InterviewSession:
+        session = InterviewSession(str(uuid.uuid4()))
+        for field, value in shared.items():
+            setattr(session, field, value)
+        session.resume_text, session.resume_hash = await parse_document(data, ResumeParser, name)
+        # The job post summary is already cached, so only the resume is condensed here
+        await session.condense_documents()
+        for question in await session.generate_initial_questions():
+            session.add_question(question)
+        return session
+
+    async def _insert(self, job: BatchJob, pending: List[InterviewSession]) -> None:
+        sessions = pending[:]
+        pending.clear()
+        if not sessions:
+            return
+        try:
+            await self.db_service.insert_sessions(sessions)
+        except Exception as e:
+            # insert_many is unordered, so only the documents it reports were not written
+            lost = {sessions[i].session_id for i in failed_operation_indexes(e, len(sessions))}
+            logger.error(f"Batch job {job.job_id}: failed to insert {len(lost)} of {len(sessions)} sessions: {e}")
+            for result in job.results:
+                if result.get("session_id") in lost:
+                    result["error"] = f"Failed to save session: {e}"
+                    del result["session_id"]
+            job.succeeded -= len(lost)
+            job.failed += len(lost)
+        await self._save_status(job)
+
+    async def _with_backoff(self, make_call):
+        """Retry a call rejected because the LLM is busy, backing off between attempts"""
+        delay = 1.0
+        for attempt in range(settings.batch_overload_retries + 1):
+            try:
+                return await make_call()
+            except InferenceOverloadedError:
+                if attempt == settings.batch_overload_retries:
+                    raise
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30)
+
+    async def stop(self) -> None:
+        """Cancel running jobs, e.g. on shutdown"""
+        for task in list(self._tasks.values()):
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+
+def create_batch_runner(db_service: DatabaseService) -> BatchJobRunner:
+    return BatchJobRunner(
+        db_service,
+        workers=settings.batch_workers,
+        insert_batch_size=settings.batch_insert_size,
+    )
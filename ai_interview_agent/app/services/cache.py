@@ -0,0 +1,91 @@
+from typing import Any, Optional
+from collections import OrderedDict
+from datetime import datetime
+import hashlib
+import logging
+from app.config import settings
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def content_hash(data: bytes) -> str:
+    """SHA-256 hex digest used as a content address"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class LRUCache:
+    """Bounded in-memory mapping that evicts the least recently used entry"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        if key not in self._entries:
+            return None
+        self._entries.move_to_end(key)
+        return self._entries[key]
+
+    def set(self, key: str, value: Any) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class TieredCache:
+    """In-memory LRU cache with an optional persistent MongoDB tier behind it.
+
+    The Mongo tier is best-effort: failures are logged and treated as misses.
+    """
+
+    def __init__(self, name: str, max_entries: int):
+        self.name = name
+        self.memory = LRUCache(max_entries)
+        self.collection = None
+        self.hits = 0
+        self.misses = 0
+
+    def attach(self, collection) -> None:
+        """Enable the persistent tier using a motor collection"""
+        self.collection = collection
+
+    async def get(self, key: str) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is None and self.collection is not None:
+            try:
+                doc = await self.collection.find_one({"_id": key})
+                if doc:
+                    value = doc["value"]
+                    self.memory.set(key, value)
+            except Exception as e:
+                logger.error(f"{self.name} cache read failed: {e}")
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: Any) -> None:
+        self.memory.set(key, value)
+        if self.collection is not None:
+            try:
+                await self.collection.update_one(
+                    {"_id": key},
+                    {"$set": {"value": value, "created_at": datetime.now()}},
+                    upsert=True
+                )
+            except Exception as e:
+                logger.error(f"{self.name} cache write failed: {e}")
+
+
+# Extracted document text, keyed by the SHA-256 of the uploaded file
+document_text_cache = TieredCache("document_text", settings.document_cache_size)
+
+# Generated question sets, keyed by document hashes, prompt version and model
+question_cache = TieredCache("question_sets", settings.question_cache_size)
@@ -0,0 +1,313 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid, DuplicateKeyError
+from app.config import settings
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+HANDOFF_CHANNEL = "session_handoff"
+
+# Identifies this worker process in leases and notifications
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+class LeaseStore(ABC):
+    """Time-limited, exclusive ownership of a session"""
+
+    @abstractmethod
+    async def acquire(self, session_id: str, owner: str, ttl_seconds: float) -> bool:
+        """Take the lease if it is free, expired or already held by `owner`"""
+
+    @abstractmethod
+    async def renew(self, session_id: str, owner: str, ttl_seconds: float) -> bool:
+        """Extend a lease; False if `owner` no longer holds it"""
+
+    @abstractmethod
+    async def release(self, session_id: str, owner: str) -> None:
+        """Give up a lease if `owner` still holds it"""
+
+    async def start(self) -> None:
+        pass
+
+
+class InMemoryLeaseStore(LeaseStore):
+    """Leases for a single worker process"""
+
+    def __init__(self):
+        self._leases: Dict[str, tuple] = {}
+
+    async def acquire(self, session_id: str, owner: str, ttl_seconds: float) -> bool:
+        current = self._leases.get(session_id)
+        if current and current[0] != owner and current[1] > time.monotonic():
+            return False
+        self._leases[session_id] = (owner, time.monotonic() + ttl_seconds)
+        return True
+
+    async def renew(self, session_id: str, owner: str, ttl_seconds: float) -> bool:
+        current = self._leases.get(session_id)
+        if not current or current[0] != owner:
+            return False
+        self._leases[session_id] = (owner, time.monotonic() + ttl_seconds)
+        return True
+
+    async def release(self, session_id: str, owner: str) -> None:
+        current = self._leases.get(session_id)
+        if current and current[0] == owner:
+            del self._leases[session_id]
+
+
+class MongoLeaseStore(LeaseStore):
+    """Leases shared by all workers, one document per session keyed by session_id.
+
+    Expiry uses each worker's clock, so hosts should be NTP-synchronised; the
+    lease TTL should be much larger than the expected clock skew.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def start(self) -> None:
+        # Expired leases are cleaned up by MongoDB
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    async def acquire(self, session_id: str, owner: str, ttl_seconds: float) -> bool:
+        now = datetime.now(timezone.utc)
+        try:
+            await self.collection.update_one(
+                {"_id": session_id, "$or": [{"owner": owner}, {"expires_at": {"$lte": now}}]},
+                {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=ttl_seconds)}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            # The upsert collided with a live lease held by someone else
+            return False
+
+    async def renew(self, session_id: str, owner: str, ttl_seconds: float) -> bool:
+        result = await self.collection.update_one(
+            {"_id": session_id, "owner": owner},
+            {"$set": {"expires_at": datetime.now(timezone.utc) + timedelta(seconds=ttl_seconds)}}
+        )
+        return result.matched_count == 1
+
+    async def release(self, session_id: str, owner: str) -> None:
+        await self.collection.delete_one({"_id": session_id, "owner": owner})
+
+
+Handler = Callable[[dict], Awaitable[None]]
+
+
+class Notifier(ABC):
+    """Publish/subscribe channel between workers"""
+
+    def __init__(self):
+        self._handlers: Dict[str, List[Handler]] = {}
+
+    def subscribe(self, channel: str, handler: Handler) -> None:
+        self._handlers.setdefault(channel, []).append(handler)
+
+    @abstractmethod
+    async def publish(self, channel: str, message: dict) -> None:
+        """Deliver a message to every worker's subscribers, including this worker's"""
+
+    async def _dispatch(self, channel: str, message: dict) -> None:
+        for handler in self._handlers.get(channel, []):
+            try:
+                await handler(message)
+            except Exception as e:
+                logger.error(f"Handler for {channel} failed: {e}")
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+
+class LocalNotifier(Notifier):
+    """Delivers messages within this process"""
+
+    async def publish(self, channel: str, message: dict) -> None:
+        asyncio.create_task(self._dispatch(channel, message))
+
+
+class MongoNotifier(Notifier):
+    """Messages are appended to a capped collection that every worker tails.
+
+    Tailable cursors work on a standalone MongoDB, so no replica set (as change
+    streams would need) is required.
+    """
+
+    def __init__(self, db, collection_name: str = "coordination_events", size_bytes: int = 1024 * 1024):
+        super().__init__()
+        self.db = db
+        self.collection_name = collection_name
+        self.size_bytes = size_bytes
+        self._tailer: Optional[asyncio.Task] = None
+
+    @property
+    def collection(self):
+        return self.db[self.collection_name]
+
+    async def start(self) -> None:
+        try:
+            await self.db.create_collection(self.collection_name, capped=True, size=self.size_bytes)
+        except CollectionInvalid:
+            pass
+        if self._tailer is None:
+            self._tailer = asyncio.create_task(self._tail())
+
+    async def stop(self) -> None:
+        if self._tailer is not None:
+            self._tailer.cancel()
+            await asyncio.gather(self._tailer, return_exceptions=True)
+            self._tailer = None
+
+    async def publish(self, channel: str, message: dict) -> None:
+        await self.collection.insert_one({"channel": channel, "message": message, "sender": WORKER_ID})
+
+    async def _tail(self) -> None:
+        query: Optional[Dict[str, Any]] = None
+        while True:
+            try:
+                if query is None:
+                    # Only messages published after this worker started are relevant
+                    last = await self.collection.find_one(sort=[("$natural", -1)])
+                    query = {"_id": {"$gt": last["_id"]}} if last else {}
+                cursor = self.collection.find(query, cursor_type=CursorType.TAILABLE_AWAIT)
+                while cursor.alive:
+                    async for doc in cursor:
+                        query = {"_id": {"$gt": doc["_id"]}}
+                        await self._dispatch(doc["channel"], doc["message"])
+            except Exception as e:
+                logger.warning(f"Coordination event cursor failed: {e!r}")
+            # A tailable cursor on an empty collection dies immediately; retry shortly
+            await asyncio.sleep(1)
+
+
+class SessionCoordinator:
+    """Makes sure each interview session is served by one WebSocket connection cluster-wide.
+
+    A connection claims a lease on its session before serving it and renews it
+    while open. When a reconnect lands elsewhere (another worker, or this one),
+    the new connection asks the current holder to hand off over the notifier;
+    the holder saves the session, closes its socket and releases the lease,
+    and the new connection then takes it and loads the saved state. A holder
+    that died simply lets its lease expire.
+    """
+
+    def __init__(self, store: LeaseStore, notifier: Notifier, lease_seconds: float, handoff_timeout_seconds: float):
+        self.store = store
+        self.notifier = notifier
+        self.lease_seconds = lease_seconds
+        self.handoff_timeout_seconds = handoff_timeout_seconds
+        # Called with (session_id, lost) when this worker must stop serving a session;
+        # `lost` means the lease expired, so local state must not be written back
+        self.on_release: Optional[Callable[[str, bool], Awaitable[None]]] = None
+        self._held: Dict[str, str] = {}
+        self._renewer: Optional[asyncio.Task] = None
+        notifier.subscribe(HANDOFF_CHANNEL, self._handle_handoff)
+
+    async def claim(self, session_id: str) -> Optional[str]:
+        """Take ownership of a session for one connection; returns the lease token, or None on timeout"""
+        token = f"{WORKER_ID}:{uuid.uuid4().hex[:8]}"
+        if await self.store.acquire(session_id, token, self.lease_seconds):
+            self._held[session_id] = token
+            return token
+
+        logger.info(f"Session {session_id} is held elsewhere, requesting handoff")
+        await self.notifier.publish(HANDOFF_CHANNEL, {"session_id": session_id, "requested_by": token})
+        deadline = time.monotonic() + self.handoff_timeout_seconds
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+            if await self.store.acquire(session_id, token, self.lease_seconds):
+                self._held[session_id] = token
+                return token
+        return None
+
+    async def release(self, session_id: str, token: Optional[str]) -> None:
+        """Give up a connection's lease (a no-op if it was already handed off)"""
+        if token is None:
+            return
+        if self._held.get(session_id) == token:
+            del self._held[session_id]
+        try:
+            await self.store.release(session_id, token)
+        except Exception as e:
+            logger.warning(f"Failed to release lease on session {session_id}: {e}")
+
+    async def publish(self, channel: str, message: dict) -> None:
+        await self.notifier.publish(channel, message)
+
+    def subscribe(self, channel: str, handler: Handler) -> None:
+        self.notifier.subscribe(channel, handler)
+
+    async def _handle_handoff(self, message: dict) -> None:
+        session_id = message["session_id"]
+        token = self._held.get(session_id)
+        if token is None or token == message["requested_by"]:
+            return
+        logger.info(f"Handing off session {session_id}")
+        del self._held[session_id]
+        try:
+            if self.on_release:
+                await self.on_release(session_id, False)
+        finally:
+            await self.store.release(session_id, token)
+
+    async def _renew_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            for session_id, token in list(self._held.items()):
+                try:
+                    renewed = await self.store.renew(session_id, token, self.lease_seconds)
+                except Exception as e:
+                    # Keep serving; the lease is still valid until it expires
+                    logger.warning(f"Failed to renew lease on session {session_id}: {e}")
+                    continue
+                if not renewed and self._held.get(session_id) == token:
+                    logger.warning(f"Lost the lease on session {session_id}")
+                    del self._held[session_id]
+                    if self.on_release:
+                        await self.on_release(session_id, True)
+
+    async def start(self) -> None:
+        await self.store.start()
+        await self.notifier.start()
+        if self._renewer is None:
+            self._renewer = asyncio.create_task(self._renew_periodically())
+
+    async def stop(self) -> None:
+        if self._renewer is not None:
+            self._renewer.cancel()
+            await asyncio.gather(self._renewer, return_exceptions=True)
+            self._renewer = None
+        await self.notifier.stop()
+        for session_id, token in list(self._held.items()):
+            await self.release(session_id, token)
+
+
+def create_session_coordinator(db) -> SessionCoordinator:
+    """Coordinator for the configured backend: "local" (one worker) or "mongo" (many workers or hosts)"""
+    if settings.coordination_backend == "mongo":
+        store, notifier = MongoLeaseStore(db.session_leases), MongoNotifier(db)
+    elif settings.coordination_backend == "local":
+        store, notifier = InMemoryLeaseStore(), LocalNotifier()
+    else:
+        raise ValueError(f"Unknown coordination backend {settings.coordination_backend!r}, expected 'local' or 'mongo'")
+    return SessionCoordinator(
+        store,
+        notifier,
+        lease_seconds=settings.session_lease_seconds,
+        handoff_timeout_seconds=settings.session_handoff_timeout_seconds,
+    )
@@ -1,28 +1,255 @@
-from typing import Optional
+from typing import Dict, List, Optional
+from datetime import datetime, timezone
+import asyncio
+import logging
 import motor.motor_asyncio
+from pymongo import ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError
+from app.config import settings
+from app.services.archive import compress_document, decompress_document
+from app.services.cache import LRUCache
 from app.services.interview_session import InterviewSession
+from app.services.metrics import stage_timer
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Large, immutable texts stored once in the documents collection, keyed by content hash
+DOCUMENT_FIELDS = {"resume_text": "resume_hash", "job_post_text": "job_post_hash"}
+
+# What the interview loop needs: no document texts (prompts use the summaries),
+# no append-only history, and only the last finished turn
+LIVE_PROJECTION = {
+    "_id": 0,
+    "resume_text": 0,
+    "job_post_text": 0,
+    "answers": 0,
+    "chat_history": 0,
+    "turns": {"$slice": -1},
+}
+
+
+def _drop_document_texts(fields: dict) -> dict:
+    """Drop document texts from session fields when they are stored by hash"""
+    for text_field, hash_field in DOCUMENT_FIELDS.items():
+        if fields.get(hash_field):
+            fields.pop(text_field, None)
+    return fields
+
+
+def _externalize_documents(update: dict) -> dict:
+    """Drop document texts from a session update when they are stored by hash"""
+    _drop_document_texts(update.get("$set", {}))
+    return update
+
+
+def failed_operation_indexes(error: Exception, count: int) -> List[int]:
+    """Positions of the operations of a bulk write that were not applied"""
+    if isinstance(error, BulkWriteError):
+        return sorted({e["index"] for e in error.details.get("writeErrors", [])})
+    # Nothing is known about which operations landed
+    return list(range(count))
+
+
+class SessionWriteBatcher:
+    """Coalesces session saves that arrive close together into one bulk_write.
+
+    Sessions accumulate their own pending changes, so several saves of the same
+    session within one window become a single update. Batches are written one
+    at a time, so updates to a session always land in the order they were made.
+    """
+
+    def __init__(self, collection, max_delay_ms: float, max_batch_size: int):
+        self.collection = collection
+        self.max_delay = max_delay_ms / 1000
+        self.max_batch_size = max_batch_size
+        self._pending: Dict[str, InterviewSession] = {}
+        self._batch_done: Optional[asyncio.Future] = None
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._last_flush: Optional[asyncio.Task] = None
+
+    async def submit(self, session: InterviewSession) -> None:
+        """Queue a session's changes and wait until the batch containing them is written"""
+        loop = asyncio.get_running_loop()
+        if self._batch_done is None:
+            self._batch_done = loop.create_future()
+            self._flush_handle = loop.call_later(self.max_delay, self._start_flush)
+        batch_done = self._batch_done
+        self._pending[session.session_id] = session
+        if len(self._pending) >= self.max_batch_size:
+            self._start_flush()
+        await asyncio.shield(batch_done)
+
+    def _start_flush(self) -> None:
+        if self._batch_done is None:
+            return
+        self._flush_handle.cancel()
+        sessions, batch_done = self._pending, self._batch_done
+        self._pending, self._batch_done, self._flush_handle = {}, None, None
+        self._last_flush = asyncio.create_task(self._flush(sessions, batch_done, self._last_flush))
+
+    async def _flush(
+        self,
+        sessions: Dict[str, InterviewSession],
+        batch_done: asyncio.Future,
+        previous: Optional[asyncio.Task],
+    ) -> None:
+        if previous is not None:
+            # Changes are taken only after the previous batch is written (or restored after a failure)
+            await asyncio.wait([previous])
+        operations = []
+        flushed = []
+        for session_id, session in sessions.items():
+            update = session.pop_changes()
+            if update:
+                operations.append(UpdateOne({"session_id": session_id}, _externalize_documents(update), upsert=True))
+                flushed.append((session, update))
+        try:
+            if operations:
+                with stage_timer("db_save"):
+                    await self.collection.bulk_write(operations, ordered=False)
+            batch_done.set_result(None)
+        except Exception as e:
+            failed = failed_operation_indexes(e, len(operations))
+            logger.error(f"Failed to write {len(failed)} of {len(operations)} session updates: {e}")
+            # Updates that were applied must not be retried: their $inc and $push would run twice
+            for i in failed:
+                session, update = flushed[i]
+                session.restore_changes(update)
+            batch_done.set_exception(e)
+
 
 class DatabaseService:
     def __init__(self, connection_string: str):
-        self.client = motor.motor_asyncio.AsyncIOMotorClient(connection_string)
+        # connect=False: nothing touches the network until the first query
+        self.client = motor.motor_asyncio.AsyncIOMotorClient(connection_string, connect=False)
         self.db = self.client.interview_db
         self.sessions = self.db.sessions
+        self.documents = self.db.documents
+        self.archive = self.db.sessions_archive
+        self.batcher = SessionWriteBatcher(
+            self.sessions,
+            max_delay_ms=settings.db_write_batch_ms,
+            max_batch_size=settings.db_write_batch_size,
+        )
+        self._stored_documents = LRUCache(settings.document_cache_size)
+
+    async def ping(self, timeout: float = 2.0) -> bool:
+        """Check that MongoDB is reachable"""
+        try:
+            await asyncio.wait_for(self.client.admin.command("ping"), timeout)
+            return True
+        except Exception as e:
+            logger.warning(f"MongoDB ping failed: {e!r}")
+            return False
+
+    async def ensure_indexes(self) -> None:
+        """Create the indexes session reads and archiving rely on"""
+        await self.sessions.create_index("session_id", unique=True)
+        await self.sessions.create_index([("is_completed", 1), ("archived_at", 1)])
+        # Archived sessions leave the hot collection after the retention period
+        await self.sessions.create_index("archived_at", expireAfterSeconds=int(settings.archive_hot_retention_seconds))
 
     async def save_session(self, session: InterviewSession) -> None:
         """Save or update an interview session"""
-        await self.sessions.update_one(
-            {"session_id": session.session_id},
-            {"$set": session.to_dict()},
-            upsert=True
-        )
+        await self._store_documents(session)
+        await self.batcher.submit(session)
+
+    async def _store_documents(self, session: InterviewSession) -> None:
+        """Write resume and job post texts once to the documents collection"""
+        for text_field, hash_field in DOCUMENT_FIELDS.items():
+            digest = getattr(session, hash_field)
+            text = getattr(session, text_field)
+            if not digest or text is None or self._stored_documents.get(digest):
+                continue
+            await self.documents.update_one(
+                {"_id": digest},
+                {"$setOnInsert": {"text": text, "created_at": datetime.now()}},
+                upsert=True
+            )
+            self._stored_documents.set(digest, True)
+
+    async def insert_sessions(self, sessions: List[InterviewSession]) -> None:
+        """Insert many new sessions with one insert_many"""
+        for session in sessions:
+            await self._store_documents(session)
+        docs = []
+        for session in sessions:
+            session.require_full_save()
+            doc = _drop_document_texts(session.pop_changes()["$set"])
+            doc["session_id"] = session.session_id
+            docs.append(doc)
+        try:
+            if docs:
+                await self.sessions.insert_many(docs, ordered=False)
+        except Exception:
+            for session in sessions:
+                session.require_full_save()
+            raise
 
     async def get_session(self, session_id: str) -> Optional[InterviewSession]:
-        """Retrieve an interview session by ID"""
+        """Retrieve a complete interview session by ID, including archived ones"""
         session_data = await self.sessions.find_one({"session_id": session_id})
+        if session_data is None:
+            session_data = await self.get_archived_session(session_id)
         if session_data:
+            await self._attach_documents(session_data)
             return InterviewSession.from_dict(session_data)
         return None
 
+    async def get_live_session(self, session_id: str) -> Optional[InterviewSession]:
+        """Retrieve the fields an interview in progress needs (see LIVE_PROJECTION)"""
+        session_data = await self.sessions.find_one({"session_id": session_id}, LIVE_PROJECTION)
+        if session_data is None:
+            return await self.get_session(session_id)
+        if session_data.get("resume_summary") is None or session_data.get("job_post_summary") is None:
+            # Sessions from before condensing need the full texts for prompts
+            await self._attach_documents(session_data)
+        return InterviewSession.from_dict(session_data)
+
+    async def archive_completed_sessions(self, limit: int) -> int:
+        """Compress up to `limit` completed sessions into the archive and stamp the hot copies for expiry"""
+        documents = await self.sessions.find(
+            {"is_completed": True, "archived_at": None}, {"_id": 0}
+        ).to_list(limit)
+        if not documents:
+            return 0
+        level = settings.archive_compression_level
+        with stage_timer("archive_compress"):
+            compressed = await asyncio.to_thread(lambda: [compress_document(doc, level) for doc in documents])
+        archived_at = datetime.now(timezone.utc)
+        session_ids = [doc["session_id"] for doc in documents]
+        await self.archive.bulk_write([
+            ReplaceOne({"_id": session_id}, {**blob, "_id": session_id, "archived_at": archived_at}, upsert=True)
+            for session_id, blob in zip(session_ids, compressed)
+        ], ordered=False)
+        await self.sessions.update_many(
+            {"session_id": {"$in": session_ids}, "archived_at": None},
+            {"$set": {"archived_at": archived_at}}
+        )
+        logger.info(f"Archived {len(session_ids)} completed sessions")
+        return len(session_ids)
+
+    async def get_archived_session(self, session_id: str) -> Optional[dict]:
+        """Decompress an archived session document"""
+        archived = await self.archive.find_one({"_id": session_id})
+        return decompress_document(archived) if archived else None
+
+    async def _attach_documents(self, session_data: dict) -> None:
+        """Fill in document texts that are stored by reference"""
+        wanted = {
+            session_data[hash_field]: text_field
+            for text_field, hash_field in DOCUMENT_FIELDS.items()
+            if session_data.get(text_field) is None and session_data.get(hash_field)
+        }
+        if not wanted:
+            return
+        async for doc in self.documents.find({"_id": {"$in": list(wanted)}}):
+            for text_field, hash_field in DOCUMENT_FIELDS.items():
+                if session_data.get(hash_field) == doc["_id"]:
+                    session_data[text_field] = doc["text"]
+
     async def delete_session(self, session_id: str) -> None:
         """Delete an interview session"""
-        await self.sessions.delete_one({"session_id": session_id}) 
\ No newline at end of file
+        await self.sessions.delete_one({"session_id": session_id})
@@ -1,42 +1,137 @@
-from pypdf import PdfReader
-from io import BytesIO
-from pathlib import Path
+from typing import List, Optional, Union
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import logging
 import fitz
-import shutil
-import os
-
-UPLOAD_DIR = Path(__file__).parent.parent.parent / "uploads"
-class ResumeParser:
-    def __init__(self, resume_content: str|bytes):
-        self.resume_content = resume_content
-        self.file_path = UPLOAD_DIR / resume_content.filename
-
-    def parse(self):
-        with open(self.file_path, 'wb') as f:
-            shutil.copyfileobj(self.resume_content.file, f)      
-        try:
-            text = extract_text_from_pdf(self.file_path)
-            return text.strip()
-        finally:
-            # os.remove(self.file_path)
-            pass
-    
-class JobPostParser:
-    def __init__(self, job_post_content: str|bytes):
-        self.job_post_content = job_post_content
-        self.file_path = UPLOAD_DIR / job_post_content.filename
-    def parse(self):
-        with open(self.file_path, 'wb') as f:
-            shutil.copyfileobj(self.job_post_content.file, f)
-        try:
-            text = extract_text_from_pdf(self.file_path)
-            return text.strip()
-        finally:
-            # os.remove(self.file_path)
-            pass
-
-def extract_text_from_pdf(pdf_path: Path) -> str:
-    """Extract text from a PDF file."""
-    doc = fitz.open(pdf_path)
-    text = "\n".join([page.get_text() for page in doc])
-    return text if text else "No text found in the PDF"
\ No newline at end of file
+from fastapi import UploadFile
+from app.config import settings
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+NO_TEXT_FOUND = "No text found in the PDF"
+
+
+class DocumentTooLargeError(ValueError):
+    """Raised when an uploaded document exceeds the configured size or page limits"""
+
+
+def _read_pages(doc: "fitz.Document", start: int, stop: int, max_chars: int) -> str:
+    """Read pages [start, stop), stopping once max_chars have been read"""
+    parts: List[str] = []
+    total = 0
+    for page_number in range(start, stop):
+        text = doc[page_number].get_text()
+        parts.append(text)
+        total += len(text)
+        if total >= max_chars:
+            break
+    return "\n".join(parts)
+
+
+def _extract_page_range(data: bytes, start: int, stop: int, max_chars: int) -> str:
+    """Pool worker entry point: open the document from bytes and read a page range"""
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        return _read_pages(doc, start, stop, max_chars)
+
+
+class PdfTextExtractor:
+    """Extracts text from PDF bytes entirely in memory.
+
+    Small documents are read in-process. Documents with at least
+    `parallel_min_pages` pages are split into page ranges that are extracted in
+    a process pool. Extraction stops early once `max_chars` have been collected,
+    since nothing beyond that is sent to the model.
+    """
+
+    def __init__(self, max_bytes: int, max_pages: int, max_chars: int, parallel_min_pages: int, max_workers: int):
+        self.max_bytes = max_bytes
+        self.max_pages = max_pages
+        self.max_chars = max_chars
+        self.parallel_min_pages = parallel_min_pages
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def extract(self, data: bytes) -> str:
+        if len(data) > self.max_bytes:
+            raise DocumentTooLargeError(
+                f"Document is {len(data)} bytes, the limit is {self.max_bytes}"
+            )
+        with fitz.open(stream=data, filetype="pdf") as doc:
+            page_count = doc.page_count
+            if page_count > self.max_pages:
+                raise DocumentTooLargeError(
+                    f"Document has {page_count} pages, the limit is {self.max_pages}"
+                )
+            if page_count < self.parallel_min_pages or self.max_workers < 2:
+                return _read_pages(doc, 0, page_count, self.max_chars)[: self.max_chars]
+
+        return self._extract_parallel(data, page_count)[: self.max_chars]
+
+    def _extract_parallel(self, data: bytes, page_count: int) -> str:
+        chunk = -(-page_count // self.max_workers)
+        futures = [
+            self._get_executor().submit(_extract_page_range, data, start, min(start + chunk, page_count), self.max_chars)
+            for start in range(0, page_count, chunk)
+        ]
+        parts: List[str] = []
+        total = 0
+        for future in futures:
+            if total >= self.max_chars:
+                # Enough text already; skip ranges that have not started yet
+                future.cancel()
+                continue
+            text = future.result()
+            parts.append(text)
+            total += len(text)
+        logger.info(f"Extracted {page_count} pages in {len(futures)} parallel ranges")
+        return "\n".join(parts)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+pdf_extractor = PdfTextExtractor(
+    max_bytes=settings.pdf_max_bytes,
+    max_pages=settings.pdf_max_pages,
+    max_chars=settings.pdf_max_chars,
+    parallel_min_pages=settings.pdf_parallel_min_pages,
+    max_workers=settings.pdf_workers,
+)
+
+
+class DocumentParser:
+    """Parses an uploaded PDF (an UploadFile or raw bytes) without touching disk"""
+
+    def __init__(self, content: Union[bytes, UploadFile], extractor: PdfTextExtractor = pdf_extractor):
+        self.content = content
+        self.extractor = extractor
+
+    def parse(self) -> str:
+        data = self.content if isinstance(self.content, bytes) else self.content.file.read()
+        return extract_text_from_pdf(data, self.extractor).strip()
+
+
+class ResumeParser(DocumentParser):
+    pass
+
+
+class JobPostParser(DocumentParser):
+    pass
+
+
+def extract_text_from_pdf(data: bytes, extractor: PdfTextExtractor = pdf_extractor) -> str:
+    """Extract text from PDF bytes."""
+    text = extractor.extract(data)
+    return text if text.strip() else NO_TEXT_FOUND
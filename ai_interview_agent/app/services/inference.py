@@ -0,0 +1,373 @@
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Optional, Sequence, Set, Mapping, Union
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import asyncio
+import os
+import time
+import logging
+import httpx
+import ollama
+from app.config import settings
+from app.services.metrics import observe_llm_response
+from app.services.scheduling import InferenceOverloadedError, PriorityGate, WorkClass
+from app.services.transcription_backends import AudioInput, TranscriptionBackend, create_backend
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _is_endpoint_failure(error: Exception) -> bool:
+    """Errors that mean the host is unhealthy, as opposed to a bad request"""
+    if isinstance(error, ollama.ResponseError):
+        return error.status_code >= 500
+    return isinstance(error, (ConnectionError, httpx.TransportError, asyncio.TimeoutError))
+
+
+def _model_matches(loaded: str, model: str) -> bool:
+    # "deepseek-r1" refers to the "latest" tag
+    return loaded == model or (":" not in model and loaded == f"{model}:latest")
+
+
+class OllamaEndpoint:
+    """One Ollama host: a persistent connection pool, a concurrency cap and a circuit breaker.
+
+    After `failure_threshold` consecutive failures the circuit opens and the
+    host gets no traffic for `open_seconds`. The next request (or health check)
+    after that is a probe: success closes the circuit, failure reopens it.
+    """
+
+    def __init__(self, host: Optional[str], max_concurrency: int, failure_threshold: int, open_seconds: float):
+        self.host = host or "default"
+        self.max_concurrency = max_concurrency
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.client = ollama.AsyncClient(
+            host=host,
+            limits=httpx.Limits(max_connections=max_concurrency + 1, max_keepalive_connections=max_concurrency + 1),
+        )
+        self.outstanding = 0
+        self.loaded_models: Set[str] = set()
+        self._failures = 0
+        self._open_until = 0.0
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self._open_until
+
+    @property
+    def has_capacity(self) -> bool:
+        return self.outstanding < self.max_concurrency
+
+    def has_model(self, model: str) -> bool:
+        return any(_model_matches(loaded, model) for loaded in self.loaded_models)
+
+    def record_success(self, model: Optional[str] = None) -> None:
+        if self._failures >= self.failure_threshold:
+            logger.info(f"Ollama endpoint {self.host} recovered")
+        self._failures = 0
+        self._open_until = 0.0
+        if model:
+            self.loaded_models.add(model)
+
+    def record_failure(self, error: Exception) -> None:
+        self._failures += 1
+        if self._failures >= self.failure_threshold:
+            self._open_until = time.monotonic() + self.open_seconds
+            logger.warning(f"Ollama endpoint {self.host} unavailable for {self.open_seconds}s: {error!r}")
+
+    async def refresh(self, timeout: float) -> None:
+        """Health check that also learns which models are loaded (/api/ps)"""
+        try:
+            response = await asyncio.wait_for(self.client.ps(), timeout)
+        except Exception as e:
+            self.record_failure(e)
+            return
+        self.loaded_models = {m.model or m.name for m in response.models if m.model or m.name}
+        self.record_success()
+
+    def status(self) -> dict:
+        return {
+            "host": self.host,
+            "state": "ok" if self.available else "open",
+            "outstanding": self.outstanding,
+            "loaded_models": sorted(self.loaded_models),
+        }
+
+
+class LLMClient:
+    """Async Ollama chat client that balances requests across one or more Ollama hosts.
+
+    Each request goes to the healthy endpoint with spare capacity that has the
+    model loaded already, and otherwise has the fewest outstanding requests.
+    Requests that fail because a host is down are retried on another host, as
+    long as nothing has been returned to the caller yet.
+    """
+
+    def __init__(
+        self,
+        hosts: Sequence[Optional[str]],
+        model: str,
+        max_concurrency: int,
+        max_queue_depth: int,
+        keep_alive: Optional[str] = None,
+        failure_threshold: int = 3,
+        open_seconds: float = 30,
+        health_interval_seconds: float = 10,
+        quotas: Optional[Mapping[WorkClass, float]] = None,
+        deadlines: Optional[Mapping[WorkClass, float]] = None,
+    ):
+        self.model = model
+        self.keep_alive = keep_alive
+        self.health_interval_seconds = health_interval_seconds
+        self.endpoints = [
+            OllamaEndpoint(host, max_concurrency, failure_threshold, open_seconds) for host in hosts
+        ]
+        capacity = max_concurrency * len(self.endpoints)
+        # Quotas are shares of the total capacity
+        self.gate = PriorityGate(
+            "llm",
+            capacity,
+            max_queue_depth,
+            quotas={c: max(1, int(capacity * share)) for c, share in (quotas or {}).items()},
+            deadlines=dict(deadlines or {}),
+        )
+        self._capacity: Optional[asyncio.Condition] = None
+        self._health_checker: Optional[asyncio.Task] = None
+
+    def _pick(self, model: str, exclude: Set[OllamaEndpoint]) -> Optional[OllamaEndpoint]:
+        candidates = [e for e in self.endpoints if e not in exclude]
+        healthy = [e for e in candidates if e.available]
+        if not healthy:
+            # Every remaining circuit is open: probe one instead of failing outright
+            healthy = candidates
+        free = [e for e in healthy if e.has_capacity]
+        if not free:
+            return None
+        return min(free, key=lambda e: (not e.has_model(model), e.outstanding))
+
+    async def _acquire(self, model: str, exclude: Set[OllamaEndpoint]) -> OllamaEndpoint:
+        if self._capacity is None:
+            self._capacity = asyncio.Condition()
+        async with self._capacity:
+            while True:
+                endpoint = self._pick(model, exclude)
+                if endpoint is not None:
+                    endpoint.outstanding += 1
+                    return endpoint
+                await self._capacity.wait()
+
+    async def _release(self, endpoint: OllamaEndpoint) -> None:
+        endpoint.outstanding -= 1
+        async with self._capacity:
+            # Waiters retrying after a failure exclude some hosts, so each one checks for itself
+            self._capacity.notify_all()
+
+    def _should_retry(self, endpoint: OllamaEndpoint, error: Exception, tried: Set[OllamaEndpoint]) -> bool:
+        if not _is_endpoint_failure(error):
+            return False
+        endpoint.record_failure(error)
+        tried.add(endpoint)
+        if len(tried) >= len(self.endpoints):
+            return False
+        logger.warning(f"Ollama endpoint {endpoint.host} failed ({error!r}), retrying on another host")
+        return True
+
+    async def _request(self, model: str, call: Callable[[Any], Awaitable[Any]]) -> Any:
+        """Run one non-streaming request on the best endpoint for `model`, failing over to other hosts"""
+        tried: Set[OllamaEndpoint] = set()
+        async with self.gate.slot():
+            while True:
+                endpoint = await self._acquire(model, tried)
+                try:
+                    response = await call(endpoint.client)
+                except Exception as e:
+                    if self._should_retry(endpoint, e, tried):
+                        continue
+                    raise
+                else:
+                    endpoint.record_success(model)
+                    return response
+                finally:
+                    await self._release(endpoint)
+
+    async def chat(self, messages: Sequence[Mapping[str, Any]], prompt_type: str = "other", **kwargs) -> Any:
+        """Run a chat completion without blocking the event loop; `prompt_type` labels its metrics"""
+        kwargs.setdefault("model", self.model)
+        kwargs.setdefault("keep_alive", self.keep_alive)
+        response = await self._request(kwargs["model"], lambda client: client.chat(messages=messages, **kwargs))
+        observe_llm_response(response, prompt_type)
+        return response
+
+    async def embed(self, texts: Sequence[str], model: str) -> List[List[float]]:
+        """Embed texts with an Ollama embedding model, one vector per text"""
+        response = await self._request(
+            model, lambda client: client.embed(model=model, input=list(texts), keep_alive=self.keep_alive)
+        )
+        return response["embeddings"]
+
+    async def chat_stream(self, messages: Sequence[Mapping[str, Any]], prompt_type: str = "other", **kwargs) -> AsyncIterator[Any]:
+        """Stream a chat completion chunk by chunk, holding a slot until it finishes"""
+        kwargs.setdefault("model", self.model)
+        kwargs.setdefault("keep_alive", self.keep_alive)
+        tried: Set[OllamaEndpoint] = set()
+        async with self.gate.slot():
+            while True:
+                endpoint = await self._acquire(kwargs["model"], tried)
+                streamed = False
+                response = await endpoint.client.chat(messages=messages, stream=True, **kwargs)
+                try:
+                    async for chunk in response:
+                        streamed = True
+                        if chunk.get("done"):
+                            observe_llm_response(chunk, prompt_type)
+                        yield chunk
+                except Exception as e:
+                    if not streamed and self._should_retry(endpoint, e, tried):
+                        continue
+                    raise
+                else:
+                    endpoint.record_success(kwargs["model"])
+                    return
+                finally:
+                    # Closing the HTTP stream early makes Ollama stop generating
+                    await response.aclose()
+                    await self._release(endpoint)
+
+    async def check_health(self) -> None:
+        """Refresh circuit state and loaded models for every endpoint"""
+        await asyncio.gather(*(e.refresh(timeout=self.health_interval_seconds) for e in self.endpoints))
+
+    async def _check_health_periodically(self) -> None:
+        while True:
+            await self.check_health()
+            await asyncio.sleep(self.health_interval_seconds)
+
+    def start(self) -> None:
+        if self._health_checker is None:
+            self._health_checker = asyncio.create_task(self._check_health_periodically())
+
+    async def close(self) -> None:
+        if self._health_checker is not None:
+            self._health_checker.cancel()
+            await asyncio.gather(self._health_checker, return_exceptions=True)
+            self._health_checker = None
+        for endpoint in self.endpoints:
+            # ollama.AsyncClient does not expose close(); shut down its httpx pool directly
+            await endpoint.client._client.aclose()
+
+    def status(self) -> List[dict]:
+        return [endpoint.status() for endpoint in self.endpoints]
+
+
+# Per-process transcription backend, set up by the pool initializer
+_worker_backend: Optional[TranscriptionBackend] = None
+
+
+def _init_transcription_worker(
+    backend_name: str,
+    model_size: str,
+    num_threads: int,
+    compute_type: str,
+    shared_model: Any = None,
+) -> None:
+    """Set up the transcription backend once inside each pool process.
+
+    `shared_model` is a model whose weights live in shared memory, handed over by
+    the parent; without it each worker loads its own copy.
+    """
+    global _worker_backend
+    _worker_backend = create_backend(backend_name, model_size, num_threads, compute_type)
+    if shared_model is not None:
+        _worker_backend.use_shared(shared_model)
+    else:
+        _worker_backend.load()
+
+
+def _worker_ready() -> int:
+    return os.getpid()
+
+
+def _transcribe_batch_in_worker(clips: List[AudioInput]) -> List[Union[str, Exception]]:
+    return _worker_backend.transcribe_batch(clips)
+
+
+class TranscriptionPool:
+    """Process pool that runs the transcription backend outside the event loop.
+
+    Each worker process runs its own model instance, so transcriptions run in
+    parallel across cores instead of contending for one model under the GIL. The
+    instances can share one set of weights in shared memory (see ModelRegistry).
+    """
+
+    def __init__(self, backend_name: str, model_size: str, max_workers: int, threads_per_worker: int, compute_type: str):
+        self.backend_name = backend_name
+        self.model_size = model_size
+        self.max_workers = max_workers
+        self.threads_per_worker = threads_per_worker
+        self.compute_type = compute_type
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def started(self) -> bool:
+        return self._executor is not None
+
+    async def start(self, shared_model: Any = None) -> None:
+        """Start every worker process and wait until each has its model loaded"""
+        if self._executor is not None:
+            return
+        # spawn, not fork: forking a process that has started torch threads can deadlock
+        executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_transcription_worker,
+            initargs=(self.backend_name, self.model_size, self.threads_per_worker, self.compute_type, shared_model),
+        )
+        loop = asyncio.get_running_loop()
+        try:
+            await asyncio.gather(*[
+                loop.run_in_executor(executor, _worker_ready) for _ in range(self.max_workers)
+            ])
+        except BaseException:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        self._executor = executor
+        logger.info(f"Started {self.backend_name} transcription pool with {self.max_workers} workers")
+
+    async def transcribe_batch(self, clips: List[AudioInput]) -> List[Union[str, Exception]]:
+        """Transcribe a batch of clips (file paths or 16 kHz float32 arrays) in one worker process"""
+        if self._executor is None:
+            raise RuntimeError("Transcription pool has not been started")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, _transcribe_batch_in_worker, clips)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+llm_client = LLMClient(
+    hosts=settings.ollama_host_list,
+    model=settings.ollama_model,
+    max_concurrency=settings.llm_max_concurrency,
+    max_queue_depth=settings.llm_max_queue_depth,
+    keep_alive=settings.ollama_keep_alive,
+    failure_threshold=settings.llm_failure_threshold,
+    open_seconds=settings.llm_circuit_open_seconds,
+    health_interval_seconds=settings.llm_health_interval_seconds,
+    quotas={WorkClass.SETUP: settings.llm_setup_share, WorkClass.OFFLINE: settings.llm_offline_share},
+    deadlines={
+        WorkClass.LIVE: settings.llm_live_deadline_seconds,
+        WorkClass.SETUP: settings.llm_setup_deadline_seconds,
+        WorkClass.OFFLINE: settings.llm_offline_deadline_seconds,
+    },
+)
+
+transcription_pool = TranscriptionPool(
+    backend_name=settings.transcription_backend,
+    model_size=settings.whisper_model,
+    max_workers=settings.transcription_workers,
+    threads_per_worker=settings.transcription_threads_per_worker,
+    compute_type=settings.whisper_compute_type,
+)
@@ -1,64 +1,136 @@
-from typing import List, Optional, Any
+from typing import Dict, List, Optional, Any, Awaitable, Callable
 from datetime import datetime
 from app.models.base_models import InterviewInput
 from app.services.document_parser import ResumeParser, JobPostParser
-import whisper
-from pathlib import Path
-import os
-import tempfile
+from app.services.inference import llm_client, InferenceOverloadedError
+from app.services.transcription_scheduler import transcription_scheduler
+from app.services.audio_stream import StreamingTranscriber, load_answer_audio, PCM_FORMAT, SAMPLE_RATE
+from app.services.json_stream import EvaluationStreamParser
+from app.services.cache import content_hash, document_text_cache, question_cache
+from app.services.prompt_builder import PromptBuilder, condense_document
+from app.services.metrics import observe_answer_evaluation, stage_timer
+from app.services.answer_scorer import NO_SPEECH, prescore_answer
+from app.services.response_parser import EVALUATION, QUESTIONS, ResponseParseError, complete_json, request_json, response_format
+import asyncio
 import logging
-import ollama
-import json
+from app.config import settings
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize whisper model
-try:
-    whisper_model = whisper.load_model("small")
-    logger.info("Whisper model loaded successfully")
-except Exception as e:
-    logger.error(f"Failed to load whisper model: {e}")
-    whisper_model = None
+# Bump when a prompt changes so cached question sets from the old prompt are not reused
+INITIAL_QUESTIONS_PROMPT_VERSION = "2"
+RECRUITER_QUESTIONS_PROMPT_VERSION = "2"
+
+# Stages of one question/answer turn, in order. Each is checkpointed with the
+# session so a reconnect resumes after the last completed stage.
+TURN_ASKED = "asked"
+TURN_AUDIO_RECEIVED = "audio_received"
+TURN_TRANSCRIBED = "transcribed"
+TURN_EVALUATED = "evaluated"
+_TURN_STAGES = (TURN_ASKED, TURN_AUDIO_RECEIVED, TURN_TRANSCRIBED, TURN_EVALUATED)
+
+async def parse_document(data: bytes, parser_cls, filename: Optional[str] = None) -> tuple[str, str]:
+    """Extract text from PDF bytes, reusing the cached text for previously seen files"""
+    digest = content_hash(data)
+    text = await document_text_cache.get(digest)
+    if text is None:
+        text = await asyncio.to_thread(parser_cls(data).parse)
+        await document_text_cache.set(digest, text)
+    else:
+        logger.info(f"Using cached text for {filename}")
+    return text, digest
 
-UPLOAD_DIR = Path(__file__).parent.parent.parent / "uploads"
-UPLOAD_DIR.mkdir(exist_ok=True)
 
 class InterviewSession:
+    # Thousands of live sessions are kept in memory; slots keep each one small
+    __slots__ = (
+        "session_id", "created_at",
+        "resume_text", "job_post_text", "resume_hash", "job_post_hash", "resume_summary", "job_post_summary",
+        "interview_questions", "current_question_index", "answers", "follow_up_questions", "is_completed",
+        "chat_history", "current_turn", "turns",
+        "_full_save", "_pending_set", "_pending_push", "_pending_inc", "_pending_pop",
+    )
+
     def __init__(self, session_id: str):
         self.session_id = session_id
         self.created_at = datetime.now()
         self.resume_text: Optional[str] = None
         self.job_post_text: Optional[str] = None
+        self.resume_hash: Optional[str] = None
+        self.job_post_hash: Optional[str] = None
+        # Token-budgeted versions of the documents used in every prompt
+        self.resume_summary: Optional[str] = None
+        self.job_post_summary: Optional[str] = None
         self.interview_questions: List[str] = []
         self.current_question_index: int = 0
         self.answers: List[str] = []
         self.follow_up_questions: List[str] = []
         self.is_completed: bool = False
         self.chat_history: List[dict] = []
+        # The turn in progress, and every evaluated turn with its transcript and evaluation
+        self.current_turn: Optional[Dict[str, Any]] = None
+        self.turns: List[dict] = []
+        # Changes not yet written to the database; a new session is saved in full
+        self._full_save = True
+        self._pending_set: set = set()
+        self._pending_push: Dict[str, List[Any]] = {}
+        self._pending_inc: Dict[str, int] = {}
+        self._pending_pop: Dict[str, int] = {}
 
-    def initialize_session(self, interview_input: InterviewInput) -> None:
+    async def initialize_session(self, interview_input: InterviewInput) -> None:
         """Initialize the session with resume and job post"""
         try:
-            resume_parser = ResumeParser(interview_input[0])
-            job_post_parser = JobPostParser(interview_input[1])
-            
-            self.resume_text = resume_parser.parse()
-            self.job_post_text = job_post_parser.parse()
+            self.resume_text, self.resume_hash = await self._parse_document(interview_input[0], ResumeParser)
+            self.job_post_text, self.job_post_hash = await self._parse_document(interview_input[1], JobPostParser)
+            await self.condense_documents()
             logger.info("Session initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize session: {e}")
             raise
 
-    def generate_recruiter_questions(self) -> Any:
+    async def _parse_document(self, upload, parser_cls) -> tuple[str, str]:
+        """Extract text from an upload, reusing the cached text for previously seen files"""
+        return await parse_document(await upload.read(), parser_cls, upload.filename)
+
+    async def condense_documents(self) -> None:
+        """Condense long documents once so later prompts stay a fixed size"""
+        try:
+            self.job_post_summary = await condense_document(llm_client, self.job_post_text, self.job_post_hash, "job post")
+            self.resume_summary = await condense_document(llm_client, self.resume_text, self.resume_hash, "resume")
+        except InferenceOverloadedError:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to condense documents, truncating instead: {e}")
+            limit = settings.prompt_document_token_budget * 4
+            self.job_post_summary = (self.job_post_text or "")[:limit]
+            self.resume_summary = (self.resume_text or "")[:limit]
+
+    @property
+    def prompt_builder(self) -> PromptBuilder:
+        return PromptBuilder(
+            self.job_post_summary or self.job_post_text,
+            self.resume_summary or self.resume_text,
+        )
+
+    def _question_cache_key(self, prompt_type: str, prompt_version: str) -> Optional[str]:
+        if not (self.job_post_hash and self.resume_hash):
+            return None
+        return ":".join([prompt_type, prompt_version, llm_client.model, self.job_post_hash, self.resume_hash])
+
+    async def generate_recruiter_questions(self) -> Any:
         """Generate initial questions based on resume and job post"""
+        cache_key = self._question_cache_key("recruiter", RECRUITER_QUESTIONS_PROMPT_VERSION)
+        if cache_key:
+            cached = await question_cache.get(cache_key)
+            if cached is not None:
+                logger.info("Using cached recruiter questions")
+                return cached
+
         try:
             # Prepare the context for the model
             context = f"""
-            Job Post: {self.job_post_text}
-            Candidate's Resume: {self.resume_text}
-            
             Generate a list of 10 - 15 interview questions in JSON format with the following structure:
             {{
                 "questions": [
@@ -79,27 +151,9 @@ class InterviewSession:
             - Any other key factors not explicitly mentioned in the job post.
             """
             
-            # Get questions from Ollama
-            response = ollama.chat(
-                model='deepseek-r1',
-                messages=[
-                    {
-                        'role': 'system',
-                        'content': 'You are an expert technical interviewer. Generate relevant interview questions based on the job requirements and candidate\'s background.'
-                    },
-                    {
-                        'role': 'user',
-                        'content': context
-                    }
-                ]
-            )
-            
-            # Parse the response
-            # print(response)
+            # Get questions from Ollama and parse the response
             try:
-                json_content = response['message']['content'].split('```json')[1].split('```')[0]
-                print(json_content)
-                questions_data = json.loads(json_content)
+                questions_data = await request_json(llm_client, self.prompt_builder.build(context), QUESTIONS, "recruiter")
                 logger.info(f"Generated {len(questions_data['questions'])} questions")
                 
                 # Extract just the questions from the structured data
@@ -109,13 +163,17 @@ class InterviewSession:
                 # for i, q in enumerate(questions, 1):
                 #     logger.info(f"Question {i}: {q}")
                 
+                if cache_key:
+                    await question_cache.set(cache_key, questions_data)
                 return questions_data
                 
-            except json.JSONDecodeError as e:
+            except ResponseParseError as e:
                 logger.error(f"Failed to parse Ollama response: {e}")
                 # Fallback to some default questions if parsing fails
                 return None
                 
+        except InferenceOverloadedError:
+            raise
         except Exception as e:
             logger.error(f"Error generating questions: {e}")
             # Return default questions in case of any error
@@ -123,14 +181,18 @@ class InterviewSession:
 
 
 
-    def generate_initial_questions(self) -> List[str]:
+    async def generate_initial_questions(self) -> List[str]:
         """Generate initial questions based on resume and job post"""
+        cache_key = self._question_cache_key("initial", INITIAL_QUESTIONS_PROMPT_VERSION)
+        if cache_key:
+            cached = await question_cache.get(cache_key)
+            if cached is not None:
+                logger.info("Using cached interview questions")
+                return list(cached)
+
         try:
             # Prepare the context for the model
             context = f"""
-            Job Post: {self.job_post_text}
-            Candidate's Resume: {self.resume_text}
-            
             Generate a list of 5 - 7 technical interview questions(not coding questions) in JSON format with the following structure:
             {{
                 "questions": [
@@ -151,27 +213,9 @@ class InterviewSession:
 
             """
             
-            # Get questions from Ollama
-            response = ollama.chat(
-                model='deepseek-r1',
-                messages=[
-                    {
-                        'role': 'system',
-                        'content': 'You are an expert technical interviewer. Generate relevant interview questions based on the job requirements and candidate\'s background.'
-                    },
-                    {
-                        'role': 'user',
-                        'content': context
-                    }
-                ]
-            )
-            
-            # Parse the response
-            # print(response)
+            # Get questions from Ollama and parse the response
             try:
-                json_content = response['message']['content'].split('```json')[1].split('```')[0]
-                print(json_content)
-                questions_data = json.loads(json_content)
+                questions_data = await request_json(llm_client, self.prompt_builder.build(context), QUESTIONS, "initial")
                 logger.info(f"Generated {len(questions_data['questions'])} questions")
                 
                 # Extract just the questions from the structured data
@@ -181,9 +225,11 @@ class InterviewSession:
                 for i, q in enumerate(questions, 1):
                     logger.info(f"Question {i}: {q}")
                 
+                if cache_key:
+                    await question_cache.set(cache_key, questions)
                 return questions
                 
-            except json.JSONDecodeError as e:
+            except ResponseParseError as e:
                 logger.error(f"Failed to parse Ollama response: {e}")
                 # Fallback to some default questions if parsing fails
                 return [
@@ -194,6 +240,8 @@ class InterviewSession:
                     "How do you stay updated with the latest technologies in your field?"
                 ]
                 
+        except InferenceOverloadedError:
+            raise
         except Exception as e:
             logger.error(f"Error generating questions: {e}")
             # Return default questions in case of any error
@@ -208,43 +256,173 @@ class InterviewSession:
     def add_question(self, question: str) -> None:
         """Add a new interview question"""
         self.interview_questions.append(question)
+        self._record_push("interview_questions", question)
 
     def add_follow_up_question(self, question: str) -> None:
         """Add a follow-up question"""
         self.follow_up_questions.append(question)
+        self._record_push("follow_up_questions", question)
 
-    def process_answer(self, answer: bytes) -> str:
-        """Process the candidate's answer from audio bytes to text"""
-        if not whisper_model:
-            raise RuntimeError("Whisper model not loaded")
+    def pop_follow_up_question(self) -> str:
+        """Remove and return the next pending follow-up question"""
+        question = self.follow_up_questions.pop(0)
+        self._pending_pop["follow_up_questions"] = self._pending_pop.get("follow_up_questions", 0) + 1
+        return question
 
-        try:
-            # Create a temporary file with a unique name
-            with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_file:
-                temp_file.write(answer)
-                temp_file_path = temp_file.name
+    def record_answer(self, answer: str) -> None:
+        """Store the accepted answer to the current question and move to the next one"""
+        self.answers.append(answer)
+        self._record_push("answers", answer)
+        self.current_question_index += 1
+        self._pending_inc["current_question_index"] = self._pending_inc.get("current_question_index", 0) + 1
+
+    def begin_turn(self) -> Optional[Dict[str, Any]]:
+        """Return the turn in progress, or start the next one (pending follow-up first); None when no questions are left"""
+        if self.current_turn is not None:
+            return self.current_turn
+        if self.follow_up_questions:
+            kind, question = "follow_up", self.pop_follow_up_question()
+        elif self.current_question_index < len(self.interview_questions):
+            kind, question = "question", self.interview_questions[self.current_question_index]
+        else:
+            return None
+        # Live reads only load the last finished turn, so count on from it
+        last = self.turns[-1] if self.turns else {}
+        follow_ups = last.get("follow_ups", 0) if last.get("question_index") == self.current_question_index else 0
+        self.current_turn = {
+            "number": last.get("number", 0) + 1,
+            "kind": kind,
+            "question": question,
+            "question_index": self.current_question_index,
+            # Follow-ups asked on this question so far, including this turn
+            "follow_ups": follow_ups + (kind == "follow_up"),
+            "state": TURN_ASKED,
+            "transcript": None,
+            "evaluation": None,
+        }
+        self.mark_dirty("current_turn")
+        return self.current_turn
+
+    def _advance_turn(self, state: str) -> bool:
+        """Move the current turn forward to `state`; False if it is already there or past it"""
+        turn = self.current_turn
+        if turn is None or _TURN_STAGES.index(turn["state"]) >= _TURN_STAGES.index(state):
+            return False
+        turn["state"] = state
+        self.mark_dirty("current_turn")
+        return True
+
+    def mark_audio_received(self) -> None:
+        """The whole answer has arrived and is being transcribed"""
+        self._advance_turn(TURN_AUDIO_RECEIVED)
+
+    def record_transcript(self, transcript: str) -> None:
+        """Checkpoint the answer's transcript so it is never transcribed again"""
+        if not self._advance_turn(TURN_TRANSCRIBED):
+            return
+        self.current_turn["transcript"] = transcript
+        self.add_to_chat_history("assistant", self.current_turn["question"])
+        self.add_to_chat_history("user", transcript)
 
-            logger.info(f"Processing audio file: {temp_file_path}")
+    def can_follow_up(self) -> bool:
+        """False once the current question has had `evaluation_max_follow_ups` follow-ups"""
+        turn = self.current_turn
+        return turn is None or turn.get("follow_ups", 0) < settings.evaluation_max_follow_ups
+
+    def record_evaluation(self, is_satisfactory: bool, follow_up: Optional[str]) -> None:
+        """Finish the current turn: queue the follow-up, or accept the answer and move to the next question.
+
+        An insufficient answer is accepted anyway once the question has had its
+        follow-ups, so a terse candidate is not asked to elaborate forever. All
+        effects are part of the same save as the finished turn, so they are
+        applied exactly once even if the connection drops right after.
+        """
+        turn = self.current_turn
+        if turn is None:
+            return
+        follow_up_limit_reached = not is_satisfactory and not self.can_follow_up()
+        if not self._advance_turn(TURN_EVALUATED):
+            return
+        turn["evaluation"] = {"is_satisfactory": is_satisfactory, "follow_up_question": follow_up}
+        if follow_up_limit_reached:
+            turn["evaluation"]["follow_up_limit_reached"] = True
+        if not is_satisfactory and not follow_up_limit_reached:
+            self.add_follow_up_question(follow_up)
+        elif turn["kind"] == "question" or follow_up_limit_reached:
+            self.record_answer(turn["transcript"])
+            if self.current_question_index >= len(self.interview_questions):
+                self.mark_completed()
+        self.turns.append(turn)
+        self._record_push("turns", turn)
+        self.current_turn = None
+
+    def mark_completed(self) -> None:
+        self.is_completed = True
+        self.mark_dirty("is_completed")
+
+    async def process_answer(self, answer: bytes) -> str:
+        """Process the candidate's answer from audio bytes to text"""
+        try:
+            # Decode in memory (no temporary files) and trim to the speech
+            with stage_timer("audio_decode", self.session_id):
+                audio = await load_answer_audio(answer)
+            logger.info(f"Processing audio of {len(audio) / SAMPLE_RATE:.1f}s")
             
-            # Transcribe the audio
-            result = whisper_model.transcribe(temp_file_path)
-            transcript = result.get("text", "").strip()
+            # Transcribe the audio, batched with other sessions' pending answers
+            with stage_timer("transcription", self.session_id):
+                transcript = await transcription_scheduler.transcribe(audio)
             
             logger.info(f"Transcription completed: {transcript[:100]}...")
             
-            # Clean up the temporary file
-            os.unlink(temp_file_path)
-            
-            return transcript if transcript else "No speech detected"
+            return transcript if transcript else NO_SPEECH
             
         except Exception as e:
             logger.error(f"Error processing audio: {e}")
             raise
 
-    def evaluate_answer(self, answer: str) -> tuple[bool, Optional[str]]:
-        """Evaluate the candidate's answer and determine if follow-up is needed"""
+    async def open_audio_stream(
+        self,
+        audio_format: str = PCM_FORMAT,
+        sample_rate: int = SAMPLE_RATE,
+        on_partial_transcript: Optional[Callable[[str], None]] = None
+    ) -> StreamingTranscriber:
+        """Start incremental transcription of an answer streamed in chunks"""
+        stream = StreamingTranscriber(transcription_scheduler, audio_format, sample_rate, on_partial_transcript)
+        await stream.start()
+        return stream
+
+    async def evaluate_answer(
+        self,
+        answer: str,
+        on_follow_up_delta: Optional[Callable[[str], Awaitable[None]]] = None
+    ) -> tuple[bool, Optional[str]]:
+        """Evaluate the candidate's answer and determine if follow-up is needed (see score_answer)"""
+        is_satisfactory, follow_up, tier = await self.score_answer(answer, on_follow_up_delta)
+        if tier is not None:
+            observe_answer_evaluation(tier, is_satisfactory)
+        return is_satisfactory, follow_up
+
+    async def score_answer(
+        self,
+        answer: str,
+        on_follow_up_delta: Optional[Callable[[str], Awaitable[None]]] = None
+    ) -> tuple[bool, Optional[str], Optional[str]]:
+        """Evaluate an answer without recording metrics; also returns the tier that decided (None on error).
+
+        Clear cases are decided by the local pre-scorer without calling the LLM.
+        Otherwise the response is streamed; once the answer is known to be unsatisfactory,
+        each new piece of the follow-up question is passed to `on_follow_up_delta`.
+        """
         try:
             current_question = self.interview_questions[self.current_question_index]
+
+            verdict = await prescore_answer(current_question, answer, self.job_post_summary or self.job_post_text)
+            if verdict is not None:
+                is_satisfactory, follow_up, tier = verdict
+                if on_follow_up_delta and follow_up:
+                    await on_follow_up_delta(follow_up)
+                logger.info(f"Pre-scored answer: is_satisfactory={is_satisfactory}")
+                return is_satisfactory, follow_up, tier
             
             # Prepare the context for the model
             context = f"""
@@ -265,51 +443,116 @@ class InterviewSession:
             4. The candidate's answer should be relevant to the job post.
             """
             
-            # Get evaluation from Ollama
-            response = ollama.chat(
-                model='deepseek-r1',
-                messages=[
-                    {
-                        'role': 'system',
-                        'content': 'You are an expert technical interviewer. Evaluate the candidate\'s answer and provide structured feedback.'
-                    },
-                    {
-                        'role': 'user',
-                        'content': context
-                    }
-                ]
-            )
-            
-            # Parse the response
-            # print(response)
+            # Stream evaluation from Ollama
+            parser = EvaluationStreamParser()
+            sent = 0
+            messages = self.prompt_builder.build(context)
+            stream = llm_client.chat_stream(messages=messages, format=response_format(EVALUATION), prompt_type="evaluation")
             try:
-                json_content = response['message']['content'].split('```json')[1].split('```')[0]
-                print(json_content)
-                evaluation = json.loads(json_content)
-                logger.info(f"Evaluation result: {evaluation}")
-
-                if evaluation['is_satisfactory'] == 'false' or evaluation['is_satisfactory'] == False:
-                    is_satisfactory = False
-                else:
-                    is_satisfactory = True
-                
-                return is_satisfactory, evaluation['follow_up_question']
-            except json.JSONDecodeError as e:
-                logger.error(f"Failed to parse Ollama response: {e}")
-                return True, None
+                async for chunk in stream:
+                    parser.feed(chunk['message']['content'])
+                    if on_follow_up_delta and parser.is_satisfactory is False and len(parser.follow_up_question) > sent:
+                        await on_follow_up_delta(parser.follow_up_question[sent:])
+                        sent = len(parser.follow_up_question)
+                    if parser.complete:
+                        # Everything after the JSON object is ignored, so stop generating
+                        break
+            finally:
+                await stream.aclose()
+
+            # Fields the stream delivered intact; anything else is asked for again
+            result: Dict[str, Any] = {}
+            if parser.is_satisfactory is not None:
+                result["is_satisfactory"] = parser.is_satisfactory
+            if parser.follow_up_complete:
+                result["follow_up_question"] = parser.follow_up_question or None
+            if EVALUATION.missing(result):
+                result = await complete_json(llm_client, messages, parser.text, EVALUATION, "evaluation", result)
+
+            is_satisfactory = result["is_satisfactory"]
+            follow_up = None if is_satisfactory else result["follow_up_question"]
+            if on_follow_up_delta and follow_up and sent < len(follow_up) and follow_up.startswith(parser.follow_up_question[:sent]):
+                await on_follow_up_delta(follow_up[sent:])
+
+            logger.info(f"Evaluation result: is_satisfactory={is_satisfactory}, follow_up={follow_up!r}")
+            return is_satisfactory, follow_up, "llm"
                 
+        except InferenceOverloadedError:
+            raise
         except Exception as e:
             logger.error(f"Error evaluating answer: {e}")
-            print(response)
-            return True, None
+            return True, None, None
 
     def add_to_chat_history(self, role: str, content: str) -> None:
         """Add a message to the chat history"""
-        self.chat_history.append({
+        entry = {
             "role": role,
             "content": content,
             "timestamp": datetime.now().isoformat()
-        })
+        }
+        self.chat_history.append(entry)
+        self._record_push("chat_history", entry)
+
+    def mark_dirty(self, field: str) -> None:
+        """Flag a field that was modified directly so it is rewritten on the next save"""
+        self._pending_set.add(field)
+
+    def _record_push(self, field: str, item: Any) -> None:
+        self._pending_push.setdefault(field, []).append(item)
+
+    def pop_changes(self) -> dict:
+        """Return a MongoDB update for everything changed since the last save, and reset tracking.
+
+        Appends become $push, counters $inc, and front removals $pop. A field touched by
+        more than one kind of operation is rewritten with $set, since MongoDB rejects
+        conflicting operators on the same path.
+        """
+        if self._full_save:
+            doc = self.to_dict()
+            doc.pop("session_id")
+            update = {"$set": doc}
+        else:
+            set_fields = set(self._pending_set)
+            touched: Dict[str, int] = {}
+            for ops in (self._pending_push, self._pending_inc, self._pending_pop):
+                for field in ops:
+                    touched[field] = touched.get(field, 0) + 1
+            set_fields.update(field for field, count in touched.items() if count > 1)
+            set_fields.update(field for field, count in self._pending_pop.items() if count > 1)
+
+            update: dict = {}
+            if set_fields:
+                update["$set"] = {field: getattr(self, field) for field in set_fields}
+            push = {f: {"$each": items} for f, items in self._pending_push.items() if f not in set_fields}
+            if push:
+                update["$push"] = push
+            inc = {f: n for f, n in self._pending_inc.items() if f not in set_fields}
+            if inc:
+                update["$inc"] = inc
+            pop = {f: -1 for f in self._pending_pop if f not in set_fields}
+            if pop:
+                update["$pop"] = pop
+
+        self._full_save = False
+        self._pending_set.clear()
+        self._pending_push.clear()
+        self._pending_inc.clear()
+        self._pending_pop.clear()
+        return update
+
+    def require_full_save(self) -> None:
+        """Rewrite the whole session on the next save"""
+        self._full_save = True
+
+    def restore_changes(self, update: dict) -> None:
+        """Put back an update from pop_changes that failed to write, so it is retried with later changes"""
+        self._pending_set.update(update.get("$set", {}))
+        for field, push in update.get("$push", {}).items():
+            self._pending_push[field] = push["$each"] + self._pending_push.get(field, [])
+        for field, count in update.get("$inc", {}).items():
+            self._pending_inc[field] = self._pending_inc.get(field, 0) + count
+        for field in update.get("$pop", {}):
+            self._pending_pop[field] = self._pending_pop.get(field, 0) + 1
 
     def to_dict(self) -> dict:
         """Convert session to dictionary for storage"""
@@ -318,25 +561,43 @@ class InterviewSession:
             "created_at": self.created_at.isoformat(),
             "resume_text": self.resume_text,
             "job_post_text": self.job_post_text,
+            "resume_hash": self.resume_hash,
+            "job_post_hash": self.job_post_hash,
+            "resume_summary": self.resume_summary,
+            "job_post_summary": self.job_post_summary,
             "interview_questions": self.interview_questions,
             "current_question_index": self.current_question_index,
             "answers": self.answers,
             "follow_up_questions": self.follow_up_questions,
             "is_completed": self.is_completed,
-            "chat_history": self.chat_history
+            "chat_history": self.chat_history,
+            "current_turn": self.current_turn,
+            "turns": self.turns
         }
 
     @classmethod
     def from_dict(cls, data: dict) -> 'InterviewSession':
-        """Create a session instance from dictionary"""
+        """Create a session instance from dictionary.
+
+        `data` may be a projection without the append-only history fields
+        (answers, chat_history, older turns); those are only ever appended to,
+        so the session can still be saved.
+        """
         session = cls(data["session_id"])
         session.created_at = datetime.fromisoformat(data["created_at"])
-        session.resume_text = data["resume_text"]
-        session.job_post_text = data["job_post_text"]
+        session.resume_text = data.get("resume_text")
+        session.job_post_text = data.get("job_post_text")
+        session.resume_hash = data.get("resume_hash")
+        session.job_post_hash = data.get("job_post_hash")
+        session.resume_summary = data.get("resume_summary")
+        session.job_post_summary = data.get("job_post_summary")
         session.interview_questions = data["interview_questions"]
         session.current_question_index = data["current_question_index"]
-        session.answers = data["answers"]
+        session.answers = data.get("answers", [])
         session.follow_up_questions = data["follow_up_questions"]
         session.is_completed = data["is_completed"]
-        session.chat_history = data["chat_history"]
+        session.chat_history = data.get("chat_history", [])
+        session.current_turn = data.get("current_turn")
+        session.turns = data.get("turns", [])
+        session._full_save = False
         return session 
\ No newline at end of file
@@ -0,0 +1,139 @@
+from typing import List, Optional
+
+THINK_OPEN = "<think>"
+THINK_CLOSE = "</think>"
+
+_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+
+class EvaluationStreamParser:
+    """Incrementally extracts evaluation fields from a streamed LLM response.
+
+    Skips a leading <think>...</think> reasoning block, then scans the first JSON
+    object character by character. `is_satisfactory` is available as soon as its
+    literal is complete, and `follow_up_question` grows while its string is still
+    being generated, so callers can forward it before the response finishes.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.is_satisfactory: Optional[bool] = None
+        self.follow_up_question = ""
+        self.follow_up_complete = False
+        self.complete = False
+        self._pos = 0
+        self._in_think: Optional[bool] = None
+        self._depth = 0
+        self._expect_key = True
+        self._key: Optional[str] = None
+        self._in_string = False
+        self._string_is_key = False
+        self._chars: List[str] = []
+        self._escape = False
+        self._unicode: Optional[str] = None
+        self._literal: List[str] = []
+
+    def feed(self, chunk: str) -> None:
+        """Consume the next piece of streamed content"""
+        self.text += chunk
+        while self._pos < len(self.text) and not self.complete:
+            if not self._skip_prelude():
+                return
+            self._step(self.text[self._pos])
+            self._pos += 1
+
+    def _skip_prelude(self) -> bool:
+        """Advance past reasoning and any text before the JSON object; False means wait for more input"""
+        if self._depth > 0:
+            return True
+        if self._in_think is None:
+            stripped = self.text.lstrip()
+            if len(stripped) < len(THINK_OPEN) and THINK_OPEN.startswith(stripped):
+                return False
+            self._in_think = stripped.startswith(THINK_OPEN)
+        if self._in_think:
+            end = self.text.find(THINK_CLOSE, self._pos)
+            if end == -1:
+                # Keep a tail so a closing tag split across chunks is still found
+                self._pos = max(self._pos, len(self.text) - len(THINK_CLOSE))
+                return False
+            self._pos = end + len(THINK_CLOSE)
+            self._in_think = False
+        start = self.text.find("{", self._pos)
+        if start == -1:
+            self._pos = len(self.text)
+            return False
+        self._pos = start
+        return True
+
+    def _step(self, c: str) -> None:
+        if self._in_string:
+            self._step_string(c)
+        elif c == '"':
+            self._in_string = True
+            self._string_is_key = self._depth == 1 and self._expect_key
+            self._chars = []
+        elif c in "{[":
+            self._depth += 1
+        elif c in "}]":
+            if self._depth == 1:
+                self._finish_literal()
+            self._depth -= 1
+            if self._depth == 0:
+                self.complete = True
+        elif self._depth == 1:
+            if c == ":":
+                self._expect_key = False
+            elif c == ",":
+                self._finish_literal()
+                self._expect_key = True
+            elif not c.isspace():
+                self._literal.append(c)
+
+    def _step_string(self, c: str) -> None:
+        if self._unicode is not None:
+            self._unicode += c
+            if len(self._unicode) == 4:
+                self._append_char(chr(int(self._unicode, 16)))
+                self._unicode = None
+        elif self._escape:
+            self._escape = False
+            if c == "u":
+                self._unicode = ""
+            else:
+                self._append_char(_ESCAPES.get(c, c))
+        elif c == "\\":
+            self._escape = True
+        elif c == '"':
+            self._in_string = False
+            self._finish_string("".join(self._chars))
+        else:
+            self._append_char(c)
+
+    def _append_char(self, c: str) -> None:
+        self._chars.append(c)
+        if self._is_follow_up_value():
+            self.follow_up_question += c
+
+    def _is_follow_up_value(self) -> bool:
+        return self._depth == 1 and not self._string_is_key and self._key == "follow_up_question"
+
+    def _finish_string(self, value: str) -> None:
+        if self._depth != 1:
+            return
+        if self._string_is_key:
+            self._key = value
+        elif self._key == "follow_up_question":
+            self.follow_up_complete = True
+        elif self._key == "is_satisfactory":
+            self.is_satisfactory = value.strip().lower() != "false"
+
+    def _finish_literal(self) -> None:
+        literal = "".join(self._literal)
+        self._literal = []
+        if not literal:
+            return
+        if self._key == "is_satisfactory":
+            self.is_satisfactory = literal.lower() != "false"
+        elif self._key == "follow_up_question":
+            self.follow_up_complete = True
@@ -0,0 +1,112 @@
+from typing import Any, Iterator, Optional
+from contextlib import contextmanager, nullcontext
+import logging
+import time
+from prometheus_client import Counter, Gauge, Histogram
+from app.config import settings
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+try:
+    from opentelemetry import trace
+except ImportError:
+    trace = None
+
+if settings.otel_enabled and trace is None:
+    logger.warning("OTEL_ENABLED is set but opentelemetry is not installed; tracing is disabled")
+
+# Spans go to whatever tracer provider is configured (e.g. by opentelemetry-instrument)
+_tracer = trace.get_tracer("ai_interview_agent") if settings.otel_enabled and trace is not None else None
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+STAGE_SECONDS = Histogram(
+    "interview_stage_seconds",
+    "Time spent in each stage of an interview turn",
+    ["stage"],
+    buckets=_LATENCY_BUCKETS,
+)
+TURN_SECONDS = Histogram(
+    "interview_turn_seconds",
+    "Time the candidate waits between finishing an answer and receiving the next message",
+    buckets=_LATENCY_BUCKETS,
+)
+LLM_SECONDS = Histogram(
+    "llm_duration_seconds",
+    "Ollama prompt evaluation and generation time, as reported by Ollama",
+    ["prompt_type", "phase"],
+    buckets=_LATENCY_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total",
+    "Tokens evaluated (prompt) and generated (completion) by Ollama",
+    ["prompt_type", "phase"],
+)
+LLM_PARSE_FAILURES = Counter(
+    "llm_parse_failures_total",
+    "LLM replies missing required JSON fields (including ones repaired by a retry)",
+    ["prompt_type"],
+)
+LLM_PARSE_GIVEUPS = Counter(
+    "llm_parse_giveups_total",
+    "LLM replies still incomplete after all retries",
+    ["prompt_type"],
+)
+ANSWER_EVALUATIONS = Counter(
+    "answer_evaluations_total",
+    "Answer evaluations by the tier that decided them (heuristic, embedding or llm) and the result",
+    ["tier", "result"],
+)
+INFERENCE_REJECTIONS = Counter(
+    "inference_rejections_total",
+    "Inference requests turned away by admission control",
+    ["gate", "work_class", "reason"],
+)
+SPECULATION_RESULTS = Counter(
+    "speculative_evaluations_total",
+    "Speculative evaluations that were used (hit) or discarded (miss)",
+    ["result"],
+)
+
+# Set to callbacks by main.py, so they are read at scrape time
+ACTIVE_WEBSOCKETS = Gauge("active_websockets", "Open interview WebSocket connections")
+SESSIONS_IN_MEMORY = Gauge("sessions_in_memory", "Sessions held by the in-process session store")
+LLM_QUEUE_DEPTH = Gauge("llm_queue_depth", "LLM requests waiting for a slot", ["work_class"])
+LLM_IN_FLIGHT = Gauge("llm_in_flight", "LLM requests being processed")
+TRANSCRIPTION_QUEUE_DEPTH = Gauge("transcription_queue_depth", "Audio clips waiting to be transcribed")
+
+
+@contextmanager
+def stage_timer(stage: str, session_id: Optional[str] = None) -> Iterator[None]:
+    """Time a block into interview_stage_seconds, and trace it when OpenTelemetry is enabled"""
+    span = (
+        _tracer.start_as_current_span(stage, attributes={"session_id": session_id} if session_id else None)
+        if _tracer is not None else nullcontext()
+    )
+    start = time.perf_counter()
+    with span:
+        try:
+            yield
+        finally:
+            STAGE_SECONDS.labels(stage).observe(time.perf_counter() - start)
+
+
+def observe_answer_evaluation(tier: str, is_satisfactory: bool) -> None:
+    """Count an evaluation whose result is used for a turn, by the tier that decided it"""
+    ANSWER_EVALUATIONS.labels(tier, "satisfactory" if is_satisfactory else "insufficient").inc()
+
+
+def observe_llm_response(response: Any, prompt_type: str) -> None:
+    """Record Ollama's own timings from a final chat response (durations are in nanoseconds)"""
+    for phase, duration_field, count_field in (
+        ("prompt_eval", "prompt_eval_duration", "prompt_eval_count"),
+        ("generation", "eval_duration", "eval_count"),
+    ):
+        duration = response.get(duration_field)
+        if duration:
+            LLM_SECONDS.labels(prompt_type, phase).observe(duration / 1e9)
+        count = response.get(count_field)
+        if count:
+            LLM_TOKENS.labels(prompt_type, phase).inc(count)
@@ -0,0 +1,88 @@
+from typing import Any, Optional
+import asyncio
+import logging
+import time
+from app.config import settings
+from app.services.inference import TranscriptionPool, transcription_pool
+from app.services.transcription_backends import create_backend
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """Loads heavy models on demand or in a background warmup and reports readiness.
+
+    Nothing is imported or loaded at module import time, so non-audio routes are
+    served immediately. Whisper is loaded on the first transcription, or earlier
+    by `start_warmup()`, or before workers fork by `preload()` (e.g. under
+    `gunicorn --preload`, so forked app workers inherit the shared weights).
+    """
+
+    def __init__(self, pool: TranscriptionPool, share_weights: bool):
+        self.pool = pool
+        self.backend = create_backend(pool.backend_name, pool.model_size, pool.threads_per_worker, pool.compute_type)
+        # Only backends built on torch modules can hand out shared-memory weights
+        self.share_weights = share_weights and self.backend.supports_shared_weights
+        self.whisper_state = "not_loaded"
+        self.whisper_error: Optional[str] = None
+        self._shared_model: Any = None
+        self._loading: Optional[asyncio.Task] = None
+        self._warmup: Optional[asyncio.Task] = None
+
+    @property
+    def whisper_ready(self) -> bool:
+        return self.whisper_state == "ready"
+
+    def preload(self) -> None:
+        """Load shared whisper weights synchronously in the current process"""
+        if self.share_weights and self._shared_model is None:
+            self._shared_model = self.backend.load_shared()
+            logger.info("Whisper weights preloaded into shared memory")
+
+    async def ensure_whisper(self) -> None:
+        """Make sure the transcription pool is running, loading whisper if needed"""
+        if self.whisper_ready:
+            return
+        if self._loading is None or (self._loading.done() and self.whisper_state == "failed"):
+            self._loading = asyncio.create_task(self._load_whisper())
+        await asyncio.shield(self._loading)
+
+    async def _load_whisper(self) -> None:
+        self.whisper_state = "loading"
+        self.whisper_error = None
+        started = time.perf_counter()
+        try:
+            if self.share_weights and self._shared_model is None:
+                self._shared_model = await asyncio.to_thread(self.backend.load_shared)
+            await self.pool.start(self._shared_model)
+        except Exception as e:
+            self.whisper_state = "failed"
+            self.whisper_error = str(e)
+            logger.error(f"Failed to load whisper model: {e}")
+            raise
+        self.whisper_state = "ready"
+        logger.info(f"{self.backend.name} {self.pool.model_size} model ready in {time.perf_counter() - started:.1f}s")
+
+    def start_warmup(self) -> None:
+        """Load models in the background without delaying startup"""
+        if self._warmup is None:
+            self._warmup = asyncio.create_task(self._run_warmup())
+
+    async def _run_warmup(self) -> None:
+        try:
+            await self.ensure_whisper()
+        except Exception:
+            # Already logged; the next transcription retries the load
+            pass
+
+    async def shutdown(self) -> None:
+        for task in (self._warmup, self._loading):
+            if task is not None and not task.done():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        self.pool.shutdown()
+
+
+model_registry = ModelRegistry(transcription_pool, share_weights=settings.whisper_share_weights)
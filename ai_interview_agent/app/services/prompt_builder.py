@@ -0,0 +1,100 @@
+from typing import List, Optional
+import logging
+import re
+from app.config import settings
+from app.services.cache import document_text_cache
+from app.services.inference import LLMClient
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Shared by every call in a session, so all of them start with the same tokens
+SYSTEM_PROMPT = (
+    "You are an expert technical interviewer. You generate interview questions and "
+    "evaluate a candidate's answers based on the job requirements and the candidate's background. "
+    "When asked for JSON, reply with a single ```json fenced block."
+)
+
+# Bump when the condensing prompt changes so cached summaries are not reused
+SUMMARY_PROMPT_VERSION = "1"
+
+_THINK_BLOCK = re.compile(r"<think>.*?</think>", re.DOTALL)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English text)"""
+    return len(text) // 4
+
+
+def strip_reasoning(content: str) -> str:
+    """Remove a <think>...</think> reasoning block from a model reply"""
+    return _THINK_BLOCK.sub("", content).strip()
+
+
+class PromptBuilder:
+    """Builds chat messages that share one fixed prefix per session.
+
+    The system prompt and the session's document context always come first and
+    are byte-identical across calls, so Ollama can reuse the KV cache for that
+    prefix and only has to evaluate the task-specific tail of each prompt.
+    """
+
+    def __init__(self, job_post_context: Optional[str], resume_context: Optional[str]):
+        self.job_post_context = job_post_context or ""
+        self.resume_context = resume_context or ""
+
+    def context_messages(self) -> List[dict]:
+        return [
+            {'role': 'system', 'content': SYSTEM_PROMPT},
+            {
+                'role': 'user',
+                'content': f"Job Post:\n{self.job_post_context}\n\nCandidate's Resume:\n{self.resume_context}"
+            },
+            {'role': 'assistant', 'content': "I have read the job post and the candidate's resume."},
+        ]
+
+    def build(self, task: str) -> List[dict]:
+        """Messages for one call: the shared prefix followed by the task"""
+        return self.context_messages() + [{'role': 'user', 'content': task}]
+
+
+async def condense_document(llm: LLMClient, text: Optional[str], digest: Optional[str], kind: str) -> Optional[str]:
+    """Summarise a long document to the configured token budget, once per unique document.
+
+    Short documents are returned unchanged. Summaries are cached by the document's
+    content hash, so a job post shared by many candidates is condensed only once.
+    """
+    budget = settings.prompt_document_token_budget
+    if not text or estimate_tokens(text) <= budget:
+        return text
+
+    cache_key = f"summary:{SUMMARY_PROMPT_VERSION}:{llm.model}:{budget}:{digest}" if digest else None
+    if cache_key:
+        cached = await document_text_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    words = budget * 3 // 4
+    response = await llm.chat(
+        messages=[
+            {'role': 'system', 'content': SYSTEM_PROMPT},
+            {
+                'role': 'user',
+                'content': (
+                    f"Condense the following {kind} to at most {words} words of plain text. "
+                    "Keep every skill, technology, responsibility, requirement, employer, role and "
+                    "duration that matters for a technical interview; drop formatting, contact "
+                    f"details and boilerplate. Reply with the condensed text only.\n\n{text}"
+                )
+            },
+        ],
+        prompt_type="condense",
+    )
+    summary = strip_reasoning(response['message']['content'])
+    if not summary:
+        return text
+    logger.info(f"Condensed {kind} from ~{estimate_tokens(text)} to ~{estimate_tokens(summary)} tokens")
+    if cache_key:
+        await document_text_cache.set(cache_key, summary)
+    return summary
@@ -0,0 +1,194 @@
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence
+import json
+import logging
+from app.config import settings
+from app.services.inference import LLMClient
+from app.services.json_stream import THINK_CLOSE, THINK_OPEN
+from app.services.metrics import LLM_PARSE_FAILURES, LLM_PARSE_GIVEUPS, stage_timer
+from app.services.prompt_builder import strip_reasoning
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_decoder = json.JSONDecoder()
+
+
+class ResponseParseError(ValueError):
+    """The model's reply did not contain the expected JSON, even after retrying"""
+
+
+class ResponseSpec:
+    """Expected JSON reply for one kind of prompt.
+
+    `schema` is passed to Ollama's `format=` so the model is constrained to it,
+    and `validators` decide per top-level field whether the parsed value is
+    usable (they receive the whole object, so fields can depend on each other).
+    """
+
+    def __init__(self, schema: dict, validators: Dict[str, Callable[[dict], bool]]):
+        self.schema = schema
+        self.validators = validators
+
+    def missing(self, data: Mapping[str, Any]) -> List[str]:
+        """Fields that are absent or invalid"""
+        return [field for field, valid in self.validators.items() if not valid(data)]
+
+    def subschema(self, fields: Sequence[str]) -> dict:
+        """Schema for an object that holds only `fields`"""
+        properties = self.schema["properties"]
+        return {
+            "type": "object",
+            "properties": {field: properties[field] for field in fields},
+            "required": list(fields),
+        }
+
+
+def _is_question_list(data: dict) -> bool:
+    questions = data.get("questions")
+    return bool(questions) and isinstance(questions, list) and all(
+        isinstance(q, dict) and isinstance(q.get("question"), str) and q["question"].strip()
+        for q in questions
+    )
+
+
+def _is_follow_up(data: dict) -> bool:
+    # A follow-up is only needed when the answer was not satisfactory
+    if data.get("is_satisfactory") is not False:
+        return True
+    follow_up = data.get("follow_up_question")
+    return isinstance(follow_up, str) and bool(follow_up.strip())
+
+
+QUESTIONS = ResponseSpec(
+    schema={
+        "type": "object",
+        "properties": {
+            "questions": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "question": {"type": "string"},
+                        "category": {"type": "string"},
+                        "difficulty": {"type": "string", "enum": ["easy", "medium", "hard"]},
+                        "purpose": {"type": "string"},
+                    },
+                    "required": ["question", "category", "difficulty", "purpose"],
+                },
+            },
+        },
+        "required": ["questions"],
+    },
+    validators={"questions": _is_question_list},
+)
+
+# Field order matters: is_satisfactory is generated first so it can be acted on while streaming
+EVALUATION = ResponseSpec(
+    schema={
+        "type": "object",
+        "properties": {
+            "is_satisfactory": {"type": "boolean"},
+            "follow_up_question": {"type": ["string", "null"]},
+            "feedback": {"type": "string"},
+        },
+        "required": ["is_satisfactory", "follow_up_question", "feedback"],
+    },
+    validators={
+        "is_satisfactory": lambda data: isinstance(data.get("is_satisfactory"), bool),
+        "follow_up_question": _is_follow_up,
+    },
+)
+
+
+def response_format(spec: ResponseSpec) -> Optional[dict]:
+    """The `format=` argument for a chat call, or None when structured output is disabled"""
+    return spec.schema if settings.llm_structured_output else None
+
+
+def extract_json(content: str) -> Optional[dict]:
+    """Return the first JSON object in a reply.
+
+    Skips a leading <think> block and an opening ```json fence if present, then
+    decodes in place from the first brace that starts a valid object, so fenced,
+    unfenced and prose-wrapped replies all work without slicing the text.
+    """
+    pos = 0
+    if content.lstrip().startswith(THINK_OPEN):
+        end = content.find(THINK_CLOSE)
+        if end != -1:
+            pos = end + len(THINK_CLOSE)
+    fence = content.find("```json", pos)
+    if fence != -1:
+        pos = fence + len("```json")
+    while True:
+        pos = content.find("{", pos)
+        if pos == -1:
+            return None
+        try:
+            value, _ = _decoder.raw_decode(content, pos)
+        except json.JSONDecodeError:
+            pos += 1
+            continue
+        if isinstance(value, dict):
+            return value
+        pos += 1
+
+
+async def complete_json(
+    llm: LLMClient,
+    messages: Sequence[Mapping[str, Any]],
+    content: str,
+    spec: ResponseSpec,
+    prompt_type: str,
+    data: Optional[dict] = None,
+) -> dict:
+    """Parse a reply, re-asking only for missing or invalid fields up to `llm_parse_retries` times.
+
+    `data` holds fields already known (e.g. parsed while streaming); otherwise
+    they are extracted from `content`. Raises ResponseParseError if fields are
+    still missing after the last retry.
+    """
+    if data is None:
+        with stage_timer("json_parse"):
+            data = extract_json(content) or {}
+    missing = spec.missing(data)
+    retries = 0
+    while missing:
+        LLM_PARSE_FAILURES.labels(prompt_type).inc()
+        if retries >= settings.llm_parse_retries:
+            LLM_PARSE_GIVEUPS.labels(prompt_type).inc()
+            raise ResponseParseError(f"{prompt_type} reply is missing {missing}: {content[-500:]!r}")
+        retries += 1
+        logger.warning(f"{prompt_type} reply is missing {missing}, asking again")
+        response = await llm.chat(
+            messages=list(messages) + [
+                {'role': 'assistant', 'content': strip_reasoning(content)},
+                {
+                    'role': 'user',
+                    'content': (
+                        f"Your reply did not include valid values for: {', '.join(missing)}. "
+                        "Reply with only a JSON object containing exactly these fields."
+                    )
+                },
+            ],
+            format=spec.subschema(missing) if settings.llm_structured_output else None,
+            prompt_type=f"{prompt_type}_retry",
+        )
+        content = response['message']['content']
+        with stage_timer("json_parse"):
+            repaired = extract_json(content) or {}
+        data.update({field: repaired[field] for field in missing if field in repaired})
+        missing = spec.missing(data)
+    return data
+
+
+async def request_json(
+    llm: LLMClient,
+    messages: Sequence[Mapping[str, Any]],
+    spec: ResponseSpec,
+    prompt_type: str,
+) -> dict:
+    """Run a chat call that must return JSON matching `spec`"""
+    response = await llm.chat(messages=messages, format=response_format(spec), prompt_type=prompt_type)
+    return await complete_json(llm, messages, response['message']['content'], spec, prompt_type)
@@ -0,0 +1,169 @@
+from typing import Deque, Dict, Optional
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+import asyncio
+import logging
+import time
+from app.services.metrics import INFERENCE_REJECTIONS
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class InferenceOverloadedError(RuntimeError):
+    """Raised when an inference queue is full and new work is rejected"""
+
+
+class WorkClass(IntEnum):
+    """Priority classes for inference work; lower values are served first"""
+    LIVE = 0       # a candidate waiting on an interview turn
+    SETUP = 1      # starting an interview
+    OFFLINE = 2    # recruiter questions and batch pre-generation
+
+
+_current_work_class: ContextVar[WorkClass] = ContextVar("work_class", default=WorkClass.SETUP)
+
+
+def set_work_class(value: WorkClass) -> None:
+    """Label the current request's inference work; tasks it creates from now on inherit the class.
+
+    Each request handler runs in its own task, so this does not leak into other requests.
+    """
+    _current_work_class.set(value)
+
+
+def current_work_class() -> WorkClass:
+    return _current_work_class.get()
+
+
+class PriorityGate:
+    """Caps in-flight work and hands out free slots by priority class.
+
+    A class's quota caps the slots held by that class and every lower-priority
+    class together, and setup and offline work never hold the last slot (given
+    more than one), so live turns always find capacity. A freed slot goes to
+    the highest-priority class with waiters and spare quota, oldest request
+    first. Requests are rejected with InferenceOverloadedError instead of
+    queueing without bound: when their class already has `max_queue_depth`
+    waiters, when the expected wait (from the queue ahead and recent slot hold
+    times) exceeds the class deadline, or when they are still waiting at their
+    deadline.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int,
+        max_queue_depth: int,
+        quotas: Optional[Dict[WorkClass, int]] = None,
+        deadlines: Optional[Dict[WorkClass, float]] = None,
+    ):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue_depth = max_queue_depth
+        self.quotas: Dict[WorkClass, int] = {}
+        limit = max_concurrency
+        for c in WorkClass:
+            if c != WorkClass.LIVE:
+                # Keep one slot that only live turns may use
+                limit = max(1, min(limit, max_concurrency - 1))
+            limit = min(limit, (quotas or {}).get(c, limit))
+            self.quotas[c] = limit
+        # Seconds a request of each class may wait for a slot; 0 means no deadline
+        self.deadlines = {c: (deadlines or {}).get(c, 0) for c in WorkClass}
+        self._running: Dict[WorkClass, int] = {c: 0 for c in WorkClass}
+        self._waiters: Dict[WorkClass, Deque[asyncio.Future]] = {c: deque() for c in WorkClass}
+        self._waiting: Dict[WorkClass, int] = {c: 0 for c in WorkClass}
+        # Moving average of how long a slot is held
+        self._hold_seconds: Optional[float] = None
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(self._waiting.values())
+
+    @property
+    def in_flight(self) -> int:
+        return sum(self._running.values())
+
+    def queue_depths(self) -> Dict[str, int]:
+        return {c.name.lower(): self._waiting[c] for c in WorkClass}
+
+    def _can_start(self, work_class: WorkClass) -> bool:
+        # A new slot counts against the quota of this class and of every class above it
+        return all(
+            sum(self._running[c] for c in WorkClass if c >= above) < self.quotas[above]
+            for above in WorkClass if above <= work_class
+        )
+
+    def _expected_wait(self, work_class: WorkClass) -> float:
+        if self._hold_seconds is None:
+            return 0.0
+        ahead = sum(self._waiting[c] for c in WorkClass if c <= work_class)
+        return (ahead + 1) / self.quotas[work_class] * self._hold_seconds
+
+    def _reject(self, work_class: WorkClass, reason: str, message: str) -> InferenceOverloadedError:
+        INFERENCE_REJECTIONS.labels(self.name, work_class.name.lower(), reason).inc()
+        return InferenceOverloadedError(f"{self.name} {message} ({work_class.name.lower()} work)")
+
+    def _admit(self, work_class: WorkClass) -> None:
+        if self._waiting[work_class] >= self.max_queue_depth:
+            raise self._reject(work_class, "queue_full", f"queue is full ({self._waiting[work_class]} waiting)")
+        deadline = self.deadlines[work_class]
+        if deadline and self._expected_wait(work_class) > deadline:
+            raise self._reject(
+                work_class, "deadline", f"wait of {self._expected_wait(work_class):.1f}s would exceed {deadline:.1f}s"
+            )
+
+    def _grant_waiters(self) -> None:
+        for work_class in WorkClass:
+            waiters = self._waiters[work_class]
+            while waiters and self._can_start(work_class):
+                future = waiters.popleft()
+                if future.done():
+                    # Abandoned while queued
+                    continue
+                self._waiting[work_class] -= 1
+                self._running[work_class] += 1
+                future.set_result(None)
+
+    def _release(self, work_class: WorkClass, held_seconds: Optional[float] = None) -> None:
+        self._running[work_class] -= 1
+        if held_seconds is not None:
+            self._hold_seconds = held_seconds if self._hold_seconds is None else 0.8 * self._hold_seconds + 0.2 * held_seconds
+        self._grant_waiters()
+
+    async def _wait_for_slot(self, work_class: WorkClass) -> None:
+        if self._can_start(work_class) and not any(self._waiting[c] for c in WorkClass if c <= work_class):
+            self._running[work_class] += 1
+            return
+        self._admit(work_class)
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[work_class].append(future)
+        self._waiting[work_class] += 1
+        deadline = self.deadlines[work_class] or None
+        try:
+            await asyncio.wait_for(asyncio.shield(future), deadline)
+        except BaseException as e:
+            if future.done():
+                # The slot was granted just as the caller gave up
+                self._release(work_class)
+            else:
+                future.cancel()
+                self._waiting[work_class] -= 1
+            if isinstance(e, asyncio.TimeoutError):
+                raise self._reject(work_class, "deadline", f"had no free slot within {deadline:.1f}s") from None
+            raise
+
+    @asynccontextmanager
+    async def slot(self, work_class: Optional[WorkClass] = None):
+        """Hold one slot for the duration of the block; the class defaults to the caller's context"""
+        work_class = current_work_class() if work_class is None else work_class
+        await self._wait_for_slot(work_class)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(work_class, time.monotonic() - start)
@@ -0,0 +1,179 @@
+from typing import Dict, Optional, Set
+from collections import OrderedDict
+import asyncio
+import logging
+import time
+from app.config import settings
+from app.services.database import DatabaseService
+from app.services.interview_session import InterviewSession
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class SessionStore:
+    """In-process cache of live InterviewSession objects in front of MongoDB.
+
+    Sessions are served from memory and evicted by LRU or after `ttl_seconds`
+    without access. Writes are write-behind: changed sessions are marked dirty
+    and flushed by a background task, on disconnect or on completion. Sessions
+    with an open WebSocket are pinned and never evicted.
+    """
+
+    def __init__(
+        self,
+        db_service: DatabaseService,
+        max_sessions: int,
+        ttl_seconds: float,
+        flush_interval_seconds: float,
+        write_through_new: bool = False,
+    ):
+        self.db_service = db_service
+        # With several workers, a new session must be in MongoDB before its socket may connect elsewhere
+        self.write_through_new = write_through_new
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.flush_interval_seconds = flush_interval_seconds
+        self._sessions: OrderedDict = OrderedDict()
+        self._last_access: Dict[str, float] = {}
+        self._dirty: Set[str] = set()
+        self._pinned: Dict[str, int] = {}
+        self._flusher: Optional[asyncio.Task] = None
+        self._background: Set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    async def get(self, session_id: str) -> Optional[InterviewSession]:
+        """Return a session from memory, loading it from MongoDB on a miss"""
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = await self.db_service.get_live_session(session_id)
+            if session is None:
+                return None
+            # Another coroutine may have loaded it while we were waiting
+            session = self._sessions.get(session_id, session)
+            self._remember(session)
+        else:
+            logger.info(f"Session {session_id} served from memory")
+        self._touch(session_id)
+        return session
+
+    async def put(self, session: InterviewSession) -> None:
+        """Add a new session and persist it right away (in the background unless write_through_new)"""
+        self._remember(session)
+        self._touch(session.session_id)
+        self._dirty.add(session.session_id)
+        if self.write_through_new:
+            await self.flush(session.session_id)
+        else:
+            self._run_in_background(self.flush(session.session_id))
+
+    def forget(self, session_id: str) -> None:
+        """Drop a session from memory without saving it, e.g. after it moved to another worker"""
+        self._sessions.pop(session_id, None)
+        self._last_access.pop(session_id, None)
+        self._dirty.discard(session_id)
+
+    def mark_dirty(self, session: InterviewSession) -> None:
+        """Record that a session changed; it is written on the next flush"""
+        self._dirty.add(session.session_id)
+        self._touch(session.session_id)
+
+    def checkpoint(self, session: InterviewSession) -> None:
+        """Mark a session dirty and write it now in the background, for state that is expensive to recompute"""
+        self.mark_dirty(session)
+        self._run_in_background(self.flush(session.session_id))
+
+    def pin(self, session_id: str) -> None:
+        self._pinned[session_id] = self._pinned.get(session_id, 0) + 1
+
+    def unpin(self, session_id: str) -> None:
+        count = self._pinned.get(session_id, 0) - 1
+        if count > 0:
+            self._pinned[session_id] = count
+        else:
+            self._pinned.pop(session_id, None)
+
+    async def flush(self, session_id: Optional[str] = None) -> None:
+        """Write dirty sessions (or one session) to MongoDB"""
+        session_ids = [session_id] if session_id else list(self._dirty)
+        saves = []
+        for sid in session_ids:
+            session = self._sessions.get(sid)
+            if sid in self._dirty:
+                self._dirty.discard(sid)
+                if session is not None:
+                    saves.append(self._save(session))
+        await asyncio.gather(*saves)
+
+    async def _save(self, session: InterviewSession) -> None:
+        try:
+            await self.db_service.save_session(session)
+        except Exception as e:
+            logger.error(f"Failed to persist session {session.session_id}: {e}")
+            self._dirty.add(session.session_id)
+
+    def _remember(self, session: InterviewSession) -> None:
+        self._sessions[session.session_id] = session
+        self._sessions.move_to_end(session.session_id)
+        self._evict(lambda sid: len(self._sessions) > self.max_sessions)
+
+    def _touch(self, session_id: str) -> None:
+        self._last_access[session_id] = time.monotonic()
+        if session_id in self._sessions:
+            self._sessions.move_to_end(session_id)
+
+    def _evict(self, should_evict) -> None:
+        for sid in list(self._sessions):
+            if not should_evict(sid):
+                continue
+            if sid in self._pinned:
+                continue
+            session = self._sessions.pop(sid)
+            self._last_access.pop(sid, None)
+            if sid in self._dirty:
+                self._dirty.discard(sid)
+                self._run_in_background(self._save(session))
+
+    def _evict_expired(self) -> None:
+        cutoff = time.monotonic() - self.ttl_seconds
+        self._evict(lambda sid: self._last_access.get(sid, 0) < cutoff)
+
+    def _run_in_background(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval_seconds)
+            try:
+                await self.flush()
+                self._evict_expired()
+            except Exception as e:
+                logger.error(f"Session flush failed: {e}")
+
+    def start(self) -> None:
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_periodically())
+
+    async def stop(self) -> None:
+        """Stop the background flusher and write everything that is still dirty"""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        await self.flush()
+        await asyncio.gather(*self._background, return_exceptions=True)
+
+
+def create_session_store(db_service: DatabaseService) -> SessionStore:
+    return SessionStore(
+        db_service,
+        max_sessions=settings.session_cache_size,
+        ttl_seconds=settings.session_ttl_seconds,
+        flush_interval_seconds=settings.session_flush_interval_seconds,
+        write_through_new=settings.coordination_backend != "local",
+    )
@@ -0,0 +1,123 @@
+from typing import Awaitable, Callable, Optional, Tuple
+import asyncio
+import logging
+from app.config import settings
+from app.services.inference import InferenceOverloadedError, llm_client
+from app.services.metrics import SPECULATION_RESULTS, observe_answer_evaluation
+from app.services.tts import tts_service
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _normalize(transcript: str) -> str:
+    return " ".join(transcript.lower().split())
+
+
+def _llm_has_spare_capacity() -> bool:
+    """Speculative work never competes with real work for an LLM slot"""
+    gate = llm_client.gate
+    return gate.queue_depth == 0 and gate.in_flight < gate.max_concurrency
+
+
+def _consume_result(task: asyncio.Task) -> None:
+    # Discarded speculations must not log "exception was never retrieved"
+    if not task.cancelled():
+        task.exception()
+
+
+class SpeculativeTurn:
+    """Speculative work for one question/answer turn.
+
+    While the question is outstanding the model is pre-warmed with the session's
+    prompt prefix. While the answer streams in, every partial transcript (sent
+    after each pause) starts an evaluation in the background; when it asks for
+    a follow-up, the follow-up's audio is synthesized right away. When the final
+    transcript matches the last speculated one, that evaluation's result (and
+    follow-up) is used; otherwise it is discarded and the final transcript is
+    evaluated.
+    """
+
+    def __init__(self, session):
+        self.session = session
+        self._transcript: Optional[str] = None
+        self._evaluation: Optional[asyncio.Task] = None
+        self._prewarm: Optional[asyncio.Task] = None
+
+    def prewarm(self) -> None:
+        """Load the session prefix into Ollama's prompt cache while the candidate is answering"""
+        if not settings.speculation_enabled or not _llm_has_spare_capacity():
+            return
+        self._prewarm = asyncio.create_task(self._run_prewarm())
+
+    async def _run_prewarm(self) -> None:
+        try:
+            await llm_client.chat(
+                messages=self.session.prompt_builder.context_messages(),
+                options={"num_predict": 1},
+                prompt_type="prewarm",
+            )
+        except Exception as e:
+            logger.debug(f"Prewarm skipped: {e}")
+
+    def speculate(self, partial_transcript: str) -> None:
+        """Start evaluating a partial transcript, replacing any older speculation"""
+        if not settings.speculation_enabled:
+            return
+        if len(partial_transcript.split()) < settings.speculation_min_words:
+            return
+        if self._transcript is not None and _normalize(partial_transcript) == _normalize(self._transcript):
+            return
+        self.cancel()
+        if not _llm_has_spare_capacity():
+            # The final transcript is evaluated as usual
+            return
+        self._transcript = partial_transcript
+        # Scored without counting: only the evaluation the turn uses is recorded (in resolve)
+        self._evaluation = asyncio.create_task(self.session.score_answer(partial_transcript))
+        self._evaluation.add_done_callback(_consume_result)
+        self._evaluation.add_done_callback(self._prepare_follow_up)
+
+    def _prepare_follow_up(self, task: asyncio.Task) -> None:
+        """Start synthesizing the follow-up of the latest speculation, so a hit can be spoken at once"""
+        if task is not self._evaluation or task.cancelled() or task.exception() is not None:
+            return
+        is_satisfactory, follow_up, _ = task.result()
+        if not is_satisfactory and follow_up and self.session.can_follow_up():
+            tts_service.prefetch([follow_up])
+
+    async def resolve(
+        self,
+        transcript: str,
+        on_follow_up_delta: Optional[Callable[[str], Awaitable[None]]] = None,
+    ) -> Tuple[bool, Optional[str]]:
+        """Return the evaluation of the final transcript, reusing the speculative one if it matches"""
+        if self._evaluation is not None and _normalize(transcript) == _normalize(self._transcript):
+            try:
+                is_satisfactory, follow_up, tier = await self._evaluation
+                SPECULATION_RESULTS.labels("hit").inc()
+                if tier is not None:
+                    observe_answer_evaluation(tier, is_satisfactory)
+                logger.info("Using speculative evaluation")
+                if not is_satisfactory and follow_up and on_follow_up_delta:
+                    await on_follow_up_delta(follow_up)
+                return is_satisfactory, follow_up
+            except (asyncio.CancelledError, InferenceOverloadedError):
+                pass
+        if self._evaluation is not None:
+            SPECULATION_RESULTS.labels("miss").inc()
+        self.cancel()
+        return await self.session.evaluate_answer(transcript, on_follow_up_delta)
+
+    def cancel(self) -> None:
+        if self._evaluation is not None and not self._evaluation.done():
+            self._evaluation.cancel()
+        self._evaluation = None
+        self._transcript = None
+
+    def close(self) -> None:
+        """Drop all outstanding speculative work, e.g. when the socket closes"""
+        self.cancel()
+        if self._prewarm is not None and not self._prewarm.done():
+            self._prewarm.cancel()
@@ -0,0 +1,173 @@
+from typing import Any, Dict, List, Optional, Type, Union
+from abc import ABC, abstractmethod
+import numpy as np
+
+# A file path, or 16 kHz mono float32 samples already decoded in memory
+AudioInput = Union[str, np.ndarray]
+
+
+class TranscriptionBackend(ABC):
+    """Speech-to-text engine that runs inside a transcription worker process"""
+
+    name: str = ""
+    # Whether the model can be loaded once and shared with workers via shared memory
+    supports_shared_weights: bool = False
+
+    def __init__(self, model_size: str, num_threads: int, compute_type: str):
+        self.model_size = model_size
+        self.num_threads = num_threads
+        self.compute_type = compute_type
+        self.model: Any = None
+
+    @abstractmethod
+    def load(self) -> None:
+        """Load the model into this process"""
+
+    @abstractmethod
+    def load_audio(self, path: str) -> np.ndarray:
+        """Decode an audio file to 16 kHz mono float32"""
+
+    @abstractmethod
+    def transcribe(self, audio: np.ndarray) -> str:
+        """Transcribe one clip"""
+
+    def load_shared(self) -> Any:
+        """Load a model whose weights live in shared memory (only if supports_shared_weights)"""
+        raise NotImplementedError(f"{self.name} does not support shared weights")
+
+    def use_shared(self, model: Any) -> None:
+        """Adopt a model returned by `load_shared()` in another process"""
+        raise NotImplementedError(f"{self.name} does not support shared weights")
+
+    def transcribe_batch(self, clips: List[AudioInput]) -> List[Union[str, Exception]]:
+        """Transcribe several clips; failures are returned per clip instead of raised"""
+        results: List[Union[str, Exception]] = []
+        for clip in clips:
+            try:
+                audio = clip if isinstance(clip, np.ndarray) else self.load_audio(clip)
+                results.append(self.transcribe(audio))
+            except Exception as e:
+                results.append(RuntimeError(f"Transcription failed: {e}"))
+        return results
+
+
+class OpenAIWhisperBackend(TranscriptionBackend):
+    """Reference openai-whisper (PyTorch, fp32 on CPU) with batched decoding"""
+
+    name = "openai-whisper"
+    supports_shared_weights = True
+
+    # Batched results worse than these are re-run through the full transcribe() loop,
+    # mirroring whisper's own temperature-fallback thresholds
+    COMPRESSION_RATIO_THRESHOLD = 2.4
+    LOGPROB_THRESHOLD = -1.0
+    NO_SPEECH_THRESHOLD = 0.6
+
+    def load(self) -> None:
+        import torch
+        import whisper
+
+        torch.set_num_threads(self.num_threads)
+        self.model = whisper.load_model(self.model_size, device="cpu")
+
+    def load_shared(self) -> Any:
+        # Importing torch.multiprocessing registers the reducers that pass shared
+        # tensors to child processes by handle instead of by copy
+        import torch.multiprocessing  # noqa: F401
+        import whisper
+
+        model = whisper.load_model(self.model_size, device="cpu")
+        model.eval()
+        model.share_memory()
+        return model
+
+    def use_shared(self, model: Any) -> None:
+        import torch
+
+        torch.set_num_threads(self.num_threads)
+        self.model = model
+
+    def load_audio(self, path: str) -> np.ndarray:
+        import whisper
+        return whisper.load_audio(path)
+
+    def transcribe(self, audio: np.ndarray) -> str:
+        return self.model.transcribe(audio).get("text", "").strip()
+
+    def transcribe_batch(self, clips: List[AudioInput]) -> List[Union[str, Exception]]:
+        """Decode all 30-second-or-shorter clips as one batch of log-mel spectrograms"""
+        import torch
+        import whisper
+
+        model = self.model
+        results: List[Optional[Union[str, Exception]]] = [None] * len(clips)
+        audios = {}
+        for i, clip in enumerate(clips):
+            try:
+                audios[i] = clip if isinstance(clip, np.ndarray) else self.load_audio(clip)
+            except Exception as e:
+                results[i] = RuntimeError(f"Failed to load audio: {e}")
+
+        short = [i for i, audio in audios.items() if len(audio) <= whisper.audio.N_SAMPLES]
+        if short:
+            mel = torch.stack([
+                whisper.log_mel_spectrogram(whisper.pad_or_trim(audios[i]), model.dims.n_mels)
+                for i in short
+            ]).to(model.device)
+            options = whisper.DecodingOptions(fp16=model.device.type == "cuda")
+            for i, decoded in zip(short, whisper.decode(model, mel, options)):
+                if decoded.no_speech_prob > self.NO_SPEECH_THRESHOLD and decoded.avg_logprob < self.LOGPROB_THRESHOLD:
+                    results[i] = ""
+                elif decoded.compression_ratio <= self.COMPRESSION_RATIO_THRESHOLD and decoded.avg_logprob >= self.LOGPROB_THRESHOLD:
+                    results[i] = decoded.text.strip()
+
+        # Long clips and low-confidence batch results take the sequential path
+        for i, audio in audios.items():
+            if results[i] is None:
+                try:
+                    results[i] = self.transcribe(audio)
+                except Exception as e:
+                    results[i] = RuntimeError(f"Transcription failed: {e}")
+        return results
+
+
+class FasterWhisperBackend(TranscriptionBackend):
+    """CTranslate2 / faster-whisper with quantized (e.g. int8) CPU inference"""
+
+    name = "faster-whisper"
+
+    def load(self) -> None:
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError as e:
+            raise RuntimeError("The faster-whisper backend requires `pip install faster-whisper`") from e
+
+        self.model = WhisperModel(
+            self.model_size,
+            device="cpu",
+            compute_type=self.compute_type,
+            cpu_threads=self.num_threads,
+        )
+
+    def load_audio(self, path: str) -> np.ndarray:
+        from faster_whisper import decode_audio
+        return decode_audio(path)
+
+    def transcribe(self, audio: np.ndarray) -> str:
+        segments, _ = self.model.transcribe(audio, vad_filter=False)
+        return "".join(segment.text for segment in segments).strip()
+
+
+BACKENDS: Dict[str, Type[TranscriptionBackend]] = {
+    OpenAIWhisperBackend.name: OpenAIWhisperBackend,
+    FasterWhisperBackend.name: FasterWhisperBackend,
+}
+
+
+def create_backend(name: str, model_size: str, num_threads: int, compute_type: str) -> TranscriptionBackend:
+    """Instantiate a backend by name (the model is not loaded yet)"""
+    try:
+        backend_cls = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown transcription backend {name!r}, expected one of {sorted(BACKENDS)}")
+    return backend_cls(model_size, num_threads, compute_type)
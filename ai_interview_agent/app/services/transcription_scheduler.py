@@ -0,0 +1,126 @@
+from typing import Awaitable, Callable, List, Optional, Set, Tuple
+import asyncio
+import logging
+from app.config import settings
+from app.services.inference import AudioInput, InferenceOverloadedError, TranscriptionPool, transcription_pool
+from app.services.model_registry import model_registry
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class TranscriptionScheduler:
+    """Collects transcription requests from all sessions and runs them in batches.
+
+    A batch is sent to the pool once `max_batch_size` requests are waiting or the
+    oldest one has waited `max_wait_ms`. At most one batch per pool worker is in
+    flight; while workers are busy, new requests keep accumulating into the next batch.
+    """
+
+    def __init__(
+        self,
+        pool: TranscriptionPool,
+        max_batch_size: int,
+        max_wait_ms: float,
+        max_queue_depth: int,
+        ensure_ready: Optional[Callable[[], Awaitable[None]]] = None,
+    ):
+        self.pool = pool
+        self.ensure_ready = ensure_ready
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue_depth = max_queue_depth
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._batches: Set[asyncio.Task] = set()
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def _ensure_started(self) -> None:
+        if self._worker is None or self._worker.done():
+            self._queue = self._queue or asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.pool.max_workers)
+            self._worker = asyncio.create_task(self._run())
+
+    async def transcribe(self, audio: AudioInput) -> str:
+        """Queue an audio clip for transcription and wait for its text"""
+        self._ensure_started()
+        if self._queue.qsize() >= self.max_queue_depth:
+            raise InferenceOverloadedError(
+                f"transcription queue is full ({self._queue.qsize()} waiting)"
+            )
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((audio, future))
+        return await future
+
+    async def _collect_batch(self) -> List[Tuple[AudioInput, asyncio.Future]]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        # Callers that gave up (e.g. a disconnected socket) don't need decoding
+        return [(audio, future) for audio, future in batch if not future.done()]
+
+    async def _run(self) -> None:
+        while True:
+            await self._slots.acquire()
+            try:
+                batch = await self._collect_batch()
+            except BaseException:
+                self._slots.release()
+                raise
+            if not batch:
+                self._slots.release()
+                continue
+            task = asyncio.create_task(self._dispatch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _dispatch(self, batch: List[Tuple[AudioInput, asyncio.Future]]) -> None:
+        try:
+            if self.ensure_ready is not None:
+                await self.ensure_ready()
+            logger.info(f"Transcribing batch of {len(batch)} clips")
+            results = await self.pool.transcribe_batch([audio for audio, _ in batch])
+        except Exception as e:
+            logger.error(f"Transcription batch failed: {e}")
+            results = [e] * len(batch)
+        finally:
+            self._slots.release()
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def shutdown(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, *self._batches, return_exceptions=True)
+            self._worker = None
+
+
+transcription_scheduler = TranscriptionScheduler(
+    pool=transcription_pool,
+    max_batch_size=settings.transcription_max_batch_size,
+    max_wait_ms=settings.transcription_max_wait_ms,
+    max_queue_depth=settings.transcription_max_queue_depth,
+    ensure_ready=model_registry.ensure_whisper,
+)
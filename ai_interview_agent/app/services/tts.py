@@ -0,0 +1,242 @@
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Set
+import asyncio
+import hashlib
+import logging
+import os
+import struct
+from app.config import settings
+from app.services.cache import LRUCache
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ENGINES = ("piper", "espeak-ng")
+DEFAULT_VOICES = {"piper": "en_US-lessac-medium.onnx", "espeak-ng": "en-us"}
+
+
+class SpeechSynthesisError(RuntimeError):
+    """The TTS engine failed or is not installed"""
+
+
+def _wav_header(sample_rate: int, data_size: int = 0xFFFFFFFF - 36) -> bytes:
+    """Header for 16-bit mono PCM; the default sizes mark a stream of unknown length"""
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", data_size + 36, b"WAVE", b"fmt ", 16, 1, 1,
+        sample_rate, sample_rate * 2, 2, 16, b"data", data_size,
+    )
+
+
+def _finalize_wav(audio: bytes) -> bytes:
+    """Fill in the real sizes of a WAV that was written as a stream"""
+    if audio[:4] != b"RIFF" or audio[36:40] != b"data":
+        return audio
+    data_size = len(audio) - 44
+    return audio[:4] + struct.pack("<I", data_size + 36) + audio[8:40] + struct.pack("<I", data_size) + audio[44:]
+
+
+class Synthesis:
+    """Audio for one text that can be read while it is still being produced"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.done = False
+        self.error: Optional[Exception] = None
+        self._changed = asyncio.Condition()
+
+    async def append(self, chunk: bytes) -> None:
+        async with self._changed:
+            self.chunks.append(chunk)
+            self._changed.notify_all()
+
+    async def finish(self, error: Optional[Exception] = None) -> None:
+        async with self._changed:
+            self.done = True
+            self.error = error
+            self._changed.notify_all()
+
+    async def stream(self) -> AsyncIterator[bytes]:
+        sent = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: len(self.chunks) > sent or self.done)
+                new, done = self.chunks[sent:], self.done
+            sent += len(new)
+            for chunk in new:
+                yield chunk
+            if done and sent >= len(self.chunks):
+                if self.error is not None:
+                    raise SpeechSynthesisError(str(self.error)) from self.error
+                return
+
+
+class TTSService:
+    """Synthesizes question audio with a local engine, ahead of time and cached.
+
+    Audio is keyed by a hash of the engine, voice and text, kept in an LRU in
+    memory and as WAV files on disk (shared by all workers on a host). A text
+    that is still being synthesized can already be streamed: readers get each
+    chunk as the engine produces it.
+    """
+
+    def __init__(
+        self,
+        engine: Optional[str],
+        voice: Optional[str],
+        sample_rate: int,
+        cache_size: int,
+        cache_dir: Optional[str],
+        max_concurrency: int,
+        chunk_bytes: int,
+    ):
+        if engine is not None and engine not in ENGINES:
+            raise ValueError(f"Unknown TTS engine {engine!r}, expected one of {ENGINES}")
+        self.engine = engine
+        self.voice = voice or DEFAULT_VOICES.get(engine)
+        self.sample_rate = sample_rate
+        self.cache_dir = cache_dir
+        self.chunk_bytes = chunk_bytes
+        self._memory = LRUCache(cache_size)
+        self._in_flight: Dict[str, Synthesis] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._max_concurrency = max_concurrency
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.engine is not None
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.engine}\0{self.voice}\0{text}".encode()).hexdigest()
+
+    def _path(self, key: str) -> Optional[str]:
+        return os.path.join(self.cache_dir, f"{key}.wav") if self.cache_dir else None
+
+    def _command(self) -> List[str]:
+        if self.engine == "piper":
+            return ["piper", "--model", self.voice, "--output_raw"]
+        return ["espeak-ng", "-v", self.voice, "--stdout", "--stdin"]
+
+    def prefetch(self, texts: Sequence[str]) -> None:
+        """Start synthesizing texts in the background unless they are cached or already running"""
+        if not self.enabled:
+            return
+        for text in texts:
+            key = self._key(text)
+            if self._memory.get(key) is None and key not in self._in_flight:
+                self._start(key, text)
+
+    def _start(self, key: str, text: str) -> Synthesis:
+        synthesis = Synthesis()
+        self._in_flight[key] = synthesis
+        task = asyncio.create_task(self._synthesize(key, text, synthesis))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return synthesis
+
+    async def stream(self, text: str) -> AsyncIterator[bytes]:
+        """Yield WAV audio for a text in chunks, from the cache or as it is synthesized"""
+        key = self._key(text)
+        audio = self._memory.get(key)
+        if audio is not None:
+            for i in range(0, len(audio), self.chunk_bytes):
+                yield audio[i:i + self.chunk_bytes]
+            return
+        synthesis = self._in_flight.get(key) or self._start(key, text)
+        async for chunk in synthesis.stream():
+            yield chunk
+
+    async def _synthesize(self, key: str, text: str, synthesis: Synthesis) -> None:
+        error: Optional[Exception] = None
+        try:
+            path = self._path(key)
+            audio = await asyncio.to_thread(self._read_file, path) if path else None
+            if audio is not None:
+                for i in range(0, len(audio), self.chunk_bytes):
+                    await synthesis.append(audio[i:i + self.chunk_bytes])
+            else:
+                if self._slots is None:
+                    self._slots = asyncio.Semaphore(self._max_concurrency)
+                async with self._slots:
+                    await self._run_engine(text, synthesis)
+                audio = _finalize_wav(b"".join(synthesis.chunks))
+                if path:
+                    await asyncio.to_thread(self._write_file, path, audio)
+            self._memory.set(key, audio)
+        except Exception as e:
+            logger.warning(f"Speech synthesis failed: {e!r}")
+            error = e
+        except asyncio.CancelledError:
+            # Readers must not take the audio so far for the whole question
+            error = SpeechSynthesisError("Speech synthesis was cancelled")
+            raise
+        finally:
+            self._in_flight.pop(key, None)
+            await synthesis.finish(error)
+
+    async def _run_engine(self, text: str, synthesis: Synthesis) -> None:
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *self._command(),
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+        except FileNotFoundError:
+            raise SpeechSynthesisError(f"{self.engine} is not installed") from None
+        # Read stderr alongside stdout so a chatty engine cannot fill the pipe and stall
+        stderr = asyncio.create_task(process.stderr.read())
+        try:
+            # One line of input is one utterance
+            process.stdin.write(" ".join(text.split()).encode() + b"\n")
+            process.stdin.close()
+            if self.engine == "piper":
+                # piper writes raw PCM
+                await synthesis.append(_wav_header(self.sample_rate))
+            while True:
+                chunk = await process.stdout.read(self.chunk_bytes)
+                if not chunk:
+                    break
+                await synthesis.append(chunk)
+            if await process.wait() != 0:
+                message = (await stderr).decode(errors="ignore").strip()
+                raise SpeechSynthesisError(f"{self.engine} failed: {message}")
+        finally:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            stderr.cancel()
+
+    @staticmethod
+    def _read_file(path: str) -> Optional[bytes]:
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _write_file(path: str, audio: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename, so other workers never read a partial file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(audio)
+        os.replace(tmp_path, path)
+
+    async def shutdown(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+tts_service = TTSService(
+    engine=settings.tts_engine,
+    voice=settings.tts_voice,
+    sample_rate=settings.tts_sample_rate,
+    cache_size=settings.tts_cache_size,
+    cache_dir=settings.tts_cache_dir,
+    max_concurrency=settings.tts_max_concurrency,
+    chunk_bytes=settings.tts_chunk_bytes,
+)
@@ -0,0 +1,147 @@
+"""
+A stand-in for the Ollama HTTP API, for load tests that should not depend on a real model.
+
+It answers /api/chat (streaming and non-streaming) and /api/ps with replies shaped
+like the ones the app asks for (question lists, answer evaluations, condensed
+documents), paced by a configurable prompt-evaluation delay and token rate.
+
+Usage (from the ai_interview_agent directory):
+    python -m benchmarks.fake_ollama --port 11500 --tokens-per-second 30 --prompt-latency-ms 200
+"""
+from typing import List
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timezone
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+MODEL = "deepseek-r1:latest"
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _tokens(text: str) -> List[str]:
+    """Split a reply into roughly token-sized pieces"""
+    return [text[i:i + 4] for i in range(0, len(text), 4)] or [""]
+
+
+def _reply(messages: List[dict], questions: int, unsatisfactory_rate: float) -> str:
+    task = messages[-1].get("content", "") if messages else ""
+    if "did not include valid values for" in task:
+        # A retry asks for a subset of fields; the app only reads the ones it asked for
+        return json.dumps({"is_satisfactory": True, "follow_up_question": None, "feedback": "", "questions": []})
+    if "Evaluate the candidate's answer" in task:
+        if random.random() < unsatisfactory_rate:
+            return json.dumps({
+                "is_satisfactory": False,
+                "follow_up_question": "Can you walk me through a concrete example of that, including the trade-offs you considered?",
+                "feedback": "The answer stayed at a high level.",
+            })
+        return json.dumps({"is_satisfactory": True, "follow_up_question": None, "feedback": "Clear and relevant answer."})
+    if "interview questions" in task:
+        return json.dumps({"questions": [
+            {
+                "question": f"Question {i + 1}: describe how you would design and operate a service like the ones in your resume.",
+                "category": "system design",
+                "difficulty": "medium",
+                "purpose": "Assess practical experience",
+            }
+            for i in range(questions)
+        ]})
+    if task.startswith("Condense"):
+        return "Condensed document: backend engineering, Python, distributed systems, five years of experience."
+    return "OK"
+
+
+def create_app(prompt_latency_ms: float, tokens_per_second: float, questions: int, unsatisfactory_rate: float) -> FastAPI:
+    app = FastAPI()
+    loaded = set()
+
+    @app.get("/")
+    def root():
+        return "Ollama is running"
+
+    @app.get("/api/ps")
+    def ps():
+        return {"models": [{"name": name, "model": name} for name in sorted(loaded)]}
+
+    @app.post("/api/chat")
+    async def chat(request: Request):
+        body = await request.json()
+        messages = body.get("messages") or []
+        model = body.get("model") or MODEL
+        loaded.add(model if ":" in model else f"{model}:latest")
+
+        prompt_tokens = sum(_estimate_tokens(m.get("content", "")) for m in messages)
+        reply = _reply(messages, questions, unsatisfactory_rate)
+        num_predict = (body.get("options") or {}).get("num_predict")
+        pieces = _tokens(reply)[:num_predict] if num_predict else _tokens(reply)
+
+        def message(content: str, done: bool, prompt_eval_ns: int = 0, eval_ns: int = 0) -> dict:
+            response = {
+                "model": model,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "message": {"role": "assistant", "content": content},
+                "done": done,
+            }
+            if done:
+                response.update({
+                    "done_reason": "stop",
+                    "prompt_eval_count": prompt_tokens,
+                    "prompt_eval_duration": prompt_eval_ns,
+                    "eval_count": len(pieces),
+                    "eval_duration": eval_ns,
+                })
+            return response
+
+        async def generate():
+            started = time.perf_counter_ns()
+            await asyncio.sleep(prompt_latency_ms / 1000)
+            prompt_done = time.perf_counter_ns()
+            for piece in pieces:
+                await asyncio.sleep(1 / tokens_per_second)
+                yield piece
+            yield message("", True, prompt_done - started, time.perf_counter_ns() - prompt_done)
+
+        if body.get("stream", True):
+            async def stream():
+                async for item in generate():
+                    chunk = item if isinstance(item, dict) else message(item, False)
+                    yield json.dumps(chunk) + "\n"
+            return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+        content = []
+        async for item in generate():
+            if isinstance(item, dict):
+                item["message"]["content"] = "".join(content)
+                return item
+            content.append(item)
+
+    return app
+
+
+def serve(port: int, prompt_latency_ms: float, tokens_per_second: float, questions: int, unsatisfactory_rate: float) -> None:
+    import uvicorn
+
+    app = create_app(prompt_latency_ms, tokens_per_second, questions, unsatisfactory_rate)
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--prompt-latency-ms", type=float, default=200, help="delay before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=30, help="generation speed")
+    parser.add_argument("--questions", type=int, default=5, help="questions per generated interview")
+    parser.add_argument("--unsatisfactory-rate", type=float, default=0.3, help="share of answers that get a follow-up")
+    args = parser.parse_args()
+    serve(args.port, args.prompt_latency_ms, args.tokens_per_second, args.questions, args.unsatisfactory_rate)
+
+
+if __name__ == "__main__":
+    main()
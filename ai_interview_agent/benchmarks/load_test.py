@@ -0,0 +1,382 @@
+"""
+Drive many simulated candidates through /start_interview and /ws/{session_id}.
+
+The app runs in its own process with local stand-ins: a fake Ollama server
+(benchmarks.fake_ollama, also in its own process), an in-process MongoDB
+(mongomock-motor) and, unless --transcription real is given, a transcription
+pool that sleeps for a fixed real-time factor instead of running Whisper.
+Answers are canned WAV files (--wav-dir) or synthesized tone bursts.
+
+Reports p50/p95/p99 turn latency (answer sent -> next question received),
+interview start latency, CPU cores used by the app, concurrent sessions per
+core, and resident memory per concurrent session (Linux, read from /proc).
+
+Usage (from the ai_interview_agent directory):
+    python -m benchmarks.load_test --candidates 50 --concurrency 10 --tokens-per-second 40
+    python -m benchmarks.load_test --transcription real --wav-dir answers/ --protocol blob
+"""
+from typing import Dict, List, Optional, Tuple
+import argparse
+import asyncio
+import io
+import json
+import multiprocessing
+import os
+import random
+import time
+import wave
+import numpy as np
+from pymongo import ReplaceOne
+from benchmarks import fake_ollama
+
+SAMPLE_RATE = 16000
+CHUNK_SECONDS = 0.1
+ANSWER_TEXT = "I built the ingestion service in Python with FastAPI and MongoDB and scaled it with worker pools"
+
+
+# --- App process -------------------------------------------------------------
+
+class _MockCollection:
+    """mongomock-motor collection whose bulk_write applies UpdateOne and ReplaceOne operations one at a time"""
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+    async def bulk_write(self, operations, ordered: bool = True):
+        for op in operations:
+            if isinstance(op, ReplaceOne):
+                await self._collection.replace_one(op._filter, op._doc, upsert=op._upsert)
+            else:
+                await self._collection.update_one(op._filter, op._doc, upsert=op._upsert)
+
+
+class _FakeTranscriptionPool:
+    """Sleeps for `rtf` x audio duration per clip instead of running Whisper"""
+
+    def __init__(self, max_workers: int, rtf: float):
+        self.max_workers = max_workers
+        self.rtf = rtf
+        self.started = True
+
+    async def start(self, shared_model=None) -> None:
+        pass
+
+    async def transcribe_batch(self, clips) -> List[str]:
+        audio_seconds = sum(len(clip) for clip in clips) / SAMPLE_RATE
+        await asyncio.sleep(audio_seconds * self.rtf)
+        return [ANSWER_TEXT for _ in clips]
+
+    def shutdown(self) -> None:
+        pass
+
+
+def _serve_app(port: int, env: Dict[str, str], fake_transcription: bool, transcription_rtf: float) -> None:
+    os.environ.update(env)
+    import logging
+    import uvicorn
+    from mongomock_motor import AsyncMongoMockClient
+    import main
+
+    logging.getLogger().setLevel(logging.WARNING)
+    db = main.db_service
+    db.client = AsyncMongoMockClient()
+    db.db = db.client.interview_db
+    db.sessions = _MockCollection(db.db.sessions)
+    db.documents = db.db.documents
+    db.archive = _MockCollection(db.db.sessions_archive)
+    db.batcher.collection = db.sessions
+    if fake_transcription:
+        main.transcription_scheduler.pool = _FakeTranscriptionPool(
+            main.transcription_scheduler.pool.max_workers, transcription_rtf
+        )
+        main.transcription_scheduler.ensure_ready = None
+    uvicorn.run(main.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+# --- Process statistics (Linux) ----------------------------------------------
+
+def _process_tree_usage(pid: int) -> Optional[Tuple[int, float]]:
+    """Resident bytes and CPU seconds of a process and all of its descendants"""
+    if not os.path.isdir("/proc"):
+        return None
+    children: Dict[int, List[int]] = {}
+    stats: Dict[int, List[str]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces; fields after it are space separated
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        stats[int(entry)] = fields
+        children.setdefault(int(fields[1]), []).append(int(entry))
+
+    ticks = os.sysconf("SC_CLK_TCK")
+    page = os.sysconf("SC_PAGE_SIZE")
+    rss, cpu = 0, 0.0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        fields = stats.get(current)
+        if fields is None:
+            continue
+        # utime, stime, cutime, cstime, ..., rss (pages)
+        cpu += sum(int(value) for value in fields[11:15]) / ticks
+        rss += int(fields[21]) * page
+        pending.extend(children.get(current, []))
+    return rss, cpu
+
+
+# --- Inputs ------------------------------------------------------------------
+
+def _make_pdf(text: str) -> bytes:
+    import fitz
+
+    document = fitz.open()
+    page = document.new_page()
+    page.insert_textbox(fitz.Rect(72, 72, 540, 770), text)
+    return document.tobytes()
+
+
+def _synthesize_answer(seconds: float, seed: int) -> np.ndarray:
+    """Tone bursts separated by short pauses, so the VAD finds several segments"""
+    rng = np.random.default_rng(seed)
+    samples = np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+    pos = 0
+    while pos < len(samples):
+        burst = int(rng.uniform(0.8, 2.0) * SAMPLE_RATE)
+        t = np.arange(min(burst, len(samples) - pos)) / SAMPLE_RATE
+        samples[pos:pos + len(t)] = 0.3 * np.sin(2 * np.pi * rng.uniform(120, 300) * t)
+        pos += burst + int(0.8 * SAMPLE_RATE)
+    return samples
+
+
+def _load_wav(path: str) -> Tuple[bytes, int]:
+    """16-bit PCM frames and sample rate of a mono WAV file"""
+    with wave.open(path, "rb") as f:
+        if f.getsampwidth() != 2 or f.getnchannels() != 1:
+            raise ValueError(f"{path}: expected 16-bit mono WAV")
+        return f.readframes(f.getnframes()), f.getframerate()
+
+
+def _to_wav(pcm: bytes, sample_rate: int) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(pcm)
+    return buffer.getvalue()
+
+
+def load_answers(wav_dir: Optional[str]) -> List[Tuple[bytes, int]]:
+    if wav_dir:
+        paths = sorted(os.path.join(wav_dir, name) for name in os.listdir(wav_dir) if name.lower().endswith(".wav"))
+        if not paths:
+            raise SystemExit(f"No .wav files in {wav_dir}")
+        return [_load_wav(path) for path in paths]
+    return [
+        ((_synthesize_answer(seconds, seed) * 32767).astype("<i2").tobytes(), SAMPLE_RATE)
+        for seed, seconds in enumerate((3, 6, 10))
+    ]
+
+
+# --- Simulated candidates ----------------------------------------------------
+
+class Results:
+    def __init__(self):
+        self.turn_latencies: List[float] = []
+        self.start_latencies: List[float] = []
+        self.completed = 0
+        self.failed = 0
+        self.busy = 0
+        self.active = 0
+        self.peak_active = 0
+
+
+async def _send_answer(ws, answer: Tuple[bytes, int], protocol: str, realtime: bool) -> None:
+    pcm, sample_rate = answer
+    if protocol == "blob":
+        await ws.send(_to_wav(pcm, sample_rate))
+        return
+    await ws.send(json.dumps({"type": "audio_start", "format": "pcm_s16le", "sample_rate": sample_rate}))
+    chunk = int(sample_rate * CHUNK_SECONDS) * 2
+    for i in range(0, len(pcm), chunk):
+        await ws.send(pcm[i:i + chunk])
+        if realtime:
+            await asyncio.sleep(CHUNK_SECONDS)
+    await ws.send(json.dumps({"type": "audio_end"}))
+
+
+async def run_candidate(index: int, base_url: str, job_post: bytes, answers, args, results: Results) -> None:
+    import httpx
+    import websockets
+
+    resume = _make_pdf(
+        f"Candidate {index}\nSenior backend engineer. Python, FastAPI, MongoDB, Kubernetes.\n"
+        f"Built data pipelines processing {index + 1} million events per day."
+    )
+    async with httpx.AsyncClient(base_url=base_url, timeout=None) as http:
+        started = time.perf_counter()
+        response = await http.post("/start_interview", files=[
+            ("files", ("resume.pdf", resume, "application/pdf")),
+            ("files", ("job_post.pdf", job_post, "application/pdf")),
+        ])
+        if response.status_code != 200:
+            results.failed += 1
+            return
+        results.start_latencies.append(time.perf_counter() - started)
+        session_id = response.json()["session_id"]
+
+    results.active += 1
+    results.peak_active = max(results.peak_active, results.active)
+    try:
+        async with websockets.connect(f"{base_url.replace('http', 'ws', 1)}/ws/{session_id}", max_size=None) as ws:
+            answered_at = None
+            while True:
+                message = json.loads(await ws.recv())
+                if message["type"] == "follow_up_delta":
+                    continue
+                if answered_at is not None:
+                    results.turn_latencies.append(time.perf_counter() - answered_at)
+                    answered_at = None
+                if message["type"] == "complete":
+                    results.completed += 1
+                    return
+                if message["type"] == "error":
+                    # The server re-sends the question after an error
+                    results.busy += message.get("status") == "busy"
+                    continue
+                await _send_answer(ws, random.choice(answers), args.protocol, args.realtime)
+                answered_at = time.perf_counter()
+    except Exception as e:
+        print(f"candidate {index}: {e!r}")
+        results.failed += 1
+    finally:
+        results.active -= 1
+
+
+async def _wait_until_up(url: str, timeout: float = 60) -> None:
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as http:
+        while True:
+            try:
+                if (await http.get(url)).status_code < 500:
+                    return
+            except httpx.TransportError:
+                pass
+            if time.monotonic() > deadline:
+                raise SystemExit(f"{url} did not come up")
+            await asyncio.sleep(0.2)
+
+
+def _percentile(values: List[float], p: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+async def drive(args, app_pid: int) -> None:
+    answers = load_answers(args.wav_dir)
+    job_post = _make_pdf("Job post: Senior Backend Engineer. Python, FastAPI, MongoDB, distributed systems, on-call.")
+    base_url = f"http://127.0.0.1:{args.port}"
+    await _wait_until_up(f"{base_url}/health/live")
+
+    results = Results()
+    baseline = _process_tree_usage(app_pid)
+    peak_rss = baseline[0] if baseline else 0
+
+    async def sample_memory() -> None:
+        nonlocal peak_rss
+        while True:
+            usage = _process_tree_usage(app_pid)
+            if usage:
+                peak_rss = max(peak_rss, usage[0])
+            await asyncio.sleep(0.5)
+
+    slots = asyncio.Semaphore(args.concurrency)
+
+    async def candidate(index: int) -> None:
+        async with slots:
+            await run_candidate(index, base_url, job_post, answers, args, results)
+
+    sampler = asyncio.create_task(sample_memory())
+    started = time.perf_counter()
+    await asyncio.gather(*(candidate(i) for i in range(args.candidates)))
+    wall = time.perf_counter() - started
+    sampler.cancel()
+    final = _process_tree_usage(app_pid)
+
+    print(f"\ncandidates={args.candidates} concurrency={args.concurrency} protocol={args.protocol} "
+          f"transcription={args.transcription} tokens/s={args.tokens_per_second}")
+    print(f"completed {results.completed}, failed {results.failed}, busy replies {results.busy}, wall {wall:.1f}s")
+    print(f"{'':<22}{'p50':>9}{'p95':>9}{'p99':>9}{'n':>7}")
+    for label, values in (("turn latency (s)", results.turn_latencies), ("start latency (s)", results.start_latencies)):
+        print(f"{label:<22}" + "".join(f"{_percentile(values, p):>9.3f}" for p in (50, 95, 99)) + f"{len(values):>7}")
+    if baseline and final:
+        cores = (final[1] - baseline[1]) / wall
+        print(f"app CPU cores used      {cores:.2f}")
+        if cores > 0:
+            print(f"sessions per core       {results.peak_active / cores:.1f} concurrent")
+        if results.peak_active:
+            per_session = (peak_rss - baseline[0]) / results.peak_active
+            print(f"memory per session      {per_session / 1024:.0f} KiB (peak RSS {peak_rss / 2**20:.0f} MiB)")
+    else:
+        print("CPU and memory figures need /proc (Linux)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--candidates", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=10, help="interviews in progress at once")
+    parser.add_argument("--port", type=int, default=8100, help="port for the app under test")
+    parser.add_argument("--ollama-port", type=int, default=11500, help="port for the fake Ollama server")
+    parser.add_argument("--prompt-latency-ms", type=float, default=200)
+    parser.add_argument("--tokens-per-second", type=float, default=30)
+    parser.add_argument("--questions", type=int, default=3, help="questions per interview")
+    parser.add_argument("--unsatisfactory-rate", type=float, default=0.3, help="share of answers that get a follow-up")
+    parser.add_argument("--llm-concurrency", type=int, default=8, help="LLM_MAX_CONCURRENCY for the app")
+    parser.add_argument("--transcription", choices=["fake", "real"], default="fake")
+    parser.add_argument("--transcription-rtf", type=float, default=0.1, help="real-time factor of fake transcription")
+    parser.add_argument("--wav-dir", help="directory of 16-bit mono WAV answers (default: synthesized)")
+    parser.add_argument("--protocol", choices=["stream", "blob"], default="stream", help="blob needs ffmpeg")
+    parser.add_argument("--realtime", action="store_true", help="stream audio at speaking pace")
+    args = parser.parse_args()
+
+    env = {
+        "OLLAMA_HOSTS": f"http://127.0.0.1:{args.ollama_port}",
+        "LLM_MAX_CONCURRENCY": str(args.llm_concurrency),
+        "LLM_MAX_QUEUE_DEPTH": str(max(32, args.concurrency * 4)),
+        "WHISPER_WARMUP": "true" if args.transcription == "real" else "false",
+        "CACHE_PERSISTENT": "false",
+    }
+    context = multiprocessing.get_context("spawn")
+    ollama = context.Process(
+        target=fake_ollama.serve,
+        args=(args.ollama_port, args.prompt_latency_ms, args.tokens_per_second, args.questions, args.unsatisfactory_rate),
+    )
+    app = context.Process(
+        target=_serve_app,
+        args=(args.port, env, args.transcription == "fake", args.transcription_rtf),
+    )
+    ollama.start()
+    app.start()
+    try:
+        asyncio.run(drive(args, app.pid))
+    finally:
+        app.terminate()
+        ollama.terminate()
+        app.join()
+        ollama.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Measure the real-time factor (RTF) of each transcription backend.
+
+RTF = processing time / audio duration; below 1.0 is faster than real time.
+
+Usage (from the ai_interview_agent directory):
+    python -m benchmarks.transcription_rtf answer1.wav answer2.wav \
+        --backend openai-whisper --backend faster-whisper --model small --threads 4
+"""
+from typing import List
+import argparse
+import statistics
+import time
+from app.services.audio_stream import SAMPLE_RATE
+from app.services.transcription_backends import BACKENDS, create_backend
+
+
+def benchmark_backend(name: str, model_size: str, threads: int, compute_type: str, paths: List[str], repeats: int) -> dict:
+    backend = create_backend(name, model_size, threads, compute_type)
+
+    started = time.perf_counter()
+    backend.load()
+    load_seconds = time.perf_counter() - started
+
+    audios = [backend.load_audio(path) for path in paths]
+    audio_seconds = sum(len(audio) for audio in audios) / SAMPLE_RATE
+
+    # One untimed pass so lazy initialisation does not count against the backend
+    backend.transcribe(audios[0])
+
+    sequential, batched = [], []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for audio in audios:
+            backend.transcribe(audio)
+        sequential.append((time.perf_counter() - started) / audio_seconds)
+
+        started = time.perf_counter()
+        backend.transcribe_batch(audios)
+        batched.append((time.perf_counter() - started) / audio_seconds)
+
+    return {
+        "backend": name,
+        "compute": compute_type if name == "faster-whisper" else "float32",
+        "load_s": load_seconds,
+        "audio_s": audio_seconds,
+        "rtf": statistics.median(sequential),
+        "batch_rtf": statistics.median(batched),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("audio", nargs="+", help="audio files to transcribe")
+    parser.add_argument("--backend", action="append", choices=sorted(BACKENDS), help="backend(s) to compare (default: all)")
+    parser.add_argument("--model", default="small", help="model size")
+    parser.add_argument("--threads", type=int, default=4, help="CPU threads per backend")
+    parser.add_argument("--compute-type", default="int8", help="faster-whisper compute type")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    rows = []
+    for name in args.backend or sorted(BACKENDS):
+        try:
+            rows.append(benchmark_backend(name, args.model, args.threads, args.compute_type, args.audio, args.repeats))
+        except Exception as e:
+            print(f"{name}: skipped ({e})")
+
+    print(f"\nmodel={args.model} threads={args.threads} clips={len(args.audio)}")
+    print(f"{'backend':<16}{'compute':<10}{'load s':>8}{'audio s':>9}{'RTF':>8}{'batch RTF':>11}")
+    for row in rows:
+        print(
+            f"{row['backend']:<16}{row['compute']:<10}{row['load_s']:>8.1f}{row['audio_s']:>9.1f}"
+            f"{row['rtf']:>8.3f}{row['batch_rtf']:>11.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,79 @@
-from fastapi import FastAPI, UploadFile, File, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, UploadFile, File, WebSocket, WebSocketDisconnect, HTTPException
+from app.config import settings
 from app.models.base_models import InterviewInput
-from app.services.interview_session import InterviewSession
+from app.services.interview_session import InterviewSession, TURN_TRANSCRIBED
 from app.services.database import DatabaseService
-from pathlib import Path
+from app.services.inference import InferenceOverloadedError, llm_client
+from app.services.scheduling import WorkClass, set_work_class
+from app.services.model_registry import model_registry
+from app.services.transcription_scheduler import transcription_scheduler
+from app.services.cache import document_text_cache, question_cache
+from app.services.document_parser import DocumentTooLargeError, pdf_extractor
+from app.services.session_store import create_session_store
+from app.services.coordination import create_session_coordinator
+from app.services.archive import create_session_archiver
+from app.services.speculation import SpeculativeTurn
+from app.services.audio_stream import AudioRejectedError
+from app.services.answer_scorer import ELABORATE_FOLLOW_UP, NO_SPEECH
+from app.services.tts import SpeechSynthesisError, tts_service
+from app.services.batch_jobs import BatchTooLargeError, create_batch_runner, spool_upload
+from app.services import metrics
+from app.services.metrics import TURN_SECONDS, stage_timer
+from contextlib import asynccontextmanager
 import uuid
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+import asyncio
 import logging
+import json
+import time
+import zipfile
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
-UPLOAD_DIR = Path(__file__).parent / "uploads"
-UPLOAD_DIR.mkdir(exist_ok=True)
-MONGODB_URL = "mongodb://localhost:27017"  # Replace with your MongoDB connection string
-db_service = DatabaseService(MONGODB_URL)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        await asyncio.wait_for(db_service.ensure_indexes(), timeout=10)
+    except Exception as e:
+        # Readiness reports the database; indexes are created on the next start
+        logger.error(f"Failed to create database indexes: {e!r}")
+    if settings.cache_persistent:
+        document_text_cache.attach(db_service.db.document_text_cache)
+        question_cache.attach(db_service.db.question_cache)
+    session_store.start()
+    await session_coordinator.start()
+    if settings.archive_enabled:
+        session_archiver.start()
+    llm_client.start()
+    if settings.whisper_warmup:
+        model_registry.start_warmup()
+    # The pre-scorer's follow-up is asked often, so have its audio ready
+    tts_service.prefetch([ELABORATE_FOLLOW_UP])
+    yield
+    await batch_runner.stop()
+    await session_archiver.stop()
+    await session_coordinator.stop()
+    await session_store.stop()
+    await transcription_scheduler.shutdown()
+    await tts_service.shutdown()
+    await model_registry.shutdown()
+    await llm_client.close()
+    pdf_extractor.shutdown()
+
+if settings.preload_models:
+    model_registry.preload()
+
+app = FastAPI(lifespan=lifespan)
+db_service = DatabaseService(settings.mongodb_url)
+session_store = create_session_store(db_service)
+session_coordinator = create_session_coordinator(db_service.db)
+session_archiver = create_session_archiver(db_service)
+batch_runner = create_batch_runner(db_service)
 
 app.add_middleware(
     CORSMiddleware,
@@ -26,24 +83,81 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Sent with 429 responses when inference capacity is exhausted
+RETRY_AFTER = {"Retry-After": "5"}
+
+# Pause before re-evaluating a saved answer when the LLM queue is full
+EVALUATION_RETRY_SECONDS = 2
+
 # Store active WebSocket connections
 active_connections: Dict[str, WebSocket] = {}
 
+async def release_session(session_id: str, lost: bool) -> None:
+    """Stop serving a session that another connection took over (or whose lease expired)"""
+    websocket = active_connections.pop(session_id, None)
+    if not lost:
+        await session_store.flush(session_id)
+    # The next owner loads the saved state, so ours must not be used or written again
+    session_store.forget(session_id)
+    if websocket is not None:
+        try:
+            await websocket.close(code=4001, reason="Session taken over by another connection")
+        except Exception:
+            pass
+
+session_coordinator.on_release = release_session
+
+# Gauges are read when /metrics is scraped
+metrics.ACTIVE_WEBSOCKETS.set_function(lambda: len(active_connections))
+metrics.SESSIONS_IN_MEMORY.set_function(lambda: len(session_store))
+for work_class in WorkClass:
+    metrics.LLM_QUEUE_DEPTH.labels(work_class.name.lower()).set_function(
+        lambda name=work_class.name.lower(): llm_client.gate.queue_depths()[name]
+    )
+metrics.LLM_IN_FLIGHT.set_function(lambda: llm_client.gate.in_flight)
+metrics.TRANSCRIPTION_QUEUE_DEPTH.set_function(lambda: transcription_scheduler.queue_depth)
+
 @app.get('/')
 def read_root():
     return {"message": "Welcome to AI Interview Agent!"}
 
+@app.get('/health/live')
+def liveness():
+    """The process is up and serving requests"""
+    return {"status": "alive"}
+
+@app.get('/health/ready')
+async def readiness():
+    """Ready once MongoDB is reachable and the transcription model is loaded; LLM hosts are reported but not required"""
+    database_ok = await db_service.ping()
+    ready = database_ok and model_registry.whisper_ready
+    body = {
+        "status": "ready" if ready else "not_ready",
+        "database": "ok" if database_ok else "unreachable",
+        "whisper": model_registry.whisper_state,
+        "llm": llm_client.status(),
+    }
+    if model_registry.whisper_error:
+        body["whisper_error"] = model_registry.whisper_error
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+@app.get('/metrics')
+def prometheus_metrics():
+    """Prometheus metrics: per-stage latency histograms, LLM timings and queue gauges"""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 @app.post('/start_interview')
 async def start_interview(files: List[UploadFile] = File(...)):
+    set_work_class(WorkClass.SETUP)
     try:
         session_id = str(uuid.uuid4())
         session = InterviewSession(session_id)
         logger.info(f"Starting new interview session: {session_id}")
         
-        session.initialize_session(files)
+        await session.initialize_session(files)
 
         # Generate initial questions based on resume and job post
-        initial_questions = session.generate_initial_questions()
+        initial_questions = await session.generate_initial_questions()
             
 
 
@@ -51,114 +165,241 @@ async def start_interview(files: List[UploadFile] = File(...)):
         for question in initial_questions:
             session.add_question(question)
         
-        # Save session to database
-        await db_service.save_session(session)
+        # Keep the session hot in memory; it is persisted in the background
+        await session_store.put(session)
+        # Question audio is synthesized while the candidate gets ready
+        tts_service.prefetch(session.interview_questions)
         
         return {
             "session_id": session_id,
             "message": "Interview session started",
             "first_question": session.interview_questions[0]
         }
+    except DocumentTooLargeError as e:
+        logger.warning(f"Rejecting interview start, document too large: {e}")
+        raise HTTPException(status_code=413, detail=str(e))
+    except InferenceOverloadedError as e:
+        logger.warning(f"Rejecting interview start, server busy: {e}")
+        raise HTTPException(status_code=429, detail="Server is busy, please retry shortly", headers=RETRY_AFTER)
     except Exception as e:
         logger.error(f"Error starting interview: {e}")
         raise
 
+async def receive_answer(websocket: WebSocket, session: InterviewSession, turn: Optional[SpeculativeTurn] = None) -> Tuple[str, float]:
+    """
+    Receive one spoken answer and return its transcript and the time the audio finished arriving.
+
+    Clients either send the whole recording as a single binary message, or stream it:
+    a text message {"type": "audio_start", "format": "pcm_s16le" | "webm" | ..., "sample_rate": 16000},
+    any number of binary chunks, then {"type": "audio_end"}. Streamed audio is transcribed
+    segment by segment while the candidate is still speaking, and each partial transcript
+    is handed to `turn` so evaluation can start before the answer ends.
+    """
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+    if message.get("bytes") is not None:
+        logger.info(f"Received audio data of length: {len(message['bytes'])}")
+        answered_at = time.perf_counter()
+        session.mark_audio_received()
+        return await session.process_answer(message["bytes"]), answered_at
+
+    control = json.loads(message["text"])
+    if control.get("type") != "audio_start":
+        raise ValueError(f"Expected audio_start, got {control.get('type')}")
+
+    stream = await session.open_audio_stream(
+        control.get("format", "pcm_s16le"),
+        int(control.get("sample_rate", 16000)),
+        turn.speculate if turn else None,
+    )
+    try:
+        error: Optional[Exception] = None
+        with stage_timer("audio_receive", session.session_id):
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    raise WebSocketDisconnect(message.get("code", 1000))
+                if message.get("bytes") is not None:
+                    if error is None:
+                        try:
+                            await stream.feed(message["bytes"])
+                        except Exception as e:
+                            # Read on to audio_end so the rest of this answer is not taken for the next one
+                            error = e
+                elif json.loads(message["text"]).get("type") == "audio_end":
+                    break
+        if error is not None:
+            raise error
+        answered_at = time.perf_counter()
+        session.mark_audio_received()
+        logger.info(f"Received streamed audio of length: {stream.bytes_received}")
+        with stage_timer("transcription", session.session_id):
+            transcript = await stream.finish()
+        return (transcript if transcript else NO_SPEECH), answered_at
+    except BaseException:
+        await stream.abort()
+        raise
+
+async def send_question_audio(websocket: WebSocket, text: str, turn_number: int) -> None:
+    """
+    Stream a question's speech right after its text: {"type": "audio_start", "format": "wav"},
+    binary WAV chunks, then {"type": "audio_end"}. Cached audio is sent at once; audio still
+    being synthesized is sent chunk by chunk as the engine produces it. If synthesis fails
+    part-way, audio_end carries "status": "error" and the audio should be discarded.
+    """
+    if not tts_service.enabled:
+        return
+    started = False
+    end = {"type": "audio_end", "turn": turn_number}
+    try:
+        async for chunk in tts_service.stream(text):
+            if not started:
+                await websocket.send_json({"type": "audio_start", "format": "wav", "turn": turn_number})
+                started = True
+            await websocket.send_bytes(chunk)
+    except SpeechSynthesisError as e:
+        logger.warning(f"No audio for question: {e}")
+        # The audio sent so far is cut short
+        end["status"] = "error"
+    if started:
+        await websocket.send_json(end)
+
 @app.websocket("/ws/{session_id}")
 async def websocket_endpoint(websocket: WebSocket, session_id: str):
     """
     Handle WebSocket connection for the interview session
     """
+    set_work_class(WorkClass.LIVE)
     await websocket.accept()
+    # Only one connection in the cluster may serve a session; a reconnect takes it over
+    lease = await session_coordinator.claim(session_id)
+    if lease is None:
+        logger.warning(f"Session {session_id} is still active on another connection")
+        await websocket.send_json({
+            "type": "error",
+            "message": "This interview is active on another connection. Please try again shortly.",
+            "status": "busy"
+        })
+        await websocket.close(code=4009, reason="Session busy")
+        return
     active_connections[session_id] = websocket
     logger.info(f"New WebSocket connection established for session: {session_id}")
     
+    async def send_follow_up_delta(delta: str) -> None:
+        await websocket.send_json({
+            "type": "follow_up_delta",
+            "delta": delta,
+            "status": "incomplete"
+        })
+
+    turn: Optional[SpeculativeTurn] = None
+    # When the candidate finished the last answer; the wait ends with our next message
+    answered_at: Optional[float] = None
+
+    async def send_next(message: dict) -> None:
+        nonlocal answered_at
+        await websocket.send_json(message)
+        if answered_at is not None:
+            TURN_SECONDS.observe(time.perf_counter() - answered_at)
+            answered_at = None
+
+    def start_turn() -> SpeculativeTurn:
+        nonlocal turn
+        if turn is not None:
+            turn.close()
+        turn = SpeculativeTurn(session)
+        turn.prewarm()
+        return turn
+
     try:
-        session = await db_service.get_session(session_id)
+        session = await session_store.get(session_id)
         if not session:
             logger.error(f"Session not found: {session_id}")
             # await websocket.close(code=4004, reason="Session not found")
             return
+        session_store.pin(session_id)
+        # Sessions created by batch jobs, or resumed later, may not have their audio cached yet
+        tts_service.prefetch(session.interview_questions[session.current_question_index:])
 
         while True:
-            print("looping 1")
-            try:                
-                # Handle follow-up questions if any
-                while session.follow_up_questions:
-                    print("looping 2")
-                    follow_up = session.follow_up_questions.pop(0)  # Get and remove the first follow-up
-                    await websocket.send_json({
-                        "type": "follow_up",
-                        "question": follow_up,
-                        "status": "incomplete"
-                    })
-                    logger.info(f"Sent follow-up question: {follow_up}")
-                    
-                    # Receive answer for follow-up
-                    data = await websocket.receive_bytes()
-                    logger.info(f"Received audio data for follow-up of length: {len(data)}")
-                    
-                    # Process follow-up answer
-                    answer_text = session.process_answer(data)
-                    logger.info(f"Processed follow-up answer: {answer_text}")
-                    
-                    # Add to chat history
-                    session.add_to_chat_history("assistant", follow_up)
-                    session.add_to_chat_history("user", answer_text)
-                    
-                    # Evaluate follow-up answer
-                    is_satisfactory, new_follow_up = session.evaluate_answer(answer_text)
-                    
-                    if not is_satisfactory:
-                        session.add_follow_up_question(new_follow_up)
-                        continue
-                    else:
-                        break
-                # Send current question
-                current_question = session.interview_questions[session.current_question_index]
-                await websocket.send_json({
-                    "type": "question",
-                    "question": current_question,
-                    "status": "incomplete"
-                })
-                logger.info(f"Sent question: {current_question}")
-                
-                # Receive answer for main question
-                data = await websocket.receive_bytes()
-                logger.info(f"Received audio data of length: {len(data)}")
-                
-                # Process answer
-                answer_text = session.process_answer(data)
-                logger.info(f"Processed answer: {answer_text}")
-                
-                # Add to chat history
-                session.add_to_chat_history("assistant", current_question)
-                session.add_to_chat_history("user", answer_text)
-                
-                # Evaluate answer
-                is_satisfactory, follow_up = session.evaluate_answer(answer_text)
-                
-                if not is_satisfactory:
-                    session.add_follow_up_question(follow_up)
-                    continue  # Continue the loop to handle the follow-up question
-                
-                # Move to next question only if no follow-ups are pending
-                session.current_question_index += 1
-                session.answers.append(answer_text)
-                
-                # Check if interview is complete
-                if session.current_question_index >= len(session.interview_questions):
-                    session.is_completed = True
-                    await websocket.send_json({
+            try:
+                # Resume the checkpointed turn if there is one, otherwise ask the next question
+                current_turn = session.begin_turn()
+                if current_turn is None and not session.is_completed:
+                    session.mark_completed()
+                if session.is_completed:
+                    await session_store.flush(session_id)
+                    await send_next({
                         "type": "complete",
                         "message": "Interview completed successfully",
                         "status": "completed"
                     })
                     logger.info(f"Interview completed for session: {session_id}")
                     break
-                
-                # Save session state
-                await db_service.save_session(session)
-                
+
+                question_turn = start_turn()
+                if current_turn["state"] == TURN_TRANSCRIBED:
+                    # The answer was transcribed before the connection dropped; only evaluate it
+                    answer_text = current_turn["transcript"]
+                    logger.info(f"Resuming turn {current_turn['number']} at evaluation")
+                else:
+                    await send_next({
+                        "type": current_turn["kind"],
+                        "question": current_turn["question"],
+                        "turn": current_turn["number"],
+                        "audio": tts_service.enabled,
+                        "status": "incomplete"
+                    })
+                    logger.info(f"Sent {current_turn['kind']}: {current_turn['question']}")
+                    await send_question_audio(websocket, current_turn["question"], current_turn["number"])
+                    session_store.mark_dirty(session)
+
+                    # Receive and transcribe the answer
+                    answer_text, answered_at = await receive_answer(websocket, session, question_turn)
+                    logger.info(f"Processed answer: {answer_text}")
+                    session.record_transcript(answer_text)
+                    session_store.checkpoint(session)
+
+                # Evaluate answer; a follow-up, the next question or completion follows on the next pass
+                # Past the follow-up limit an insufficient answer is accepted, so no follow-up is sent
+                can_follow_up = session.can_follow_up()
+                with stage_timer("evaluation", session_id):
+                    is_satisfactory, follow_up = await question_turn.resolve(
+                        answer_text, send_follow_up_delta if can_follow_up else None
+                    )
+                if follow_up and can_follow_up:
+                    tts_service.prefetch([follow_up])
+                session.record_evaluation(is_satisfactory, follow_up)
+                session_store.checkpoint(session)
+
+            except WebSocketDisconnect:
+                raise
+            except AudioRejectedError as e:
+                logger.warning(f"Rejected answer audio for session {session_id}: {e}")
+                await websocket.send_json({
+                    "type": "error",
+                    "message": f"{e}. Please answer again.",
+                    "status": "rejected"
+                })
+                continue
+            except InferenceOverloadedError as e:
+                logger.warning(f"Inference busy for session {session_id}: {e}")
+                if session.current_turn and session.current_turn["state"] == TURN_TRANSCRIBED:
+                    # The transcript is kept; evaluation is retried after a pause
+                    await websocket.send_json({
+                        "type": "error",
+                        "message": "The interviewer is busy right now. Your answer was saved and will be reviewed in a moment.",
+                        "status": "busy"
+                    })
+                    await asyncio.sleep(EVALUATION_RETRY_SECONDS)
+                else:
+                    await websocket.send_json({
+                        "type": "error",
+                        "message": "The interviewer is busy right now. Please answer again in a moment.",
+                        "status": "busy"
+                    })
+                continue
             except Exception as e:
                 logger.error(f"Error processing message: {e}")
                 await websocket.send_json({
@@ -170,13 +411,19 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
             
     except WebSocketDisconnect:
         logger.info(f"WebSocket disconnected for session: {session_id}")
-        if session_id in active_connections:
+        if active_connections.get(session_id) is websocket:
             del active_connections[session_id]
     except Exception as e:
         logger.error(f"WebSocket error for session {session_id}: {e}")
         # await websocket.close(code=4000, reason=str(e))
-        if session_id in active_connections:
+        if active_connections.get(session_id) is websocket:
             del active_connections[session_id]
+    finally:
+        if turn is not None:
+            turn.close()
+        session_store.unpin(session_id)
+        await session_store.flush(session_id)
+        await session_coordinator.release(session_id, lease)
 
 
 @app.post('/generate_questions')
@@ -184,11 +431,53 @@ async def generate_questions(files: List[UploadFile] = File(...)):
     """
     Generate initial questions for the interview based on job post
     """
+    set_work_class(WorkClass.OFFLINE)
     try:
         session_id = str(uuid.uuid4())
         session = InterviewSession(session_id)
-        initial_questions = session.generate_recruiter_questions()
+        await session.initialize_session(files)
+        initial_questions = await session.generate_recruiter_questions()
         return initial_questions
+    except DocumentTooLargeError as e:
+        logger.warning(f"Rejecting question generation, document too large: {e}")
+        raise HTTPException(status_code=413, detail=str(e))
+    except InferenceOverloadedError as e:
+        logger.warning(f"Rejecting question generation, server busy: {e}")
+        raise HTTPException(status_code=429, detail="Server is busy, please retry shortly", headers=RETRY_AFTER)
     except Exception as e:
         logger.error(f"Error generating questions: {e}")
         raise
+
+@app.post('/batch_interviews', status_code=202)
+async def batch_interviews(job_post: UploadFile = File(...), resumes: List[UploadFile] = File(...)):
+    """
+    Pre-generate interview sessions for one job post and many resumes (PDFs or zip archives of PDFs).
+    Returns immediately; poll the job's status URL for progress and the created session IDs.
+    """
+    # The job's tasks inherit this class
+    set_work_class(WorkClass.OFFLINE)
+    try:
+        job_post_source = (job_post.filename, await job_post.read())
+        # Uploads are closed when this request ends, so the job gets its own copies; each is read only when the job reaches it
+        resume_sources = [(resume.filename, await asyncio.to_thread(spool_upload, resume.file)) for resume in resumes]
+        job = batch_runner.submit(job_post_source, resume_sources)
+        logger.info(f"Started batch job {job.job_id} for {job.total} resumes")
+        return {
+            "job_id": job.job_id,
+            "total": job.total,
+            "status_url": f"/batch_interviews/{job.job_id}"
+        }
+    except BatchTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except zipfile.BadZipFile as e:
+        raise HTTPException(status_code=400, detail=f"Invalid zip archive: {e}")
+
+@app.get('/batch_interviews/{job_id}')
+async def batch_interview_status(job_id: str):
+    """
+    Progress of a batch job, including resumes per minute and the session ID created for each resume
+    """
+    status = await batch_runner.get_status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    return status
@@ -0,0 +1,36 @@
+import socket
+import threading
+import time
+import pytest
+import uvicorn
+from benchmarks.fake_ollama import create_app
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture(scope="session")
+def fake_ollama():
+    """URL of a fake Ollama server (benchmarks/fake_ollama.py) running in a background thread"""
+    port = free_port()
+    app = create_app(prompt_latency_ms=0, tokens_per_second=10_000, questions=3, unsatisfactory_rate=0)
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise RuntimeError("fake Ollama server did not start")
+        time.sleep(0.01)
+    yield f"http://127.0.0.1:{port}"
+    server.should_exit = True
+    thread.join(timeout=5)
+
+
+@pytest.fixture
+def dead_host() -> str:
+    """URL of a port nothing listens on"""
+    return f"http://127.0.0.1:{free_port()}"
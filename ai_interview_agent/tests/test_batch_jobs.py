@@ -0,0 +1,86 @@
+import asyncio
+import io
+import zipfile
+import pytest
+from app.config import settings
+from app.services.batch_jobs import BatchJobRunner, count_resumes, spool_upload
+from app.services.inference import InferenceOverloadedError
+from app.services.interview_session import InterviewSession
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.inserted = []
+
+    async def insert_sessions(self, sessions):
+        self.inserted += [session.session_id for session in sessions]
+
+    class db:
+        class batch_jobs:
+            @staticmethod
+            async def replace_one(*args, **kwargs):
+                pass
+
+
+class FakeRunner(BatchJobRunner):
+    """Builds sessions without parsing or the LLM; the session ID is the resume's file name"""
+
+    async def _prepare_job_post(self, job_post):
+        return {}
+
+    async def _build_session(self, shared, data, name):
+        await asyncio.sleep(0)
+        return InterviewSession(name)
+
+
+def zip_upload(*names: str, corrupt: str = None) -> io.BytesIO:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as archive:
+        for name in names:
+            archive.writestr(name, f"resume {name}".encode())
+    data = bytearray(buffer.getvalue())
+    if corrupt:
+        data[data.index(f"resume {corrupt}".encode())] ^= 0xFF
+    return io.BytesIO(bytes(data))
+
+
+def run_job(resumes):
+    async def scenario():
+        db = FakeDatabase()
+        runner = FakeRunner(db, workers=2, insert_batch_size=10)
+        job = runner.submit(("job.pdf", b""), resumes)
+        await asyncio.wait_for(runner._tasks[job.job_id], 5)
+        return job, db
+
+    return asyncio.run(scenario())
+
+
+def test_counts_pdfs_and_zip_members_without_reading_them():
+    uploads = [("a.pdf", spool_upload(io.BytesIO(b"pdf"))), ("b.zip", spool_upload(zip_upload("c.pdf", "d.pdf", "notes.txt")))]
+    assert count_resumes(uploads) == 3
+
+
+def test_unreadable_zip_member_fails_only_that_resume():
+    resumes = [("a.pdf", spool_upload(io.BytesIO(b"pdf"))), ("b.zip", spool_upload(zip_upload("c.pdf", "d.pdf", corrupt="c.pdf")))]
+    job, db = run_job(resumes)
+
+    assert job.status == "completed"
+    assert (job.succeeded, job.failed) == (2, 1)
+    assert sorted(db.inserted) == ["a.pdf", "d.pdf"]
+    assert [r["filename"] for r in job.results if "error" in r] == ["c.pdf"]
+    # The job owns the spooled files and closes them when it ends
+    assert all(file.closed for _, file in resumes)
+
+
+def test_overloaded_call_is_raised_when_retries_are_disabled(monkeypatch):
+    monkeypatch.setattr(settings, "batch_overload_retries", 0)
+    calls = []
+
+    async def overloaded():
+        calls.append(1)
+        raise InferenceOverloadedError("busy")
+
+    runner = BatchJobRunner(FakeDatabase(), workers=1, insert_batch_size=1)
+    with pytest.raises(InferenceOverloadedError):
+        asyncio.run(runner._with_backoff(overloaded))
+    assert len(calls) == 1
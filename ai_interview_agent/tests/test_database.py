@@ -0,0 +1,66 @@
+import asyncio
+from pymongo.errors import BulkWriteError
+from app.services.database import SessionWriteBatcher
+from app.services.interview_session import InterviewSession
+
+
+class FakeCollection:
+    """Records bulk writes; can fail chosen operations or hold the first write open"""
+
+    def __init__(self, failing_indexes=(), first_write_seconds: float = 0):
+        self.failing_indexes = list(failing_indexes)
+        self.first_write_seconds = first_write_seconds
+        self.writes = []
+        self.events = []
+
+    async def bulk_write(self, operations, ordered):
+        number = len(self.writes) + 1
+        self.writes.append([op._doc for op in operations])
+        self.events.append(("start", number))
+        if number == 1:
+            await asyncio.sleep(self.first_write_seconds)
+        self.events.append(("end", number))
+        if self.failing_indexes:
+            raise BulkWriteError({"writeErrors": [{"index": i, "code": 1, "errmsg": "failed"} for i in self.failing_indexes]})
+
+
+def saved_session(session_id: str) -> InterviewSession:
+    session = InterviewSession(session_id)
+    session.add_question("q1")
+    session.pop_changes()
+    return session
+
+
+def test_partial_bulk_write_failure_restores_only_failed_updates():
+    async def scenario():
+        collection = FakeCollection(failing_indexes=[1])
+        batcher = SessionWriteBatcher(collection, max_delay_ms=1, max_batch_size=10)
+        written, rejected = saved_session("a"), saved_session("b")
+        for session in (written, rejected):
+            session.record_answer("ans1")
+        await asyncio.gather(batcher.submit(written), batcher.submit(rejected), return_exceptions=True)
+        return written.pop_changes(), rejected.pop_changes()
+
+    written_changes, rejected_changes = asyncio.run(scenario())
+    # The applied $inc/$push must not run a second time
+    assert written_changes == {}
+    assert rejected_changes == {"$push": {"answers": {"$each": ["ans1"]}}, "$inc": {"current_question_index": 1}}
+
+
+def test_batches_are_written_in_order():
+    async def scenario():
+        collection = FakeCollection(first_write_seconds=0.1)
+        batcher = SessionWriteBatcher(collection, max_delay_ms=1, max_batch_size=10)
+        session = saved_session("a")
+        session.current_turn = {"number": 1}
+        session.mark_dirty("current_turn")
+        first = asyncio.create_task(batcher.submit(session))
+        await asyncio.sleep(0.02)
+        session.current_turn = {"number": 2}
+        session.mark_dirty("current_turn")
+        await asyncio.gather(first, batcher.submit(session))
+        return collection
+
+    collection = asyncio.run(scenario())
+    assert collection.events == [("start", 1), ("end", 1), ("start", 2), ("end", 2)]
+    assert [write[0]["$set"]["current_turn"]["number"] for write in collection.writes] == [1, 2]
@@ -0,0 +1,139 @@
+import asyncio
+import json
+import pytest
+from app.services.inference import LLMClient
+
+MODEL = "deepseek-r1"
+EVALUATE = [{"role": "user", "content": "Evaluate the candidate's answer"}]
+
+
+def make_client(hosts, **kwargs) -> LLMClient:
+    kwargs.setdefault("failure_threshold", 2)
+    kwargs.setdefault("open_seconds", 60)
+    return LLMClient(hosts, MODEL, max_concurrency=2, max_queue_depth=8, **kwargs)
+
+
+def run(client: LLMClient, scenario):
+    async def main():
+        try:
+            return await scenario()
+        finally:
+            await client.close()
+    return asyncio.run(main())
+
+
+def test_chat_returns_reply_and_learns_loaded_model(fake_ollama):
+    client = make_client([fake_ollama])
+
+    response = run(client, lambda: client.chat(EVALUATE))
+
+    assert json.loads(response["message"]["content"])["is_satisfactory"] is True
+    assert client.endpoints[0].has_model(MODEL)
+
+
+def test_routes_to_endpoint_with_model_loaded(fake_ollama):
+    client = make_client([fake_ollama, fake_ollama])
+    first, second = client.endpoints
+    second.loaded_models = {f"{MODEL}:latest"}
+
+    assert client._pick(MODEL, set()) is second
+    # A host without the model is still used once the one with it is full
+    second.outstanding = second.max_concurrency
+    assert client._pick(MODEL, set()) is first
+
+
+def test_routes_to_least_busy_endpoint(fake_ollama):
+    client = make_client([fake_ollama, fake_ollama])
+    first, second = client.endpoints
+    first.outstanding = 1
+
+    assert client._pick(MODEL, set()) is second
+
+
+def test_fails_over_to_healthy_host(fake_ollama, dead_host):
+    client = make_client([dead_host, fake_ollama])
+    dead, healthy = client.endpoints
+    # Make the dead host the first choice
+    dead.loaded_models = {f"{MODEL}:latest"}
+
+    response = run(client, lambda: client.chat(EVALUATE))
+
+    assert response["message"]["content"]
+    assert dead._failures == 1
+    assert healthy.has_model(MODEL)
+    assert dead.outstanding == healthy.outstanding == 0
+
+
+def test_stream_fails_over_before_first_chunk(fake_ollama, dead_host):
+    client = make_client([dead_host, fake_ollama])
+    client.endpoints[0].loaded_models = {f"{MODEL}:latest"}
+
+    async def scenario():
+        return [chunk async for chunk in client.chat_stream(EVALUATE)]
+
+    chunks = run(client, scenario)
+
+    assert chunks[-1]["done"]
+    assert client.endpoints[0]._failures == 1
+
+
+def test_circuit_opens_after_consecutive_failures(fake_ollama, dead_host):
+    client = make_client([dead_host, fake_ollama], failure_threshold=2)
+    dead = client.endpoints[0]
+    dead.loaded_models = {f"{MODEL}:latest"}
+
+    async def scenario():
+        for _ in range(3):
+            await client.chat(EVALUATE)
+
+    run(client, scenario)
+
+    assert not dead.available
+    # The third request skipped the open circuit instead of trying the dead host again
+    assert dead._failures == 2
+    assert client.status()[0]["state"] == "open"
+
+
+def test_circuit_closes_after_successful_probe(fake_ollama):
+    client = make_client([fake_ollama], failure_threshold=1, open_seconds=0.05)
+    endpoint = client.endpoints[0]
+
+    async def scenario():
+        endpoint.record_failure(ConnectionError("down"))
+        assert not endpoint.available
+        await asyncio.sleep(0.1)
+        assert endpoint.available
+        await client.check_health()
+
+    run(client, scenario)
+
+    assert endpoint._failures == 0
+    assert endpoint.available
+
+
+def test_raises_when_every_host_is_down(dead_host):
+    client = make_client([dead_host])
+
+    with pytest.raises(ConnectionError):
+        run(client, lambda: client.chat(EVALUATE))
+    assert client.endpoints[0]._failures == 1
+
+
+def test_freed_endpoint_reaches_a_waiter_that_can_use_it(fake_ollama):
+    client = LLMClient([fake_ollama, fake_ollama], MODEL, max_concurrency=1, max_queue_depth=8)
+    first, second = client.endpoints
+
+    async def scenario():
+        await client._acquire(MODEL, set())
+        await client._acquire(MODEL, set())
+        # A failover retry that may not use `first` starts waiting before a fresh request
+        retry = asyncio.create_task(client._acquire(MODEL, {first}))
+        await asyncio.sleep(0)
+        fresh = asyncio.create_task(client._acquire(MODEL, set()))
+        await asyncio.sleep(0)
+        await client._release(first)
+        assert await asyncio.wait_for(fresh, 1) is first
+        assert not retry.done()
+        retry.cancel()
+
+    run(client, scenario)
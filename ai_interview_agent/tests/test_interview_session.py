@@ -0,0 +1,195 @@
+from app.config import settings
+from app.services.interview_session import (
+    TURN_ASKED,
+    TURN_AUDIO_RECEIVED,
+    TURN_EVALUATED,
+    TURN_TRANSCRIBED,
+    InterviewSession,
+)
+
+
+def make_session(questions=("q1", "q2")) -> InterviewSession:
+    session = InterviewSession("s1")
+    for question in questions:
+        session.add_question(question)
+    # Start from a saved session, so only later changes are pending
+    session.pop_changes()
+    return session
+
+
+def answer_turn(session: InterviewSession, transcript: str, is_satisfactory: bool, follow_up=None) -> dict:
+    turn = session.begin_turn()
+    session.mark_audio_received()
+    session.record_transcript(transcript)
+    session.record_evaluation(is_satisfactory, follow_up)
+    return turn
+
+
+def test_turn_moves_through_stages_in_order():
+    session = make_session()
+
+    turn = session.begin_turn()
+    assert (turn["number"], turn["kind"], turn["question"], turn["state"]) == (1, "question", "q1", TURN_ASKED)
+    # begin_turn resumes the turn in progress instead of starting another
+    assert session.begin_turn() is turn
+
+    session.mark_audio_received()
+    assert turn["state"] == TURN_AUDIO_RECEIVED
+    session.record_transcript("my answer")
+    assert turn["state"] == TURN_TRANSCRIBED
+    assert turn["transcript"] == "my answer"
+
+    session.record_evaluation(True, None)
+    assert turn["state"] == TURN_EVALUATED
+    assert session.current_turn is None
+    assert session.turns == [turn]
+
+
+def test_turn_never_moves_backwards_or_repeats_effects():
+    session = make_session()
+    session.begin_turn()
+    session.record_transcript("first")
+    # A late duplicate of an earlier stage is ignored
+    session.mark_audio_received()
+    session.record_transcript("second")
+    assert session.current_turn["state"] == TURN_TRANSCRIBED
+    assert session.current_turn["transcript"] == "first"
+    assert [m["content"] for m in session.chat_history] == ["q1", "first"]
+
+    session.record_evaluation(True, None)
+    session.record_evaluation(True, None)
+    assert session.answers == ["first"]
+    assert session.current_question_index == 1
+
+
+def test_unsatisfactory_answer_asks_follow_up_next():
+    session = make_session()
+    answer_turn(session, "too short", False, "Can you elaborate?")
+    assert session.current_question_index == 0
+    assert session.answers == []
+
+    follow_up = session.begin_turn()
+    assert (follow_up["number"], follow_up["kind"], follow_up["question"]) == (2, "follow_up", "Can you elaborate?")
+    assert session.follow_up_questions == []
+
+    # A satisfactory follow-up answer does not count as an answer to the question
+    answer_turn(session, "more detail", True)
+    assert session.current_question_index == 0
+    assert session.begin_turn()["question"] == "q1"
+
+
+def test_last_accepted_answer_completes_interview():
+    session = make_session()
+    answer_turn(session, "a1", True)
+    answer_turn(session, "a2", True)
+    assert session.is_completed
+    assert session.answers == ["a1", "a2"]
+    assert session.begin_turn() is None
+
+
+def test_turn_numbers_continue_after_projected_reload():
+    session = make_session()
+    answer_turn(session, "a1", True)
+    data = session.to_dict()
+    # Live reads only load the last finished turn and no answers
+    data["turns"] = data["turns"][-1:]
+    del data["answers"], data["chat_history"]
+
+    reloaded = InterviewSession.from_dict(data)
+    assert reloaded.begin_turn()["number"] == 2
+
+
+def test_new_session_is_saved_in_full():
+    session = InterviewSession("s1")
+    update = session.pop_changes()
+    assert set(update) == {"$set"}
+    assert "session_id" not in update["$set"]
+    assert update["$set"]["current_question_index"] == 0
+    assert session.pop_changes() == {}
+
+
+def test_pop_changes_builds_incremental_update():
+    session = make_session()
+    session.add_to_chat_history("assistant", "q1")
+    session.record_answer("a1")
+
+    update = session.pop_changes()
+    assert update["$push"]["answers"] == {"$each": ["a1"]}
+    assert [e["content"] for e in update["$push"]["chat_history"]["$each"]] == ["q1"]
+    assert update["$inc"] == {"current_question_index": 1}
+    assert "$set" not in update
+    assert session.pop_changes() == {}
+
+
+def test_conflicting_operators_on_a_field_become_set():
+    session = make_session()
+    session.add_follow_up_question("f1")
+    session.add_follow_up_question("f2")
+    session.pop_follow_up_question()
+
+    update = session.pop_changes()
+    assert update == {"$set": {"follow_up_questions": ["f2"]}}
+
+
+def test_restore_changes_retries_failed_update_with_later_changes():
+    session = make_session()
+    answer_turn(session, "a1", False, "f1")
+    failed = session.pop_changes()
+
+    session.begin_turn()
+    session.record_transcript("a2")
+    session.restore_changes(failed)
+    update = session.pop_changes()
+
+    # The follow-up was pushed before the failure and popped after it, so it is rewritten whole
+    assert update["$set"]["follow_up_questions"] == []
+    assert "follow_up_questions" not in update["$push"]
+    assert [e["content"] for e in update["$push"]["chat_history"]["$each"]] == ["q1", "a1", "f1", "a2"]
+    assert [t["number"] for t in update["$push"]["turns"]["$each"]] == [1]
+    assert update["$set"]["current_turn"]["transcript"] == "a2"
+    assert "$pop" not in update
+
+
+def test_restore_changes_keeps_counters():
+    session = make_session()
+    answer_turn(session, "a1", True)
+    failed = session.pop_changes()
+    answer_turn(session, "a2", True)
+    session.restore_changes(failed)
+
+    update = session.pop_changes()
+    assert update["$inc"] == {"current_question_index": 2}
+    assert update["$push"]["answers"] == {"$each": ["a1", "a2"]}
+    assert update["$set"]["is_completed"] is True
+
+
+def test_insufficient_answer_is_accepted_after_follow_up_limit(monkeypatch):
+    monkeypatch.setattr(settings, "evaluation_max_follow_ups", 2)
+    session = make_session()
+    answer_turn(session, "a", False, "Elaborate?")
+    first = answer_turn(session, "b", False, "Elaborate?")
+    assert (first["kind"], first["follow_ups"]) == ("follow_up", 1)
+    assert session.can_follow_up() is True
+
+    last = session.begin_turn()
+    assert last["follow_ups"] == 2
+    assert session.can_follow_up() is False
+    session.record_transcript("still short")
+    session.record_evaluation(False, "Elaborate?")
+
+    assert last["evaluation"]["follow_up_limit_reached"] is True
+    assert session.follow_up_questions == []
+    assert session.answers == ["still short"]
+    assert session.begin_turn()["question"] == "q2"
+
+
+def test_follow_up_count_survives_projected_reload(monkeypatch):
+    monkeypatch.setattr(settings, "evaluation_max_follow_ups", 1)
+    session = make_session()
+    answer_turn(session, "a", False, "Elaborate?")
+    data = session.to_dict()
+    data["turns"] = data["turns"][-1:]
+
+    reloaded = InterviewSession.from_dict(data)
+    assert reloaded.begin_turn()["follow_ups"] == 1
+    assert reloaded.can_follow_up() is False
@@ -0,0 +1,137 @@
+import asyncio
+import pytest
+from app.services.scheduling import InferenceOverloadedError, PriorityGate, WorkClass, set_work_class
+
+LIVE, SETUP, OFFLINE = WorkClass.LIVE, WorkClass.SETUP, WorkClass.OFFLINE
+
+
+def make_gate(max_concurrency: int = 4, max_queue_depth: int = 8, **kwargs) -> PriorityGate:
+    kwargs.setdefault("quotas", {SETUP: 3, OFFLINE: 2})
+    return PriorityGate("test", max_concurrency, max_queue_depth, **kwargs)
+
+
+async def hold(gate: PriorityGate, work_class: WorkClass, release: asyncio.Event) -> None:
+    async with gate.slot(work_class):
+        await release.wait()
+
+
+async def start_holding(gate: PriorityGate, *classes: WorkClass):
+    """Start one task per class that holds a slot until the returned event is set"""
+    release = asyncio.Event()
+    tasks = [asyncio.create_task(hold(gate, c, release)) for c in classes]
+    await asyncio.sleep(0)
+    return release, tasks
+
+
+def test_lower_classes_always_leave_a_slot_for_live_turns():
+    async def scenario():
+        gate = make_gate(deadlines={LIVE: 0.5})
+        release, tasks = await start_holding(gate, SETUP, SETUP, SETUP, OFFLINE)
+        # Setup and offline together are capped by the setup quota
+        assert gate.in_flight == 3
+        assert gate.queue_depths() == {"live": 0, "setup": 0, "offline": 1}
+        async with gate.slot(LIVE):
+            assert gate.in_flight == 4
+        release.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+
+
+def test_quotas_are_nested_and_reserve_a_live_slot():
+    gate = make_gate(quotas={SETUP: 4, OFFLINE: 4})
+    assert gate.quotas == {LIVE: 4, SETUP: 3, OFFLINE: 3}
+
+    gate = make_gate(quotas={SETUP: 1, OFFLINE: 3})
+    assert gate.quotas == {LIVE: 4, SETUP: 1, OFFLINE: 1}
+
+
+def test_offline_quota_caps_offline_work():
+    async def scenario():
+        gate = make_gate()
+        release, tasks = await start_holding(gate, OFFLINE, OFFLINE, OFFLINE)
+        assert gate.in_flight == 2
+        assert gate.queue_depths()["offline"] == 1
+        release.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+
+
+def test_freed_slot_goes_to_highest_priority_waiter():
+    async def scenario():
+        gate = make_gate(max_concurrency=1, quotas={})
+        order = []
+
+        async def run(work_class: WorkClass, label: str) -> None:
+            async with gate.slot(work_class):
+                order.append(label)
+
+        release, holder = await start_holding(gate, LIVE)
+        waiters = [
+            asyncio.create_task(run(OFFLINE, "offline")),
+            asyncio.create_task(run(SETUP, "setup")),
+            asyncio.create_task(run(LIVE, "live 1")),
+            asyncio.create_task(run(LIVE, "live 2")),
+        ]
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(*holder, *waiters)
+        return order
+
+    assert asyncio.run(scenario()) == ["live 1", "live 2", "setup", "offline"]
+
+
+def test_rejects_when_class_queue_is_full():
+    async def scenario():
+        gate = make_gate(max_concurrency=1, max_queue_depth=1, quotas={})
+        release, tasks = await start_holding(gate, LIVE, LIVE)
+        assert gate.queue_depth == 1
+        with pytest.raises(InferenceOverloadedError, match="queue is full"):
+            async with gate.slot(LIVE):
+                pass
+        release.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+
+
+def test_rejects_waiter_still_queued_at_deadline():
+    async def scenario():
+        gate = make_gate(max_concurrency=1, quotas={}, deadlines={LIVE: 0.05})
+        release, tasks = await start_holding(gate, LIVE)
+        with pytest.raises(InferenceOverloadedError, match="no free slot"):
+            async with gate.slot(LIVE):
+                pass
+        # The abandoned waiter no longer counts as queued
+        assert gate.queue_depth == 0
+        release.set()
+        await asyncio.gather(*tasks)
+        assert gate.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_rejects_up_front_when_expected_wait_exceeds_deadline():
+    async def scenario():
+        gate = make_gate(max_concurrency=1, quotas={}, deadlines={SETUP: 1})
+        # Slots have recently been held for 5s each
+        gate._hold_seconds = 5.0
+        release, tasks = await start_holding(gate, LIVE)
+        with pytest.raises(InferenceOverloadedError, match="would exceed"):
+            async with gate.slot(SETUP):
+                pass
+        release.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+
+
+def test_slot_class_defaults_to_the_callers_work_class():
+    async def scenario():
+        gate = make_gate()
+        set_work_class(OFFLINE)
+        async with gate.slot():
+            return dict(gate._running)
+
+    assert asyncio.run(scenario()) == {LIVE: 0, SETUP: 0, OFFLINE: 1}
@@ -0,0 +1,81 @@
+import asyncio
+from prometheus_client import REGISTRY
+from app.services.interview_session import InterviewSession
+from app.services.speculation import SpeculativeTurn
+from app.services.tts import tts_service
+
+PARTIAL = "I designed the queue so that workers pull jobs"
+FINAL = "I designed the queue so that workers pull jobs and retry failures"
+
+
+def evaluations(tier: str, result: str) -> float:
+    return REGISTRY.get_sample_value("answer_evaluations_total", {"tier": tier, "result": result}) or 0.0
+
+
+class FakeSession(InterviewSession):
+    """Scores every answer as satisfactory by the heuristic tier, without a model"""
+
+    __slots__ = ("scored",)
+
+    def __init__(self):
+        super().__init__("s1")
+        self.scored = []
+
+    async def score_answer(self, answer, on_follow_up_delta=None):
+        self.scored.append(answer)
+        return True, None, "heuristic"
+
+
+def resolve_after_partials(partials, final):
+    async def scenario():
+        session = FakeSession()
+        turn = SpeculativeTurn(session)
+        for partial in partials:
+            turn.speculate(partial)
+            await asyncio.sleep(0)
+        result = await turn.resolve(final)
+        return session, result
+
+    return asyncio.run(scenario())
+
+
+def test_speculation_hit_counts_one_evaluation():
+    before = evaluations("heuristic", "satisfactory")
+    session, result = resolve_after_partials([PARTIAL, FINAL], FINAL)
+    assert result == (True, None)
+    assert session.scored == [PARTIAL, FINAL]
+    assert evaluations("heuristic", "satisfactory") - before == 1
+
+
+def test_speculation_miss_counts_only_the_final_evaluation():
+    before = evaluations("heuristic", "satisfactory")
+    session, _ = resolve_after_partials([PARTIAL], FINAL)
+    assert session.scored == [PARTIAL, FINAL]
+    assert evaluations("heuristic", "satisfactory") - before == 1
+
+
+def test_speculated_follow_up_audio_is_prefetched(monkeypatch):
+    prefetched = []
+    monkeypatch.setattr(tts_service, "prefetch", prefetched.extend)
+
+    class InsufficientSession(FakeSession):
+        __slots__ = ()
+
+        async def score_answer(self, answer, on_follow_up_delta=None):
+            self.scored.append(answer)
+            return False, f"Follow-up to: {answer}", "heuristic"
+
+    async def scenario():
+        session = InsufficientSession()
+        session.add_question("q1")
+        session.begin_turn()
+        turn = SpeculativeTurn(session)
+        turn.speculate(PARTIAL)
+        await asyncio.sleep(0)
+        turn.speculate(FINAL)
+        await asyncio.sleep(0.01)
+        return await turn.resolve(FINAL)
+
+    assert asyncio.run(scenario()) == (False, f"Follow-up to: {FINAL}")
+    # Only the latest speculation's follow-up is synthesized
+    assert prefetched == [f"Follow-up to: {FINAL}"]